@@ -37,7 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'catalog',
+    'catalog.apps.CatalogConfig',
 ]
 
 MIDDLEWARE = [
@@ -47,6 +47,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'catalog.routers.StickyPrimaryMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -79,7 +80,46 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # keep connections, and their pragmas and page cache, across requests
+        'CONN_MAX_AGE': 300,
+        'CONN_HEALTH_CHECKS': True,
+        # atomic blocks wait for the write lock up front instead of failing when they first write
+        'TRANSACTION_MODE': 'IMMEDIATE',
+    },
+    # read-only copy of default for the catalog pages, refreshed by manage.py sync_replica
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 300,
+        'CONN_HEALTH_CHECKS': True,
+        'PRAGMAS': {'query_only': 1},
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# applied to every new SQLite connection by catalog.db; WAL lets readers run alongside a writer
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    # negative is KiB: 20 MB page cache per connection
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    # milliseconds a writer waits for the lock before 'database is locked'
+    'busy_timeout': 5000,
+}
+
+# aliases holding copies of default, see catalog.routers
+REPLICA_DATABASES = ['replica']
+DATABASE_ROUTERS = ['catalog.routers.ReplicaRouter']
+
+# shared by every process, so a purge from a worker or a management command
+# reaches the others; use memcached when the site runs on several hosts
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
 
@@ -120,6 +160,9 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+# collected by manage.py collectstatic, served by catalog.staticfiles.serve
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = 'catalog.staticfiles.CompressedManifestStaticFilesStorage'
 LOGIN_REDIRECT_URL = '/'
 # dev only function as no email capability in dev
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
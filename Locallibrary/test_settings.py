@@ -0,0 +1,17 @@
+"""
+Settings for running the tests:
+
+    python manage.py test --settings=Locallibrary.test_settings
+
+The tests clear the cache, so every run gets its own cache directory instead
+of the development server's, removed when the run ends.
+"""
+import atexit
+import shutil
+import tempfile
+
+from Locallibrary.settings import *  # noqa: F401,F403
+from Locallibrary.settings import CACHES
+
+CACHES = {'default': {**CACHES['default'], 'LOCATION': tempfile.mkdtemp(prefix='locallibrary-test-cache-')}}
+atexit.register(shutil.rmtree, CACHES['default']['LOCATION'], ignore_errors=True)
@@ -0,0 +1,132 @@
+"""
+    Drive mixed read and renewal traffic at one SQLite database from several
+    threads and processes, once with SQLite's stock settings and once with
+    settings.SQLITE_PRAGMAS, printing throughput, latencies and the number of
+    'database is locked' errors.
+
+    python benchmarks/bench_concurrency.py --workers 8 --seconds 10 --writes 0.2
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import populate, setup_django  # noqa: E402
+
+# journal_mode and synchronous are reset explicitly, the file keeps the journal mode it last had
+STOCK_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full', 'busy_timeout': 100}
+
+
+def read(rng):
+    from catalog.models import Book, BookInstance
+
+    if rng.random() < 0.5:
+        list(Book.objects.select_related('author').order_by('author_sort', 'title', 'id')[:10])
+    else:
+        list(BookInstance.objects.filter(borrower_id=rng.randrange(1, 100), status__exact='o')
+             .select_related('book').order_by('due_back', 'id')[:10])
+
+
+def worker(copy_ids, seconds, write_ratio, seed):
+    """Run traffic for the given time, returning (reads, writes, locked errors, latencies in seconds)"""
+    from django.db import OperationalError, connections
+
+    from catalog import loans
+
+    rng = random.Random(seed)
+    reads = writes = locked = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    loans.renew(rng.choice(copy_ids), date.today() + timedelta(days=rng.randrange(7, 28)))
+                    writes += 1
+                else:
+                    read(rng)
+                    reads += 1
+            except OperationalError as error:
+                if 'locked' not in str(error):
+                    raise
+                locked += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connections.close_all()
+    return reads, writes, locked, latencies
+
+
+def run(label, pool, args, copy_ids):
+    from django.db import connections
+
+    # no connection may be shared with, or inherited by, the workers
+    connections.close_all()
+    with pool(max_workers=args.workers) as executor:
+        futures = [executor.submit(worker, copy_ids, args.seconds, args.writes, seed)
+                   for seed in range(args.workers)]
+        results = [future.result() for future in futures]
+
+    reads = sum(result[0] for result in results)
+    writes = sum(result[1] for result in results)
+    locked = sum(result[2] for result in results)
+    latencies = sorted(latency for result in results for latency in result[3])
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+    print(f'{label}: {(reads + writes) / args.seconds:.0f} ops/s ({reads} reads, {writes} renewals), '
+          f'{locked} locked errors, median {statistics.median(latencies or [0]) * 1000:.2f} ms, '
+          f'p99 {p99 * 1000:.2f} ms')
+
+
+def configure(pragmas, transaction_mode):
+    from django.conf import settings
+    from django.db import connection, connections
+
+    settings.SQLITE_PRAGMAS = pragmas
+    connection.settings_dict['TRANSACTION_MODE'] = transaction_mode
+    connections.close_all()
+    # the journal mode is stored in the file, set it once before the workers start
+    connection.ensure_connection()
+    connections.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--copies', type=int, default=100000)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--authors', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--writes', type=float, default=0.2, help='share of operations that are renewals')
+    parser.add_argument('--database', help='SQLite file to create (default: a temporary file)')
+    args = parser.parse_args()
+
+    path = setup_django(args.database)
+    print(f'Populating {path} with {args.copies} copies of {args.books} books ...')
+    populate(args.authors, args.books, args.copies, args.users)
+
+    from django.conf import settings
+
+    from catalog.models import BookInstance
+
+    copy_ids = list(BookInstance.objects.filter(status__exact='o').values_list('pk', flat=True)[:10000])
+    tuned = dict(settings.SQLITE_PRAGMAS)
+    transaction_mode = settings.DATABASES['default'].get('TRANSACTION_MODE')
+    # fork keeps the settings changed above, which a fresh interpreter would not see
+    processes = lambda max_workers: ProcessPoolExecutor(max_workers, mp_context=get_context('fork'))  # noqa: E731
+    for label, pragmas, mode in (('stock', STOCK_PRAGMAS, None), ('tuned', tuned, transaction_mode)):
+        configure(pragmas, mode)
+        print(f'\n=== {label}: {pragmas}, transaction mode {mode or "DEFERRED"} ===')
+        run(f'{args.workers} threads', ThreadPoolExecutor, args, copy_ids)
+        run(f'{args.workers} processes', processes, args, copy_ids)
+
+
+if __name__ == '__main__':
+    main()
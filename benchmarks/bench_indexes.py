@@ -0,0 +1,100 @@
+"""
+    Benchmark the loan and list queries with and without the composite indexes
+    from migrations 0007 and 0016, printing EXPLAIN QUERY PLAN output and timings.
+
+    python benchmarks/bench_indexes.py --copies 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import populate, setup_django  # noqa: E402
+
+
+def queries():
+    from catalog.models import Author, Book, BookInstance
+
+    return [
+        ('patron loans (my-borrowed)',
+         lambda: BookInstance.objects.filter(borrower_id=1, status__exact='o').order_by('due_back', 'id')[:10]),
+        ('all loans (all-borrowed)',
+         lambda: BookInstance.objects.filter(status__exact='o')
+            .order_by('due_back', 'borrower_id', 'book_id', 'id')[:20]),
+        ('available copies count (index)',
+         lambda: BookInstance.objects.filter(status__exact='a')),
+        ('book list (books)',
+         lambda: Book.objects.order_by('author_sort', 'title', 'id')[:10]),
+        ('author list (authors)',
+         lambda: Author.objects.order_by('last_name', 'first_name', 'id')[:10]),
+    ]
+
+
+def run(label, repeat):
+    from django.db import connection
+
+    print(f'\n=== {label} ===')
+    for name, build in queries():
+        queryset = build()
+        if 'count' in name:
+            execute = lambda: build().count()  # noqa: E731
+            with connection.cursor() as cursor:
+                sql, params = queryset.order_by().values('pk').query.sql_with_params()
+                cursor.execute(f'{connection.ops.explain_query_prefix()} SELECT COUNT(*) FROM ({sql})', params)
+                explain = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        else:
+            execute = lambda: list(build())  # noqa: E731
+            explain = queryset.explain()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            execute()
+            timings.append(time.perf_counter() - start)
+        print(f'\n{name}: median {statistics.median(timings) * 1000:.2f} ms, '
+              f'min {min(timings) * 1000:.2f} ms over {repeat} runs')
+        print('  ' + explain.replace('\n', '\n  '))
+
+
+def set_indexes(create):
+    from django.db import connection
+
+    from catalog.models import Author, Book, BookInstance
+
+    with connection.schema_editor() as editor:
+        for model in (Author, Book, BookInstance):
+            for index in model._meta.indexes:
+                if create:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--copies', type=int, default=1000000)
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--authors', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database', help='SQLite file to create (default: a temporary file)')
+    args = parser.parse_args()
+
+    path = setup_django(args.database)
+    print(f'Populating {path} with {args.copies} copies of {args.books} books ...')
+    start = time.perf_counter()
+    populate(args.authors, args.books, args.copies, args.users)
+    print(f'Populated in {time.perf_counter() - start:.1f} s')
+
+    set_indexes(create=False)
+    run('before: without composite indexes', args.repeat)
+    set_indexes(create=True)
+    run('after: with composite indexes', args.repeat)
+
+
+if __name__ == '__main__':
+    main()
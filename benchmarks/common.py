@@ -0,0 +1,92 @@
+"""
+    Shared setup for the benchmark scripts: points Django at a throwaway SQLite
+    database and fills it with a synthetic catalog
+"""
+import os
+import random
+import sys
+import tempfile
+import uuid
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(database_path=None):
+    """
+        Configure Django against a scratch database and run the migrations
+        @param database_path    : SQLite file to use, a new temporary file when None
+        @return                 : path of the database file
+    """
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Locallibrary.settings')
+    if database_path is None:
+        database_path = os.path.join(tempfile.mkdtemp(prefix='locallibrary-bench-'), 'bench.sqlite3')
+
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = database_path
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return database_path
+
+
+def populate(authors, books, copies, users, seed=0):
+    """Bulk insert a synthetic catalog with raw SQL, bypassing model signals"""
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    from catalog import counters, search
+    from catalog.models import author_sort_key
+
+    rng = random.Random(seed)
+    today = date.today()
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, '
+            'is_staff, is_active, date_joined) VALUES (%s, 0, %s, %s, %s, %s, 0, 1, %s)',
+            [('!', f'patron{n}', '', '', '', today) for n in range(users)])
+        cursor.execute('INSERT INTO catalog_language (name) VALUES (%s)', ['English'])
+        names = [(f'First{rng.randrange(500)}', f'Last{rng.randrange(authors)}') for _ in range(authors)]
+        cursor.executemany(
+            'INSERT INTO catalog_author (first_name, last_name, last_modified) VALUES (%s, %s, %s)',
+            [(first_name, last_name, now) for first_name, last_name in names])
+        book_rows = []
+        for n in range(books):
+            title, author = f'Title {rng.randrange(books)}', rng.randrange(1, authors + 1)
+            sort_key = author_sort_key(*reversed(names[author - 1]))
+            book_rows.append((title, author, sort_key, 'Summary', f'{n:013d}', now))
+        cursor.executemany(
+            'INSERT INTO catalog_book (title, author_id, author_sort, summary, isbn, language_id, last_modified) '
+            'VALUES (%s, %s, %s, %s, %s, 1, %s)', book_rows)
+
+        statuses = ['a'] * 5 + ['o'] * 3 + ['m', 'r']
+        batch = []
+        for _ in range(copies):
+            status = rng.choice(statuses)
+            on_loan = status in ('o', 'r')
+            batch.append((
+                uuid.uuid4().hex,
+                rng.randrange(1, books + 1),
+                'Imprint',
+                today + timedelta(days=rng.randrange(-30, 30)) if on_loan else None,
+                rng.randrange(1, users + 1) if on_loan else None,
+                status,
+                now,
+            ))
+            if len(batch) == 10000:
+                _insert_copies(cursor, batch)
+                batch = []
+        _insert_copies(cursor, batch)
+    counters.rebuild()
+    search.rebuild()
+
+
+def _insert_copies(cursor, rows):
+    if rows:
+        cursor.executemany(
+            'INSERT INTO catalog_bookinstance (id, book_id, imprint, due_back, borrower_id, status, last_modified) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s)', rows)
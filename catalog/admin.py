@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Author, Genre, Book, BookInstance, Language
+from django.contrib.admin.utils import unquote
+from django.core.paginator import Paginator
+from django.db import models
+
+from . import loans
+from .models import Author, Genre, Book, BookInstance, Hold, Language
 # Register your models here.
 # admin.site.register(Book)
 # admin.site.register(Author)
@@ -8,9 +13,46 @@ admin.site.register(Genre)
 admin.site.register(Language)
 
 
-class BookInline(admin.StackedInline):
+class PaginatedInlineMixin:
+    """
+        Inline mixin showing the related records one page at a time, so a parent
+        with thousands of children renders a bounded formset
+    """
+    per_page = 20
+    template = 'admin/catalog/paginated_inline.html'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # inline instances are created per request, so the page can be kept on self
+        self.page = None
+        object_id = request.resolver_match.kwargs.get('object_id') if request.resolver_match else None
+        if object_id is None:
+            return queryset
+        children = queryset.filter(**{self.parent_fk_name(): unquote(object_id)})
+        paginator = Paginator(children.values_list('pk', flat=True), self.per_page)
+        self.page_param = f'{self.model._meta.model_name}_page'
+        self.page = paginator.get_page(request.GET.get(self.page_param))
+        self.page_urls = {}
+        for name, has_page, number in (('previous', self.page.has_previous, self.page.previous_page_number),
+                                       ('next', self.page.has_next, self.page.next_page_number)):
+            if has_page():
+                query = request.GET.copy()
+                query[self.page_param] = number()
+                self.page_urls[name] = '?' + query.urlencode()
+        return queryset.filter(pk__in=list(self.page.object_list))
+
+    def parent_fk_name(self):
+        """Name of the foreign key to the parent, fk_name or the only one the admin checks allow"""
+        if self.fk_name:
+            return self.fk_name
+        return next(field.name for field in self.model._meta.fields
+                    if isinstance(field, models.ForeignKey) and field.remote_field.model == self.parent_model)
+
+
+class BookInline(PaginatedInlineMixin, admin.StackedInline):
     model = Book
     extra = 0
+    base_template = 'admin/edit_inline/stacked.html'
 
 
 class AuthorAdmin(admin.ModelAdmin):
@@ -19,6 +61,9 @@ class AuthorAdmin(admin.ModelAdmin):
                     'date_of_birth', 'date_of_death')
     # tuple leads to horizontal display, else vertical
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
+    # prefix searches can use the name index, and feed the author autocomplete on books
+    search_fields = ['^last_name', '^first_name']
+    show_full_result_count = False
     # can also use exclude = to black list
     inlines = [BookInline]
 
@@ -27,16 +72,27 @@ admin.site.register(Author, AuthorAdmin)
 
 
 # provides inline editing of associated records, StackedInline give vertical layout
-class BooksInstanceInline(admin.TabularInline):
+class BooksInstanceInline(PaginatedInlineMixin, admin.TabularInline):
     model = BookInstance
+    base_template = 'admin/edit_inline/tabular.html'
+    # a select would list every user
+    autocomplete_fields = ['borrower']
 
 
 # alternative way with declaration to create and assign ModelAdmin
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'display_genre')
+    # author joined in, genres fetched for the whole page in one query
+    list_select_related = ('author',)
+    search_fields = ['^title', '=isbn']
+    show_full_result_count = False
+    autocomplete_fields = ['author']
     inlines = [BooksInstanceInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('genre')
+
 
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
@@ -51,12 +107,23 @@ class BookInstanceAdmin(admin.ModelAdmin):
         }),
     )
     list_display = ['book', 'status', 'borrower', 'due_back', 'id']
+    list_select_related = ('book', 'borrower')
+    show_full_result_count = False
+    autocomplete_fields = ['book', 'borrower']
     actions = ['markReturned', 'markMaint']
 
-    @staticmethod
-    def markReturned(request, queryset):
-        queryset.update(status='a')
+    def markReturned(self, request, queryset):
+        returned = loans.return_copies(queryset)
+        self.message_user(request, f'{returned} copies returned; copies that were not on loan are unchanged.')
 
     @staticmethod
     def markMaint(request, queryset):
         queryset.update(status='m')
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('book', 'patron', 'created')
+    list_select_related = ('book', 'patron')
+    show_full_result_count = False
+    autocomplete_fields = ['book', 'patron']
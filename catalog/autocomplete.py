@@ -0,0 +1,46 @@
+"""
+    Prefix lookups for the autocomplete widgets. Each word is matched with a
+    range on an indexed column (name >= 'smi' AND name < 'smi' + max char),
+    which SQLite answers from the index; LIKE 'smi%' would scan the table.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+from catalog.models import Author
+
+MAX_RESULTS = 10
+MAX_QUERY_LENGTH = 100
+# sorts after every character, so prefix + it bounds all strings starting with prefix
+_MAX_CHAR = '\U0010ffff'
+
+
+def _prefix(field, prefix):
+    """Q for field starting with prefix, as typed or capitalized, as index ranges"""
+    variants = {prefix, prefix[:1].upper() + prefix[1:]}
+    return reduce(or_, (Q(**{f'{field}__gte': variant, f'{field}__lt': variant + _MAX_CHAR})
+                        for variant in sorted(variants)))
+
+
+def authors(query, limit=MAX_RESULTS):
+    """
+        Authors whose last or first name starts with the query; with two words,
+        one must start the last name and the other the first name
+        @param query        : text typed so far
+        @param limit        : most authors returned
+        @return             : (list of authors in name order, whether more matched)
+    """
+    words = re.findall(r'\w[\w\'-]*', query[:MAX_QUERY_LENGTH])[:2]
+    if not words:
+        return [], False
+    if len(words) == 1:
+        condition = _prefix('last_name', words[0]) | _prefix('first_name', words[0])
+    else:
+        first, second = words
+        condition = ((_prefix('last_name', first) & _prefix('first_name', second))
+                     | (_prefix('first_name', first) & _prefix('last_name', second)))
+    matches = list(Author.objects.filter(condition).order_by('last_name', 'first_name', 'id')
+                   .only('first_name', 'last_name')[:limit + 1])
+    return matches[:limit], len(matches) > limit
@@ -0,0 +1,141 @@
+"""
+    Cache helpers: versioned keys for template fragments, the anonymous page
+    cache with per-group purging, and hit/miss counters for monitoring
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_http_date_safe
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+STATS_NAMES_KEY = 'cache-stats:names'
+
+
+def object_version(obj):
+    """Version number of a catalog object, taken from its signal-maintained last_modified"""
+    return int(obj.last_modified.timestamp() * 1000000)
+
+
+def fragment_key(name, obj, *vary_on):
+    key = f'fragment:{name}:{obj._meta.label_lower}:{obj.pk}:{object_version(obj)}'
+    return ':'.join([key] + [str(value) for value in vary_on])
+
+
+def record(name, hit):
+    """Count a hit or miss for the named cache"""
+    key = f'cache-stats:{name}:{"hits" if hit else "misses"}'
+    if cache.add(key, 1, timeout=None):
+        names = cache.get(STATS_NAMES_KEY, set())
+        if name not in names:
+            cache.set(STATS_NAMES_KEY, names | {name}, timeout=None)
+    else:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # evicted between add() and incr()
+            cache.add(key, 1, timeout=None)
+
+
+def stats():
+    """
+        Hit and miss counts of every cache that recorded any
+        @return             : dict of name to {'hits': n, 'misses': n}
+    """
+    names = sorted(cache.get(STATS_NAMES_KEY, set()))
+    counts = cache.get_many([f'cache-stats:{name}:{kind}' for name in names for kind in ('hits', 'misses')])
+    return {name: {kind: counts.get(f'cache-stats:{name}:{kind}', 0) for kind in ('hits', 'misses')}
+            for name in names}
+
+
+# group every cached page belongs to
+ALL_PAGES = 'all'
+
+
+def _generation_key(group):
+    return f'page-generation:{group}'
+
+
+def purge_pages(groups):
+    """
+        Drop the cached pages of the given groups, e.g. 'books' or 'book:12'
+        @param groups       : iterable of group names
+    """
+    keys = [_generation_key(group) for group in groups]
+
+    def purge():
+        # a new generation changes the key of every page in the group, old entries are culled
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+    purge()
+    if connection.in_atomic_block:
+        # until the change commits, concurrent requests still read the old rows and may cache
+        # them under the generation just set; a second one once it commits drops those pages
+        transaction.on_commit(purge)
+
+
+def purge_all_pages():
+    """Drop every cached page, e.g. after a replica the pages are read from was refreshed"""
+    purge_pages([ALL_PAGES])
+
+
+def generation(groups):
+    """
+        Current generation of the given groups and ALL_PAGES, for keys of other
+        cached data purged along with those pages
+        @return             : string that changes whenever one of the groups is purged
+    """
+    keys = [_generation_key(group) for group in [ALL_PAGES] + list(groups)]
+    generations = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        generations.update(missing)
+    return '|'.join(generations[key] for key in keys)
+
+
+def _page_key(request, groups):
+    data = f'{request.get_full_path()}|{generation(groups)}'
+    return 'page:' + hashlib.md5(data.encode()).hexdigest()
+
+
+def _is_anonymous(request):
+    # without a session cookie the visitor cannot be logged in, no session lookup needed
+    return settings.SESSION_COOKIE_NAME not in request.COOKIES and 'HTTP_AUTHORIZATION' not in request.META
+
+
+def cache_anonymous_page(*groups):
+    """
+        Class decorator caching a view's pages for anonymous visitors until one
+        of the page's groups is purged. Groups are formatted with the URL
+        kwargs, e.g. cache_anonymous_page('book:{pk}').
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or not _is_anonymous(request):
+                return view(request, *args, **kwargs)
+            key = _page_key(request, [group.format(**kwargs) for group in groups])
+            cached = cache.get(key)
+            record('pages', hit=cached is not None)
+            if cached is not None:
+                last_modified = parse_http_date_safe(cached.get('Last-Modified'))
+                return get_conditional_response(request, etag=cached.get('ETag'), last_modified=last_modified,
+                                                response=cached)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                if hasattr(response, 'render') and callable(response.render) and not response.is_rendered:
+                    response.add_post_render_callback(lambda rendered: cache.set(key, rendered, timeout=None))
+                else:
+                    cache.set(key, response, timeout=None)
+            return response
+
+        return wrapped
+
+    return method_decorator(decorator, name='dispatch')
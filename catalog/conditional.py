@@ -0,0 +1,87 @@
+"""
+    Conditional GET for catalog pages: ETag and Last-Modified are computed from
+    last_modified with a single query, so unchanged pages are answered with 304
+    before any rendering happens. Lists also take the time a row was last
+    deleted, as a deletion leaves the newest last_modified as it was.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+
+def _memoized(request, key, compute):
+    # condition() asks for the ETag and Last-Modified separately, run the query once
+    versions = request.__dict__.setdefault('_catalog_versions', {})
+    if key not in versions:
+        versions[key] = compute()
+    return versions[key]
+
+
+def _etag(request, version):
+    if version is None:
+        return None
+    # pages show the user and their permissions, so they vary per user as well
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else 0
+    data = f'{request.get_full_path()}|{version.isoformat()}|{user_id}'
+    return hashlib.md5(data.encode()).hexdigest()
+
+
+def _last_modified(request, version):
+    # Last-Modified cannot tell users apart, so only anonymous pages get it
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return None
+    return version
+
+
+def detail_condition(model):
+    """Class decorator for a DetailView answering conditional GETs from the object's last_modified"""
+
+    def version(request, pk):
+        return _memoized(request, (model, pk), lambda: model.objects.filter(pk=pk)
+                         .values_list('last_modified', flat=True).first())
+
+    return _decorate(lambda request, *args, **kwargs: version(request, kwargs['pk']))
+
+
+def _deleted_key(model):
+    return f'list-deleted:{model._meta.label_lower}'
+
+
+def mark_deleted(model):
+    """Record that rows of model were deleted, changing the version of its lists"""
+    cache.set(_deleted_key(model), timezone.now(), timeout=None)
+
+
+def list_condition(model):
+    """Class decorator for a ListView answering conditional GETs from the newest last_modified or deletion"""
+
+    def compute():
+        latest = model.objects.aggregate(latest=Max('last_modified'))['latest']
+        # an evicted mark counts as a deletion now, which only costs one full response
+        deleted = cache.get_or_set(_deleted_key(model), timezone.now, timeout=None)
+        return deleted if latest is None else max(latest, deleted)
+
+    def version(request, *args, **kwargs):
+        return _memoized(request, model, compute)
+
+    return _decorate(version)
+
+
+def _decorate(version):
+    decorator = condition(
+        etag_func=lambda request, *args, **kwargs: _etag(request, version(request, *args, **kwargs)),
+        last_modified_func=lambda request, *args, **kwargs: _last_modified(request, version(request, *args, **kwargs)),
+    )
+
+    def decorate(view_class):
+        view_class = method_decorator(decorator, name='dispatch')(view_class)
+        return method_decorator(vary_on_cookie, name='dispatch')(view_class)
+
+    return decorate
@@ -0,0 +1,63 @@
+"""
+    Denormalized record counts for the home page, stored in CatalogCounter and
+    adjusted incrementally by the receivers in catalog.receivers
+"""
+from django.db.models import F
+
+from catalog.models import Author, Book, BookInstance, CatalogCounter
+
+BOOKS = 'books'
+COPIES = 'copies'
+COPIES_AVAILABLE = 'copies_available'
+AUTHORS = 'authors'
+
+
+def _sources():
+    return {
+        BOOKS: Book.objects.all(),
+        COPIES: BookInstance.objects.all(),
+        COPIES_AVAILABLE: BookInstance.objects.filter(status__exact='a'),
+        AUTHORS: Author.objects.all(),
+    }
+
+
+def get_counts():
+    """
+        Read every counter with a single query
+        @return             : dict of counter name to value, missing counters read as 0
+    """
+    counts = dict.fromkeys(_sources(), 0)
+    counts.update(CatalogCounter.objects.values_list('name', 'value'))
+    return counts
+
+
+def increment(name, delta=1):
+    if not delta:
+        return
+    if not CatalogCounter.objects.filter(name=name).update(value=F('value') + delta):
+        # counter row missing, so the full count already includes this change
+        rebuild([name])
+
+
+def rebuild(names=None):
+    """
+        Recount counters from the catalog tables
+        @param names        : counter names to rebuild, all when None
+        @return             : dict of counter name to rebuilt value
+    """
+    sources = _sources()
+    counts = {}
+    for name in names or sources:
+        counts[name] = sources[name].count()
+        CatalogCounter.objects.update_or_create(name=name, defaults={'value': counts[name]})
+    return counts
+
+
+def record_status_change(old_status, new_status, copies=1):
+    """Adjust the available count for copies moving from old_status to new_status"""
+    if old_status == new_status:
+        return
+    if old_status == 'a':
+        increment(COPIES_AVAILABLE, -copies)
+    elif new_status == 'a':
+        increment(COPIES_AVAILABLE, copies)
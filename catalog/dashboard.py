@@ -0,0 +1,224 @@
+"""
+    Circulation dashboard computed with NumPy. refresh() extracts the new
+    LoanEvents and the copies on loan as columns, folds them into arrays kept
+    in a DashboardSnapshot (checkouts per day, checkouts per book, open loans,
+    loan length totals) and stores the resulting metrics. Page loads only
+    read the stored metrics, so no aggregate query ever runs for a visitor.
+"""
+import io
+import json
+from datetime import date
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.models import Book, BookInstance, DashboardSnapshot, Genre, LoanEvent
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SNAPSHOT = 'circulation'
+METRICS_KEY = 'dashboard:metrics'
+METRICS_TIMEOUT = 60 * 5
+# events extracted per query while refreshing
+CHUNK_SIZE = 50000
+TREND_DAYS = 30
+TOP_TITLES = 10
+
+# event kinds as small integers in the extracted columns
+KIND_CODES = {kind: code for code, (kind, _) in enumerate(LoanEvent.EVENT_KINDS)}
+CHECKOUT = KIND_CODES[LoanEvent.CHECKOUT]
+RETURN = KIND_CODES[LoanEvent.RETURN]
+
+
+def is_available():
+    return np is not None
+
+
+def _empty_state():
+    return {
+        'day_base': np.array(0),
+        'day_counts': np.zeros(0, dtype=np.int64),
+        'book_counts': np.zeros(0, dtype=np.int64),
+        'open_copies': np.zeros(0, dtype='U32'),
+        'open_days': np.zeros(0, dtype=np.int64),
+        'length_sum': np.array(0),
+        'length_count': np.array(0),
+    }
+
+
+def _load_state(data):
+    if not data:
+        return _empty_state()
+    with np.load(io.BytesIO(bytes(data)), allow_pickle=False) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+def _dump_state(state):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **state)
+    return buffer.getvalue()
+
+
+def _add_bincount(counts, values):
+    """Add np.bincount(values) to counts, growing it as needed"""
+    added = np.bincount(values)
+    if added.size > counts.size:
+        counts = np.concatenate([counts, np.zeros(added.size - counts.size, dtype=counts.dtype)])
+    counts[:added.size] += added
+    return counts
+
+
+def _add_day_counts(counts, base, days):
+    """Add the days (date ordinals) to counts indexed from base, which moves back to the earliest day"""
+    if not days.size:
+        return counts, base
+    if not counts.size:
+        base = int(days.min())
+    elif days.min() < base:
+        counts = np.concatenate([np.zeros(base - int(days.min()), dtype=counts.dtype), counts])
+        base = int(days.min())
+    return _add_bincount(counts, days - base), base
+
+
+def _extract_events(after, limit):
+    rows = list(LoanEvent.objects.filter(id__gt=after).order_by('id')
+                .values_list('id', 'kind', 'occurred', 'copy_id', 'book_id')[:limit])
+    return (
+        np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((KIND_CODES[row[1]] for row in rows), dtype=np.int8, count=len(rows)),
+        np.fromiter((timezone.localdate(row[2]).toordinal() for row in rows), dtype=np.int64, count=len(rows)),
+        np.array([row[3].hex if row[3] else '' for row in rows], dtype='U32'),
+        np.fromiter((-1 if row[4] is None else row[4] for row in rows), dtype=np.int64, count=len(rows)),
+    )
+
+
+def _apply(state, ids, kinds, days, copies, books):
+    """Fold one chunk of events, in id order, into the state arrays"""
+    checkouts = kinds == CHECKOUT
+    state['day_counts'], base = _add_day_counts(state['day_counts'], int(state['day_base']), days[checkouts])
+    state['day_base'] = np.array(base)
+    state['book_counts'] = _add_bincount(state['book_counts'], books[checkouts & (books >= 0)])
+
+    # pair each return with the latest checkout of its copy: loans still open
+    # from earlier chunks go first, then this chunk's checkouts and returns
+    moves = (kinds == CHECKOUT) | (kinds == RETURN)
+    open_count = state['open_copies'].size
+    all_copies = np.concatenate([state['open_copies'], copies[moves]])
+    all_days = np.concatenate([state['open_days'], days[moves]])
+    all_kinds = np.concatenate([np.full(open_count, CHECKOUT, dtype=np.int8), kinds[moves]])
+    sequence = np.concatenate([np.full(open_count, -1, dtype=np.int64), ids[moves]])
+    order = np.lexsort((sequence, all_copies))
+    all_copies, all_days, all_kinds = all_copies[order], all_days[order], all_kinds[order]
+
+    positions = np.arange(all_kinds.size)
+    last_checkout = np.maximum.accumulate(np.where(all_kinds == CHECKOUT, positions, -1)) \
+        if all_kinds.size else positions
+    returned = (all_kinds == RETURN) & (last_checkout >= 0)
+    returned &= all_copies[np.maximum(last_checkout, 0)] == all_copies
+    lengths = all_days[returned] - all_days[last_checkout[returned]]
+    state['length_sum'] = np.array(int(state['length_sum']) + int(lengths.sum()))
+    state['length_count'] = np.array(int(state['length_count']) + int(returned.sum()))
+
+    # a copy whose latest move is a checkout is still out
+    latest = np.append(all_copies[1:] != all_copies[:-1], True) if all_copies.size else np.zeros(0, dtype=bool)
+    still_out = latest & (all_kinds == CHECKOUT)
+    state['open_copies'] = all_copies[still_out]
+    state['open_days'] = all_days[still_out]
+    return state
+
+
+def _overdue_by_genre(today):
+    loans = list(BookInstance.objects.filter(status__exact='o').values_list('book', 'due_back'))
+    pairs = list(Book.genre.through.objects.values_list('book', 'genre'))
+    books = np.fromiter((-1 if book is None else book for book, _ in loans), dtype=np.int64, count=len(loans))
+    overdue = np.fromiter((due is not None and due < today for _, due in loans), dtype=bool, count=len(loans))
+    pair_books = np.fromiter((book for book, _ in pairs), dtype=np.int64, count=len(pairs))
+    pair_genres = np.fromiter((genre for _, genre in pairs), dtype=np.int64, count=len(pairs))
+
+    size = int(max(books.max(initial=0), pair_books.max(initial=0))) + 1
+    known = books >= 0
+    loans_per_book = np.bincount(books[known], minlength=size)
+    overdue_per_book = np.bincount(books[known & overdue], minlength=size)
+    genres = int(pair_genres.max(initial=0)) + 1
+    # a book in two genres counts toward both
+    on_loan = np.bincount(pair_genres, weights=loans_per_book[pair_books], minlength=genres)
+    late = np.bincount(pair_genres, weights=overdue_per_book[pair_books], minlength=genres)
+
+    names = dict(Genre.objects.values_list('pk', 'name'))
+    rows = [{'genre': names.get(pk, '?'), 'on_loan': int(on_loan[pk]), 'overdue': int(late[pk]),
+             'rate': float(late[pk] / on_loan[pk])} for pk in map(int, np.flatnonzero(on_loan))]
+    rows.sort(key=lambda row: (-row['rate'], row['genre']))
+    return {'rows': rows, 'on_loan': int(known.sum()), 'overdue': int(overdue.sum())}
+
+
+def _metrics(state, today):
+    base, day_counts = int(state['day_base']), state['day_counts']
+    trend = []
+    for ordinal in range(today.toordinal() - TREND_DAYS + 1, today.toordinal() + 1):
+        index = ordinal - base
+        trend.append((date.fromordinal(ordinal), int(day_counts[index]) if 0 <= index < day_counts.size else 0))
+
+    book_counts = state['book_counts']
+    top = [int(pk) for pk in np.argsort(-book_counts, kind='stable')[:TOP_TITLES] if book_counts[pk]]
+    titles = Book.objects.in_bulk(top)
+    length_count = int(state['length_count'])
+    return {
+        'loans_per_day': trend,
+        'average_loan_days': int(state['length_sum']) / length_count if length_count else None,
+        'completed_loans': length_count,
+        'open_loans': int(state['open_copies'].size),
+        'busiest_titles': [{'id': pk, 'title': titles[pk].title if pk in titles else '?',
+                            'loans': int(book_counts[pk])} for pk in top],
+        'overdue': _overdue_by_genre(today),
+    }
+
+
+def refresh(today=None, chunk_size=CHUNK_SIZE):
+    """
+        Fold the LoanEvents written since the last refresh into the snapshot
+        and recompute the metrics
+        @return             : (metrics, number of events folded in)
+    """
+    if not is_available():
+        raise RuntimeError('The circulation dashboard needs NumPy')
+    today = today or timezone.localdate()
+    folded = 0
+    with transaction.atomic():
+        snapshot, _ = DashboardSnapshot.objects.select_for_update().get_or_create(name=SNAPSHOT)
+        state = _load_state(snapshot.state)
+        while True:
+            ids, *columns = _extract_events(snapshot.last_event_id, chunk_size)
+            if not ids.size:
+                break
+            state = _apply(state, ids, *columns)
+            snapshot.last_event_id = int(ids[-1])
+            folded += ids.size
+        snapshot.state = _dump_state(state)
+        snapshot.metrics = json.dumps(_metrics(state, today), cls=DjangoJSONEncoder)
+        snapshot.save()
+    # the same form metrics() reads back
+    metrics = json.loads(snapshot.metrics)
+    metrics['refreshed'] = snapshot.refreshed
+    cache.set(METRICS_KEY, metrics, METRICS_TIMEOUT)
+    return metrics, folded
+
+
+def metrics():
+    """
+        Dashboard metrics as of the last refresh, from the cache or the snapshot row
+        @return             : dict of metrics, None before the first refresh
+    """
+    result = cache.get(METRICS_KEY)
+    if result is None:
+        snapshot = DashboardSnapshot.objects.filter(name=SNAPSHOT).only('metrics', 'refreshed').first()
+        if snapshot is None:
+            return None
+        result = json.loads(snapshot.metrics)
+        result['refreshed'] = snapshot.refreshed
+        cache.set(METRICS_KEY, result, METRICS_TIMEOUT)
+    return result
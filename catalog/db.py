@@ -0,0 +1,91 @@
+"""
+    Connection setup: SQLite pragmas applied to every new connection, and a
+    health check that drops broken persistent connections before a request
+    uses them. Both are wired up in catalog.receivers.
+
+    settings.SQLITE_PRAGMAS holds the pragmas for every SQLite database; a
+    database's own PRAGMAS entry in DATABASES is merged over them. A
+    database's CONN_HEALTH_CHECKS entry turns the health check on, and its
+    TRANSACTION_MODE entry sets how SQLite transactions begin, as the
+    settings of those names do in later Django versions.
+"""
+import re
+import types
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+_NAME = re.compile(r'[a-z_]+')
+_VALUE = re.compile(r'-?\d+|[A-Za-z]+')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def pragmas_for(connection):
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    pragmas.update(connection.settings_dict.get('PRAGMAS', {}))
+    return pragmas
+
+
+def apply_pragmas(connection):
+    """Run the configured PRAGMA statements on a new SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas_for(connection).items():
+            # pragmas take no query parameters, so only plain names and values are let through
+            if not _NAME.fullmatch(name) or not _VALUE.fullmatch(str(value)):
+                raise ValueError(f'Invalid SQLite pragma {name}={value!r}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def _begin(mode):
+    def start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {mode}')
+
+    return start_transaction_under_autocommit
+
+
+def set_transaction_mode(connection):
+    """
+        Begin the SQLite connection's atomic blocks in its TRANSACTION_MODE.
+        A deferred transaction that reads before it writes fails at once with
+        'database is locked' when another connection committed in between,
+        busy_timeout or not; IMMEDIATE takes the write lock up front and waits.
+    """
+    mode = connection.settings_dict.get('TRANSACTION_MODE')
+    if connection.vendor != 'sqlite' or not mode:
+        return
+    if mode not in TRANSACTION_MODES:
+        raise ValueError(f'Invalid SQLite transaction mode {mode!r}')
+    connection._start_transaction_under_autocommit = types.MethodType(_begin(mode), connection)
+
+
+def _is_healthy(connection):
+    if connection.vendor != 'sqlite':
+        return connection.is_usable()
+    # the SQLite backend's is_usable() does not look at the connection
+    try:
+        connection.connection.execute('SELECT 1')
+    except Exception:
+        return False
+    return True
+
+
+def check_connections():
+    """
+        Close open persistent connections that fail a trivial query, so the
+        request opens a fresh one instead of erroring
+        @return             : aliases of the connections closed
+    """
+    closed = []
+    for connection in connections.all():
+        if connection.connection is None or not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if connection.in_atomic_block or _is_healthy(connection):
+            continue
+        try:
+            connection.close()
+        except DatabaseError:
+            connection.connection = None
+        closed.append(connection.alias)
+    return closed
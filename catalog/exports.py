@@ -0,0 +1,80 @@
+"""
+    Streaming CSV/JSONL exports of loans, copies and the catalog. Rows are read
+    with server-side chunked iteration and written line by line, so an export
+    never holds a whole table in memory.
+"""
+import csv
+from datetime import date
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from catalog.models import Book, BookInstance
+
+CHUNK_SIZE = 2000
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+def _loan_rows():
+    today = date.today()
+    loans = BookInstance.objects.filter(status__exact='o').order_by('due_back', 'borrower', 'book')\
+        .values_list('id', 'book__title', 'book__isbn', 'borrower__username', 'due_back')
+    for copy_id, title, isbn, borrower, due_back in loans.iterator(chunk_size=CHUNK_SIZE):
+        yield copy_id, title, isbn, borrower, due_back, bool(due_back and due_back < today)
+
+
+def _copy_rows():
+    copies = BookInstance.objects.order_by('book', 'id')\
+        .values_list('id', 'book__title', 'book__isbn', 'imprint', 'status', 'due_back', 'borrower__username')
+    return copies.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _catalog_rows():
+    # iterator() cannot prefetch, so walk books in pk order and fetch each chunk's genres in one query
+    books = Book.objects.order_by('pk')\
+        .values_list('pk', 'title', 'author__last_name', 'author__first_name', 'isbn', 'language__name', 'summary')
+    last_pk = 0
+    while True:
+        chunk = list(books.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        genres = {}
+        for book_id, name in Book.genre.through.objects.filter(book_id__in=[row[0] for row in chunk])\
+                .order_by('genre__name').values_list('book_id', 'genre__name'):
+            genres.setdefault(book_id, []).append(name)
+        for pk, title, last_name, first_name, isbn, language, summary in chunk:
+            author = f'{last_name}, {first_name}' if last_name is not None else None
+            yield pk, title, author, isbn, language, ';'.join(genres.get(pk, [])), summary
+        last_pk = chunk[-1][0]
+
+
+EXPORTS = {
+    'loans': (('id', 'title', 'isbn', 'borrower', 'due_back', 'overdue'), _loan_rows),
+    'copies': (('id', 'title', 'isbn', 'imprint', 'status', 'due_back', 'borrower'), _copy_rows),
+    'catalog': (('id', 'title', 'author', 'isbn', 'language', 'genre', 'summary'), _catalog_rows),
+}
+
+
+class _Echo:
+    """File-like object that hands written values straight back, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def stream(kind, fmt):
+    """
+        Generate the lines of an export
+        @param kind         : one of EXPORTS
+        @param fmt          : one of FORMATS
+        @return             : iterator of text lines, header first for csv
+    """
+    columns, rows = EXPORTS[kind]
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows():
+            yield writer.writerow(row)
+    else:
+        encoder = DjangoJSONEncoder()
+        for row in rows():
+            yield encoder.encode(dict(zip(columns, row))) + '\n'
@@ -0,0 +1,75 @@
+"""
+    Facets of the book list: filtering by genre, language and author, and the
+    number of matching books per value. Each facet is counted with one grouped
+    query over the filtered books, and the counts are cached per filter
+    combination until the receivers purge the 'facets' page group.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from catalog import caching
+from catalog.models import Book
+
+# query parameter and lookup of each facet, in display order
+FACETS = ('genre', 'language', 'author')
+# values shown per facet, most books first
+FACET_LIMIT = 20
+FACET_TIMEOUT = 60 * 60 * 24
+# page group purged whenever a book's genres, language or author change
+GROUP = 'facets'
+
+
+def parse_filters(params):
+    """
+        Facet filters of a request
+        @param params       : QueryDict such as request.GET
+        @return             : dict of facet name to id, values that are not ids are ignored
+    """
+    filters = {}
+    for name in FACETS:
+        value = params.get(name, '')
+        if value.isdigit():
+            filters[name] = int(value)
+    return filters
+
+
+def filter_books(queryset, filters):
+    # one value per facet, so the genre join cannot duplicate books
+    return queryset.filter(**filters)
+
+
+def _counts(filters):
+    books = filter_books(Book.objects.all(), filters).order_by().values('pk')
+    genres = (Book.genre.through.objects.filter(book__in=books)
+              .values_list('genre', 'genre__name').annotate(books=Count('book'))
+              .order_by('-books', 'genre__name'))
+    languages = (filter_books(Book.objects.all(), filters).filter(language__isnull=False)
+                 .values_list('language', 'language__name').annotate(books=Count('pk'))
+                 .order_by('-books', 'language__name'))
+    authors = (filter_books(Book.objects.all(), filters).filter(author__isnull=False)
+               .values_list('author', 'author__last_name', 'author__first_name').annotate(books=Count('pk'))
+               .order_by('-books', 'author__last_name', 'author__first_name'))
+    return {
+        'genre': [(pk, name, count) for pk, name, count in genres[:FACET_LIMIT]],
+        'language': [(pk, name, count) for pk, name, count in languages[:FACET_LIMIT]],
+        'author': [(pk, f'{last_name}, {first_name}', count)
+                   for pk, last_name, first_name, count in authors[:FACET_LIMIT]],
+    }
+
+
+def counts(filters):
+    """
+        Book counts per facet value among the books matching filters
+        @param filters      : dict from parse_filters
+        @return             : dict of facet name to [(id, label, books)], at most FACET_LIMIT each
+    """
+    data = '|'.join([caching.generation([GROUP])] + [f'{name}={filters[name]}' for name in sorted(filters)])
+    key = 'facets:' + hashlib.md5(data.encode()).hexdigest()
+    result = cache.get(key)
+    caching.record('facets', hit=result is not None)
+    if result is None:
+        result = _counts(filters)
+        cache.set(key, result, FACET_TIMEOUT)
+    return result
@@ -1,10 +1,47 @@
 from datetime import date, timedelta
 from django import forms
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from django.utils.translation import ugettext_lazy as _
 
 
-from catalog.models import BookInstance
+from catalog.models import Author, Book, BookInstance
+
+
+class AutocompleteWidget(forms.Widget):
+    """
+        Text box that looks up choices from a JSON endpoint as the user types,
+        storing the chosen id in a hidden input. Unlike a select it never
+        renders the whole table, only the current choice.
+    """
+    template_name = 'catalog/widgets/autocomplete.html'
+
+    class Media:
+        js = ['js/autocomplete.js']
+
+    def __init__(self, model, url, attrs=None):
+        super().__init__(attrs)
+        self.model = model
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        try:
+            # a re-rendered invalid form passes the raw submitted value
+            pk = self.model._meta.pk.to_python(value)
+        except ValidationError:
+            pk = None
+        selected = self.model._default_manager.filter(pk=pk).first() if pk is not None else None
+        context['widget'].update({'url': str(self.url), 'label': str(selected) if selected else ''})
+        return context
+
+
+class BookForm(forms.ModelForm):
+    class Meta:
+        model = Book
+        fields = '__all__'
+        widgets = {'author': AutocompleteWidget(Author, reverse_lazy('author-autocomplete'))}
 
 
 class RenewBookForm(forms.Form):
@@ -36,3 +73,23 @@ class RenewBookModelForm(forms.ModelForm):
         # labels = {'due_back': _('New renewal date')}
         help_texts = {'due_back': _('Enter a date between now and 4 weeks (default 3).')}
 
+
+
+class CheckoutForm(forms.Form):
+    borrower = forms.CharField(max_length=150, help_text='Username of the patron borrowing the copy.')
+    due_back = forms.DateField(required=True, help_text='Enter a date between now and 4 weeks (default 3).')
+
+    def clean_borrower(self):
+        username = self.cleaned_data['borrower']
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise ValidationError(_('Unknown borrower %(username)s'), params={'username': username})
+
+    def clean_due_back(self):
+        data = self.cleaned_data['due_back']
+        if data < date.today():
+            raise ValidationError(_('Invalid date - due date in past'))
+        if data > date.today() + timedelta(weeks=4):
+            raise ValidationError(_('Invalid date - due date more than 4 weeks ahead'))
+        return data
@@ -0,0 +1,107 @@
+"""
+    Loan history: catalog.loans appends a LoanEvent per copy for every
+    operation, and rollup() folds new events into the daily and monthly
+    count tables that the circulation report reads.
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from catalog.models import DailyLoanStat, LoanEvent, MonthlyLoanStat, RollupWatermark
+
+ROLLUP_BATCH = 10000
+WATERMARK = 'loan-events'
+
+
+def record(kind, copies):
+    """
+        Append one event per copy with a single INSERT ... SELECT, taking the
+        book, borrower and due date from the copy rows as they stand
+        @param kind         : LoanEvent kind
+        @param copies       : BookInstance queryset, read inside the caller's transaction
+        @return             : number of events written
+    """
+    using = router.db_for_write(LoanEvent)
+    connection = connections[using]
+    select, params = copies.using(using).order_by()\
+        .values_list('id', 'book_id', 'borrower_id', 'due_back').query.sql_with_params()
+    occurred = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {connection.ops.quote_name(LoanEvent._meta.db_table)} '
+            f'(occurred, kind, copy_id, book_id, patron_id, due_back) '
+            f'SELECT %s, %s, copies.id, copies.book_id, copies.borrower_id, copies.due_back FROM ({select}) copies',
+            (occurred, kind) + tuple(params))
+        return cursor.rowcount
+
+
+def _add(model, counts, **key):
+    for kind, count in counts.items():
+        if not model.objects.filter(kind=kind, **key).update(count=F('count') + count):
+            model.objects.create(kind=kind, count=count, **key)
+
+
+def _rollup_batch(batch_size):
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        pending = LoanEvent.objects.filter(id__gt=watermark.last_id).order_by('id')
+        upper = pending.values_list('id', flat=True)[batch_size - 1:batch_size].first() \
+            or pending.aggregate(last=Max('id'))['last']
+        if upper is None:
+            return 0
+        # SQLite commits writers one at a time, so no event with a lower id can still appear
+        days = (pending.filter(id__lte=upper).annotate(day=TruncDate('occurred'))
+                .order_by().values_list('day', 'kind').annotate(events=Count('id')))
+        daily, monthly = {}, {}
+        for day, kind, events in days:
+            daily.setdefault(day, Counter())[kind] += events
+            monthly.setdefault(day.replace(day=1), Counter())[kind] += events
+        for day, counts in daily.items():
+            _add(DailyLoanStat, counts, day=day)
+        for month, counts in monthly.items():
+            _add(MonthlyLoanStat, counts, month=month)
+        rolled_up = sum(sum(counts.values()) for counts in daily.values())
+        watermark.last_id = upper
+        watermark.save()
+    return rolled_up
+
+
+def rollup(batch_size=ROLLUP_BATCH):
+    """
+        Add the events written since the last run to the daily and monthly
+        counts, one transaction per batch so an interrupted run loses nothing
+        @return             : number of events rolled up
+    """
+    total = 0
+    while True:
+        rolled_up = _rollup_batch(batch_size)
+        if not rolled_up:
+            return total
+        total += rolled_up
+
+
+def _table(stats, period):
+    rows = {}
+    for stat in stats:
+        rows.setdefault(getattr(stat, period), {})[stat.kind] = stat.count
+    return [{period: key, 'counts': [rows[key].get(kind, 0) for kind, _ in LoanEvent.EVENT_KINDS]}
+            for key in sorted(rows, reverse=True)]
+
+
+def report(months=12, days=31, today=None):
+    """
+        Circulation counts from the rollup tables, never the raw events
+        @return             : dict with 'kinds' headings and 'monthly' and 'daily' rows, newest first
+    """
+    today = today or timezone.localdate()
+    year, month = divmod(today.year * 12 + today.month - months, 12)
+    first_month = date(year, month + 1, 1)
+    return {
+        'kinds': [label for _, label in LoanEvent.EVENT_KINDS],
+        'monthly': _table(MonthlyLoanStat.objects.filter(month__gte=first_month), 'month'),
+        'daily': _table(DailyLoanStat.objects.filter(day__gt=today - timedelta(days=days)), 'day'),
+    }
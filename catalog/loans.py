@@ -0,0 +1,263 @@
+"""
+    Loan state machine for book copies. Every operation is a single
+    conditional UPDATE ... WHERE status = ..., so of two requests racing for
+    the same copy exactly one succeeds, and no row stays locked meanwhile.
+
+        available --checkout--> on loan --return--> available
+        available --reserve--> reserved --checkout by the same patron--> on loan
+        on loan --renew--> on loan
+        on loan --return, book has holds--> reserved for the head of the queue
+        reserved --pickup deadline passed--> reserved for the next hold, or available
+
+    Patrons who find no copy available wait in the book's Hold queue; a
+    returned copy goes to the oldest hold, found through the (book, id) index.
+
+    Every operation also appends LoanEvents (catalog.history) in the same
+    transaction, so the history has exactly the operations that happened.
+"""
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+
+from catalog import history
+from catalog.models import BookInstance, Hold, LoanEvent
+
+LOAN_PERIOD = timedelta(weeks=3)
+# time a patron has to collect a reserved copy, kept in due_back as the pickup deadline
+PICKUP_PERIOD = timedelta(weeks=1)
+# available copies tried by reserve_for_book when others are taken first
+RESERVE_ATTEMPTS = 5
+# copies per bulk renewal, keeping its single UPDATE within SQLite's parameter limit
+MAX_BULK_RENEWALS = 500
+# how a conflict message describes a copy's current status
+STATUS_PHRASES = {
+    'm': 'in maintenance',
+    'o': 'on loan',
+    'a': 'available',
+    'r': 'reserved',
+}
+
+
+class LoanConflict(Exception):
+    """A copy was not in the status an operation starts from, usually because another request changed it"""
+
+    def __init__(self, copy_id, action, status):
+        self.copy_id = copy_id
+        self.action = action
+        self.status = status
+        super().__init__(f'Cannot {action} copy {copy_id}: it is {STATUS_PHRASES.get(status, "without a status")}.')
+
+
+class AlreadyHolding(Exception):
+    """A patron asked for a book they already have reserved, on loan or a hold on"""
+
+
+def _transition(copy_id, action, old_status, **changes):
+    if BookInstance.objects.filter(pk=copy_id).transition(old_status, **changes):
+        return
+    # only a failed transition pays for reading the current status
+    status = BookInstance.objects.filter(pk=copy_id).values_list('status', flat=True).first()
+    if status is None:
+        raise BookInstance.DoesNotExist(f'No copy {copy_id}')
+    raise LoanConflict(copy_id, action, status)
+
+
+def checkout(copy_id, borrower, due_back=None):
+    """
+        Lend an available copy, or a copy reserved for this borrower
+        @param copy_id      : copy UUID
+        @param borrower     : User borrowing the copy
+        @param due_back     : due date, LOAN_PERIOD from today by default
+        @raise LoanConflict : the copy is on loan, in maintenance or reserved for someone else
+    """
+    changes = {'status': 'o', 'borrower': borrower, 'due_back': due_back or date.today() + LOAN_PERIOD}
+    with transaction.atomic():
+        if not BookInstance.objects.filter(pk=copy_id, borrower=borrower).transition('r', **changes):
+            _transition(copy_id, 'check out', 'a', **changes)
+        history.record(LoanEvent.CHECKOUT, BookInstance.objects.filter(pk=copy_id))
+
+
+def return_copy(copy_id):
+    """
+        Take back a copy on loan: it is reserved for the first patron in its
+        book's queue, or put back on the shelf when nobody is waiting
+        @return             : the Hold the copy was allocated to, or None
+    """
+    book_id = BookInstance.objects.filter(pk=copy_id).values_list('book', flat=True).first()
+    with transaction.atomic():
+        # recorded before the update, which clears the borrower; a conflict rolls it back
+        history.record(LoanEvent.RETURN, BookInstance.objects.filter(pk=copy_id, status__exact='o'))
+        hold = _claim_head(book_id)
+        if hold is None:
+            _transition(copy_id, 'return', 'o', status='a', borrower=None, due_back=None)
+        else:
+            # a conflict rolls the claimed hold back into the queue
+            _transition(copy_id, 'return', 'o', status='r', borrower=hold.patron_id,
+                        due_back=date.today() + PICKUP_PERIOD)
+            history.record(LoanEvent.RESERVE, BookInstance.objects.filter(pk=copy_id))
+    return hold
+
+
+def _claim_head(book_id):
+    """Remove and return the oldest hold on a book, or None when its queue is empty"""
+    while book_id is not None:
+        hold = Hold.objects.filter(book_id=book_id).order_by('id').first()
+        if hold is None:
+            return None
+        # deleting is the claim: a concurrent return that got there first deletes nothing
+        if Hold.objects.filter(pk=hold.pk).delete()[0]:
+            return hold
+    return None
+
+
+def return_copies(copies):
+    """
+        Return every copy of a queryset that is on loan. Copies of books
+        nobody is waiting for go back in one UPDATE, the others one at a time
+        through the queue.
+        @return             : number of copies returned
+    """
+    on_loan = copies.filter(status__exact='o')
+    waited_for = Hold.objects.values('book')
+    returned = 0
+    for copy_id in on_loan.filter(book__in=waited_for).values_list('pk', flat=True):
+        try:
+            return_copy(copy_id)
+        except LoanConflict:
+            continue
+        returned += 1
+    shelved = on_loan.exclude(book__in=waited_for)
+    with transaction.atomic():
+        # the same rows the UPDATE matches, read before it clears the borrowers
+        history.record(LoanEvent.RETURN, shelved)
+        return returned + shelved.transition('o', status='a', borrower=None, due_back=None)
+
+
+def renew(copy_id, due_back):
+    """Move the due date of a copy on loan"""
+    with transaction.atomic():
+        _transition(copy_id, 'renew', 'o', due_back=due_back)
+        history.record(LoanEvent.RENEW, BookInstance.objects.filter(pk=copy_id))
+
+
+def renew_many(copy_ids, due_back):
+    """
+        Move the due date of every copy on loan among copy_ids with one UPDATE
+        @param copy_ids     : copy UUIDs, at most MAX_BULK_RENEWALS
+        @param due_back     : new due date
+        @return             : list of {'id', 'renewed', 'status'} in copy_ids order, status is
+                              None for unknown copies
+    """
+    if len(copy_ids) > MAX_BULK_RENEWALS:
+        raise ValueError(f'At most {MAX_BULK_RENEWALS} copies can be renewed at once')
+    copies = BookInstance.objects.filter(pk__in=copy_ids)
+    with transaction.atomic():
+        copies.transition('o', due_back=due_back)
+        # every copy still on loan was renewed by the UPDATE
+        history.record(LoanEvent.RENEW, copies.filter(status__exact='o'))
+    # copies that were not on loan kept their status, so one read tells them apart
+    current = {pk: (status, due) for pk, status, due in copies.values_list('pk', 'status', 'due_back')}
+    results = []
+    for copy_id in copy_ids:
+        status, due = current.get(copy_id, (None, None))
+        results.append({'id': copy_id, 'renewed': status == 'o' and due == due_back, 'status': status})
+    return results
+
+
+def reserve(copy_id, patron):
+    """Hold an available copy for patron until it is checked out to them, or its pickup deadline"""
+    with transaction.atomic():
+        _transition(copy_id, 'reserve', 'a', status='r', borrower=patron, due_back=date.today() + PICKUP_PERIOD)
+        history.record(LoanEvent.RESERVE, BookInstance.objects.filter(pk=copy_id))
+
+
+def reserve_for_book(book, patron):
+    """
+        Reserve any available copy of a book
+        @return             : UUID of the reserved copy, or None if no copy was available
+    """
+    candidates = BookInstance.objects.filter(book=book, status__exact='a').values_list('pk', flat=True)
+    for copy_id in candidates[:RESERVE_ATTEMPTS]:
+        try:
+            reserve(copy_id, patron)
+        except LoanConflict:
+            # taken by a concurrent request, try the next one
+            continue
+        return copy_id
+    return None
+
+
+def place_hold(book, patron):
+    """
+        Reserve an available copy of a book for patron, or queue them for the next returned one
+        @return             : (UUID of the reserved copy, None) or (None, the Hold)
+        @raise AlreadyHolding : patron already has a copy reserved or on loan, or a hold on the book
+    """
+    # one transaction, so with SQLite's BEGIN IMMEDIATE a patron's repeated requests run one after the other
+    with transaction.atomic():
+        if BookInstance.objects.filter(book=book, borrower=patron, status__in=['o', 'r']).exists() \
+                or Hold.objects.filter(book=book, patron=patron).exists():
+            raise AlreadyHolding(f'{patron} already has {book} reserved, on loan or on hold')
+        copy_id = reserve_for_book(book, patron)
+        if copy_id:
+            return copy_id, None
+        try:
+            with transaction.atomic():
+                hold = Hold.objects.create(book=book, patron=patron)
+        except IntegrityError:
+            raise AlreadyHolding(f'{patron} is already waiting for {book}')
+    # a copy returned while the queue was still empty went to the shelf rather than to this hold
+    copy_id = reserve_for_book(book, patron)
+    if copy_id:
+        hold.delete()
+        return copy_id, None
+    return None, hold
+
+
+def expire_reservations(today=None):
+    """
+        Release the reserved copies not collected by their pickup deadline. A
+        copy of a book with holds goes to the head of its queue, the others go
+        back on the shelf in one UPDATE.
+        @return             : number of reservations expired
+    """
+    today = today or date.today()
+    expired = BookInstance.objects.filter(status__exact='r', due_back__lt=today)
+    waited_for = Hold.objects.values('book')
+    released = 0
+    for copy_id, book_id in expired.filter(book__in=waited_for).values_list('pk', 'book'):
+        with transaction.atomic():
+            hold = _claim_head(book_id)
+            if hold is None:
+                changes = {'status': 'a', 'borrower': None, 'due_back': None}
+            else:
+                changes = {'borrower': hold.patron_id, 'due_back': today + PICKUP_PERIOD}
+            if not expired.filter(pk=copy_id).transition('r', **changes):
+                # collected meanwhile; rolls the claimed hold back into the queue
+                transaction.set_rollback(True)
+                continue
+            if hold is not None:
+                history.record(LoanEvent.RESERVE, BookInstance.objects.filter(pk=copy_id))
+        released += 1
+    with transaction.atomic():
+        return released + expired.exclude(book__in=waited_for).transition('r', status='a', borrower=None,
+                                                                          due_back=None)
+
+
+def cancel_hold(hold_id, patron):
+    """Leave a queue; returns False if the hold was already allocated or cancelled"""
+    return bool(Hold.objects.filter(pk=hold_id, patron=patron).delete()[0])
+
+
+def queue_position(hold):
+    """1-based place of a hold in its book's queue, counted on the (book, id) index"""
+    return Hold.objects.filter(book_id=hold.book_id, id__lte=hold.id).count()
+
+
+def holds_with_positions(patron):
+    """A patron's holds, each annotated with its queue position in the same query"""
+    ahead = Hold.objects.filter(book=OuterRef('book'), id__lte=OuterRef('id'))\
+        .order_by().values('book').annotate(count=Count('id')).values('count')
+    return Hold.objects.filter(patron=patron).select_related('book')\
+        .annotate(position=Subquery(ahead, output_field=IntegerField())).order_by('id')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from catalog import loans
+
+
+class Command(BaseCommand):
+    help = ('Release reserved copies not collected by their pickup deadline to the next patron in the queue, '
+            'or back to the shelf')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Expired {loans.expire_reservations()} reservations')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from catalog import exports
+
+
+class Command(BaseCommand):
+    help = 'Stream loans, copies or the whole catalog as CSV or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', dest='fmt', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('-o', '--output', help='file to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        lines = exports.stream(options['kind'], options['fmt'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
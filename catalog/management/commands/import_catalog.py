@@ -0,0 +1,301 @@
+import csv
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from catalog import caching, counters, facets, search, versions
+from catalog.models import Author, Book, BookInstance, Genre, Language, author_sort_key
+
+# marks a record that a dry run would have created
+PENDING = object()
+# primary keys per UPDATE when dating pages that gained imported rows
+TOUCH_BATCH = 500
+
+
+def read_records(path):
+    """Stream dicts from a .csv file (with a header row) or a .jsonl file (one object per line)"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as file:
+        if extension == '.csv':
+            yield from csv.DictReader(file)
+        elif extension in ('.jsonl', '.ndjson'):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise CommandError(f'{path}: expected a .csv or .jsonl file')
+
+
+def author_key(value):
+    """Split an author written as 'Last, First' into the (last_name, first_name) lookup key"""
+    last_name, _, first_name = (value or '').partition(',')
+    return last_name.strip(), first_name.strip()
+
+
+class ChunkedTransaction:
+    """Commit every `size` rows instead of holding one transaction for the whole file"""
+
+    def __init__(self, size):
+        self.size = size
+        self.pending = 0
+        self.atomic = None
+
+    def __enter__(self):
+        self.atomic = transaction.atomic()
+        self.atomic.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.atomic.__exit__(*exc_info)
+
+    def add(self, rows):
+        self.pending += rows
+        if self.pending >= self.size:
+            self.atomic.__exit__(None, None, None)
+            self.pending = 0
+            self.atomic = transaction.atomic()
+            self.atomic.__enter__()
+
+
+class Command(BaseCommand):
+    help = ('Stream CSV/JSONL files of languages, genres, authors, books and copies into the catalog '
+            'with batched bulk inserts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--languages', help='file with a name column')
+        parser.add_argument('--genres', help='file with a name column')
+        parser.add_argument('--authors', help='file with first_name, last_name, date_of_birth, date_of_death')
+        parser.add_argument('--books', help="file with title, summary, isbn, author ('Last, First'), "
+                                            "language and genre (names separated by ';')")
+        parser.add_argument('--copies', help='file with isbn, imprint, status, due_back, borrower (username) '
+                                             'and optionally id')
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows per bulk insert')
+        parser.add_argument('--commit-every', type=int, default=50000, help='rows per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='validate the files without writing')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.errors = 0
+        self.maps = {}
+        # existing rows whose pages gain imported books or copies
+        self.touched_books, self.touched_authors = set(), set()
+        last_book_pk = Book.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        steps = [
+            ('languages', self.import_languages),
+            ('genres', self.import_genres),
+            ('authors', self.import_authors),
+            ('books', self.import_books),
+            ('copies', self.import_copies),
+        ]
+        with ChunkedTransaction(options['commit_every']) as chunks:
+            self.chunks = chunks
+            for kind, import_file in steps:
+                if options[kind]:
+                    created = import_file(read_records(options[kind]))
+                    verb = 'Would create' if self.dry_run else 'Created'
+                    self.stdout.write(f'{verb} {created} {kind} from {options[kind]}')
+
+        if self.errors:
+            self.stderr.write(f'{self.errors} invalid rows skipped')
+        if not self.dry_run:
+            # bulk inserts bypass the receivers, so catch up once at the end
+            counters.rebuild()
+            search.index_books(Book.objects.filter(pk__gt=last_book_pk))
+            self.touched_books = {pk for pk in self.touched_books if pk and pk <= last_book_pk}
+            self.touched_authors.discard(None)
+            for touch, pks in ((versions.touch_books, self.touched_books),
+                               (versions.touch_authors, self.touched_authors)):
+                pks = sorted(pks)
+                for start in range(0, len(pks), TOUCH_BATCH):
+                    touch(pks[start:start + TOUCH_BATCH])
+            caching.purge_pages(['books', 'authors', facets.GROUP])
+
+    # lookup maps, loaded from the database on first use and extended as rows are imported
+
+    def lookup(self, name):
+        if name not in self.maps:
+            loaders = {
+                'languages': lambda: Language.objects.values_list('name', 'pk').iterator(),
+                'genres': lambda: Genre.objects.values_list('name', 'pk').iterator(),
+                'authors': lambda: (((last_name, first_name), pk) for last_name, first_name, pk in
+                                    Author.objects.values_list('last_name', 'first_name', 'pk').iterator()),
+                'books': lambda: Book.objects.values_list('isbn', 'pk').iterator(),
+                'users': lambda: User.objects.values_list('username', 'pk').iterator(),
+            }
+            self.maps[name] = dict(loaders[name]())
+        return self.maps[name]
+
+    def resolve(self, name, key, required=False):
+        if not key or key == ('', ''):
+            if required:
+                raise ValidationError(f'missing {name[:-1]}')
+            return None
+        try:
+            pk = self.lookup(name)[key]
+        except KeyError:
+            raise ValidationError(f'unknown {name[:-1]} {key!r}')
+        return None if pk is PENDING else pk
+
+    def build(self, model, values, exclude=()):
+        instance = model(**values)
+        instance.clean_fields(exclude=list(exclude))
+        return instance
+
+    def skip(self, kind, number, error):
+        self.errors += 1
+        messages = error.messages if isinstance(error, ValidationError) else [str(error)]
+        self.stderr.write(f'{kind} record {number}: {"; ".join(messages)}')
+
+    def flush(self, model, instances, **kwargs):
+        if instances and not self.dry_run:
+            model.objects.bulk_create(instances, batch_size=self.batch_size, **kwargs)
+        self.chunks.add(len(instances))
+
+    def import_named(self, kind, model, records):
+        known = self.lookup(kind)
+        batch, created = [], 0
+        for number, record in enumerate(records, start=1):
+            name = (record.get('name') or '').strip()
+            if name in known:
+                continue
+            try:
+                batch.append(self.build(model, {'name': name}))
+            except ValidationError as error:
+                self.skip(kind, number, error)
+                continue
+            known[name] = PENDING
+            if len(batch) >= self.batch_size:
+                created += self.flush_named(kind, model, batch)
+                batch = []
+        return created + self.flush_named(kind, model, batch)
+
+    def flush_named(self, kind, model, batch):
+        self.flush(model, batch)
+        if not self.dry_run and batch:
+            self.lookup(kind).update(model.objects.filter(name__in=[item.name for item in batch])
+                                     .values_list('name', 'pk'))
+        return len(batch)
+
+    def import_languages(self, records):
+        return self.import_named('languages', Language, records)
+
+    def import_genres(self, records):
+        return self.import_named('genres', Genre, records)
+
+    def import_authors(self, records):
+        known = self.lookup('authors')
+        batch, created = [], 0
+        for number, record in enumerate(records, start=1):
+            key = ((record.get('last_name') or '').strip(), (record.get('first_name') or '').strip())
+            if key in known:
+                continue
+            try:
+                batch.append(self.build(Author, {
+                    'last_name': key[0],
+                    'first_name': key[1],
+                    'date_of_birth': record.get('date_of_birth') or None,
+                    'date_of_death': record.get('date_of_death') or None,
+                }))
+            except ValidationError as error:
+                self.skip('authors', number, error)
+                continue
+            known[key] = PENDING
+            if len(batch) >= self.batch_size:
+                created += self.flush_authors(batch)
+                batch = []
+        return created + self.flush_authors(batch)
+
+    def flush_authors(self, batch):
+        self.flush(Author, batch)
+        if not self.dry_run and batch:
+            # authors are identified by name, so read the new ids back in one query per batch
+            last_names = {author.last_name for author in batch}
+            known = self.maps['authors']
+            for last_name, first_name, pk in Author.objects.filter(last_name__in=last_names)\
+                    .values_list('last_name', 'first_name', 'pk'):
+                if known.get((last_name, first_name)) is PENDING:
+                    known[(last_name, first_name)] = pk
+        return len(batch)
+
+    def import_books(self, records):
+        known = self.lookup('books')
+        batch, genres, created = [], {}, 0
+        for number, record in enumerate(records, start=1):
+            isbn = (record.get('isbn') or '').strip()
+            if isbn in known:
+                continue
+            try:
+                genre_ids = [self.resolve('genres', name.strip(), required=True)
+                             for name in (record.get('genre') or '').split(';') if name.strip()]
+                author = author_key(record.get('author'))
+                author_id = self.resolve('authors', author)
+                batch.append(self.build(Book, {
+                    'title': (record.get('title') or '').strip(),
+                    'summary': record.get('summary') or '',
+                    'isbn': isbn,
+                    'author_id': author_id,
+                    # bulk_create skips Book.save()
+                    'author_sort': author_sort_key(*author) if author_id else '',
+                    'language_id': self.resolve('languages', (record.get('language') or '').strip()),
+                }, exclude=['author', 'language']))
+            except ValidationError as error:
+                self.skip('books', number, error)
+                continue
+            known[isbn] = PENDING
+            genres[isbn] = genre_ids
+            self.touched_authors.add(batch[-1].author_id)
+            if len(batch) >= self.batch_size:
+                created += self.flush_books(batch, genres)
+                batch, genres = [], {}
+        return created + self.flush_books(batch, genres)
+
+    def flush_books(self, batch, genres):
+        self.flush(Book, batch)
+        if self.dry_run or not batch:
+            return len(batch)
+        # read the new ids back by ISBN, then link genres through the M2M table in bulk
+        known = self.maps['books']
+        for isbn, pk in Book.objects.filter(isbn__in=genres).values_list('isbn', 'pk'):
+            if known.get(isbn) is PENDING:
+                known[isbn] = pk
+        Through = Book.genre.through
+        self.flush(Through, [Through(book_id=known[isbn], genre_id=genre_id)
+                             for isbn, genre_ids in genres.items() for genre_id in genre_ids])
+        return len(batch)
+
+    def import_copies(self, records):
+        batch, created = [], 0
+        for number, record in enumerate(records, start=1):
+            try:
+                values = {
+                    'book_id': self.resolve('books', (record.get('isbn') or '').strip(), required=True),
+                    'imprint': (record.get('imprint') or '').strip(),
+                    'status': (record.get('status') or 'm').strip(),
+                    'due_back': record.get('due_back') or None,
+                    'borrower_id': self.resolve('users', (record.get('borrower') or '').strip()),
+                }
+                if record.get('id'):
+                    values['id'] = record['id']
+                batch.append(self.build(BookInstance, values, exclude=['book', 'borrower']))
+                self.touched_books.add(values['book_id'])
+            except ValidationError as error:
+                self.skip('copies', number, error)
+                continue
+            if len(batch) >= self.batch_size:
+                created += self.flush_copies(batch)
+                batch = []
+        return created + self.flush_copies(batch)
+
+    def flush_copies(self, batch):
+        # ignore_conflicts hides which rows were skipped, so count the ids that were not there yet
+        ids = {copy.pk for copy in batch}
+        existing = 0 if self.dry_run or not ids else BookInstance.objects.filter(pk__in=ids).count()
+        self.flush(BookInstance, batch, ignore_conflicts=True)
+        return len(ids) - existing
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the catalog counters shown on the home page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Counters to rebuild (default: all)')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(counters.get_counts())
+        if unknown:
+            raise CommandError(f'Unknown counters: {", ".join(sorted(unknown))}')
+        for name, value in counters.rebuild(options['names'] or None).items():
+            self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over books and authors'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write('Full-text index not used on this database backend.')
+            return
+        self.stdout.write(f'Indexed {search.rebuild()} books.')
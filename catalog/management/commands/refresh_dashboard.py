@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import dashboard
+
+
+class Command(BaseCommand):
+    help = 'Fold new loan events into the circulation dashboard and recompute its metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=dashboard.CHUNK_SIZE,
+                            help='loan events extracted per query')
+
+    def handle(self, *args, **options):
+        if not dashboard.is_available():
+            raise CommandError('The circulation dashboard needs NumPy: pip install numpy')
+        _, folded = dashboard.refresh(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Folded {folded} loan events into the dashboard')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from catalog import history
+
+
+class Command(BaseCommand):
+    help = 'Add loan events written since the last run to the daily and monthly circulation counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=history.ROLLUP_BATCH,
+                            help='events rolled up per transaction')
+
+    def handle(self, *args, **options):
+        rolled_up = history.rollup(batch_size=options['batch_size'])
+        self.stdout.write(f'Rolled up {rolled_up} loan events')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from catalog import notices
+
+
+class Command(BaseCommand):
+    help = ('Email each borrower one digest of their overdue and soon due loans, '
+            'skipping loans already notified')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--due-soon-days', type=int, default=notices.DUE_SOON_DAYS,
+                            help='days ahead a loan counts as due soon')
+        parser.add_argument('--batch-size', type=int, default=notices.BATCH_SIZE,
+                            help='digests recorded per insert')
+        parser.add_argument('--dry-run', action='store_true', help='count the notices without sending')
+
+    def handle(self, *args, **options):
+        stats = notices.send_notices(due_soon_days=options['due_soon_days'], batch_size=options['batch_size'],
+                                     dry_run=options['dry_run'])
+        verb = 'Would send' if options['dry_run'] else 'Sent'
+        self.stdout.write(f'{verb} {stats["digests"]} digests covering {stats[notices.OVERDUE]} overdue and '
+                          f'{stats[notices.DUE_SOON]} soon due loans')
+        if stats['skipped']:
+            self.stderr.write(f'{stats["skipped"]} borrowers have no email address')
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from catalog import caching, routers
+
+
+class Command(BaseCommand):
+    help = 'Refresh the SQLite replica files in REPLICA_DATABASES with a snapshot of the default database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='replicas to refresh (default: all)')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.REPLICA_DATABASES
+        unknown = set(aliases) - set(settings.REPLICA_DATABASES)
+        if unknown:
+            raise CommandError(f'Not replicas: {", ".join(sorted(unknown))}')
+        source = connections[DEFAULT_DB_ALIAS].settings_dict
+        for alias in aliases:
+            target = connections[alias].settings_dict
+            if 'sqlite3' not in source['ENGINE'] or 'sqlite3' not in target['ENGINE']:
+                raise CommandError(f'{alias}: only SQLite replicas can be refreshed here')
+            if target['NAME'] == source['NAME']:
+                raise CommandError(f'{alias} is the default database')
+            routers.copy_sqlite(DEFAULT_DB_ALIAS, target['NAME'])
+            self.stdout.write(f'{alias}: copied to {target["NAME"]}')
+        # pages rendered from the old snapshot may be stale
+        caching.purge_all_pages()
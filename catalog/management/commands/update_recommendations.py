@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from catalog import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Add checkouts logged since the last run to the co-borrow matrix and rebuild the changed recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=recommendations.BATCH_SIZE,
+                            help='loan events read per transaction')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='drop the matrix and recount every checkout from the start')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            recommendations.reset()
+        read, changed = recommendations.update(batch_size=options['batch_size'])
+        self.stdout.write(f'Read {read} loan events, updated recommendations of {len(changed)} books')
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:00
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    Author = apps.get_model('catalog', 'Author')
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+    CatalogCounter = apps.get_model('catalog', 'CatalogCounter')
+    CatalogCounter.objects.bulk_create([
+        CatalogCounter(name='books', value=Book.objects.count()),
+        CatalogCounter(name='copies', value=BookInstance.objects.count()),
+        CatalogCounter(name='copies_available', value=BookInstance.objects.filter(status='a').count()),
+        CatalogCounter(name='authors', value=Author.objects.count()),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_auto_20191129_2216'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='language',
+            name='name',
+            field=models.CharField(help_text="Enter the book's natural language (e.g. English)", max_length=100),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE catalog_book_search USING fts5("
+        "title, summary, isbn, author, tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    schema_editor.execute(
+        "INSERT INTO catalog_book_search (rowid, title, summary, isbn, author) "
+        "SELECT b.id, b.title, b.summary, b.isbn, TRIM(COALESCE(a.first_name, '') || ' ' || COALESCE(a.last_name, '')) "
+        "FROM catalog_book b LEFT JOIN catalog_author a ON a.id = b.author_id")
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE catalog_book_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_catalogcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
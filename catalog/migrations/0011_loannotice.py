@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_hold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanNotice',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('due_soon', 'Due soon'), ('overdue', 'Overdue')], max_length=10)),
+                ('due_back', models.DateField()),
+                ('sent', models.DateTimeField(auto_now_add=True)),
+                ('copy', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='catalog.BookInstance')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='loannotice',
+            constraint=models.UniqueConstraint(fields=('copy', 'kind', 'due_back'), name='loannotice_copy_kind_due_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_loannotice'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['first_name', 'last_name'], name='author_first_name_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('catalog', '0012_author_first_name_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLoanStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('checkout', 'Checked out'), ('renew', 'Renewed'), ('return', 'Returned'), ('reserve', 'Reserved')], max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day', 'kind'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurred', models.DateTimeField(db_index=True)),
+                ('kind', models.CharField(choices=[('checkout', 'Checked out'), ('renew', 'Renewed'), ('return', 'Returned'), ('reserve', 'Reserved')], max_length=10)),
+                ('due_back', models.DateField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MonthlyLoanStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('kind', models.CharField(choices=[('checkout', 'Checked out'), ('renew', 'Renewed'), ('return', 'Returned'), ('reserve', 'Reserved')], max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month', 'kind'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyloanstat',
+            constraint=models.UniqueConstraint(fields=('month', 'kind'), name='monthlyloanstat_month_kind_uniq'),
+        ),
+        migrations.AddField(
+            model_name='loanevent',
+            name='book',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='catalog.Book'),
+        ),
+        migrations.AddField(
+            model_name='loanevent',
+            name='copy',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='catalog.BookInstance'),
+        ),
+        migrations.AddField(
+            model_name='loanevent',
+            name='patron',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyloanstat',
+            constraint=models.UniqueConstraint(fields=('day', 'kind'), name='dailyloanstat_day_kind_uniq'),
+        ),
+    ]
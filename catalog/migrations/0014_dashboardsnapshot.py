@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_loan_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('state', models.BinaryField(default=b'')),
+                ('metrics', models.TextField(default='{}')),
+                ('refreshed', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
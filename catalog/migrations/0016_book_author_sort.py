@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+def populate_author_sort(apps, schema_editor):
+    Author = apps.get_model('catalog', 'Author')
+    Book = apps.get_model('catalog', 'Book')
+    for pk, last_name, first_name in Author.objects.values_list('pk', 'last_name', 'first_name').iterator():
+        Book.objects.filter(author=pk).update(author_sort=f'{last_name}\x1f{first_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0015_book_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='author_sort',
+            field=models.CharField(blank=True, default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(populate_author_sort, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author_sort', 'title'], name='book_author_sort_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.28 on 2026-10-17 07:20
+
+from datetime import date, timedelta
+
+from django.db import migrations
+
+
+def set_pickup_deadlines(apps, schema_editor):
+    # copies reserved before deadlines were kept get the full pickup period from now
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+    BookInstance.objects.filter(status='r', due_back__isnull=True).update(due_back=date.today() + timedelta(weeks=1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0016_book_author_sort'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_pickup_deadlines, migrations.RunPython.noop),
+    ]
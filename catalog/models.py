@@ -2,12 +2,21 @@ import uuid
 
 from datetime import date
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
+from django.utils import timezone
+
+from catalog.signals import copies_updated
 
 
 # Create your models here.
 
+def author_sort_key(last_name, first_name):
+    """Book.author_sort of an author: orders like (last_name, first_name); books without author get ''"""
+    # the unit separator sorts below any character of a name
+    return f'{last_name}\x1f{first_name}'
+
+
 class Genre(models.Model):
     """Model representing a book genre."""
     name = models.CharField(max_length=200, help_text='Enter a book genre (e.g. Science Fiction)')
@@ -26,6 +35,30 @@ class Book(models.Model):
                             help_text='13 Character <a href="https://www.isbn-international.org/content/what-isbn">ISBN number</a>')
     genre = models.ManyToManyField(Genre, help_text='Select a genre for this book')
     language = models.ForeignKey('Language', on_delete=models.SET_NULL, null=True)
+    # also bumped when the book's copies, genres or author change
+    last_modified = models.DateTimeField(auto_now=True, db_index=True)
+    # copy of the author's name, so the book list orders by an index of this table instead of a join
+    author_sort = models.CharField(max_length=201, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # books of an author in title order (author page)
+            models.Index(fields=['author', 'title'], name='book_author_title_idx'),
+            # the book list, in (author_sort, title, id) keyset order
+            models.Index(fields=['author_sort', 'title'], name='book_author_sort_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored author so a reassigned book can date both authors
+        instance._loaded_author_id = instance.__dict__.get('author_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        author = self.author
+        self.author_sort = author_sort_key(author.last_name, author.first_name) if author else ''
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -39,6 +72,57 @@ class Book(models.Model):
     display_genre.short_description = 'Genre'
 
 
+class BookInstanceQuerySet(models.QuerySet):
+    """QuerySet for book copies that reports bulk updates, which bypass post_save"""
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            self._touch_books()
+            if 'status' not in kwargs:
+                return self._update_copies(None, kwargs)
+            # update once per current status so listeners see exact transitions
+            return sum(self.filter(status=old_status)._update_copies(old_status, kwargs)
+                       for old_status in BookInstance.STATUS_CODES)
+
+    update.alters_data = True
+
+    def transition(self, old_status, **kwargs):
+        """
+            Update only the copies currently in old_status, with one conditional UPDATE
+            @param old_status   : status the copies must have for the update to apply
+            @return             : number of copies updated
+        """
+        copies = self.filter(status=old_status)
+        with transaction.atomic(using=self.db):
+            copies._touch_books()
+            return copies._update_copies(old_status, kwargs)
+
+    transition.alters_data = True
+
+    def overdue(self, today=None):
+        """Copies on loan past their due date, a range on the (status, due_back) index"""
+        return self.filter(status__exact='o', due_back__lt=today or date.today())
+
+    def with_overdue_by(self, today=None):
+        """Annotate overdue_by, the timedelta between due_back and today, computed by the database"""
+        return self.annotate(overdue_by=models.ExpressionWrapper(
+            models.Value(today or date.today(), output_field=models.DateField()) - models.F('due_back'),
+            output_field=models.DurationField()))
+
+    def _touch_books(self):
+        # a book's version covers its copies; done first, while self still matches
+        from catalog import versions
+        versions.touch_books(self.order_by().values_list('book', flat=True).distinct())
+
+    def _update_copies(self, old_status, changes):
+        # update() does not apply auto_now
+        updated = super().update(**{'last_modified': timezone.now(), **changes})
+        if updated:
+            copies_updated.send(sender=self.model, queryset=self, old_status=old_status,
+                                changes=changes, updated=updated)
+        return updated
+
+
 class BookInstance(models.Model):
     """Model representing a specific copy of a book"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4,
@@ -55,6 +139,7 @@ class BookInstance(models.Model):
         ('a', 'Available'),
         ('r', 'Reserved')
     )
+    STATUS_CODES = [code for code, _ in LOAN_STATUS] + ['']
 
     status = models.CharField(
         max_length=1,
@@ -63,10 +148,26 @@ class BookInstance(models.Model):
         default='m',
         help_text='Book availability',
     )
+    last_modified = models.DateTimeField(auto_now=True)
+
+    objects = BookInstanceQuerySet.as_manager()
 
     class Meta:
         ordering = ['status', 'due_back', 'id']
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            # a patron's loans by due date (LoanedBooksByUserListView)
+            models.Index(fields=['borrower', 'status', 'due_back', 'id'], name='bookinst_borrower_status_idx'),
+            # all loans by due date (AllLoanedBooksListView), availability count, default ordering
+            models.Index(fields=['status', 'due_back', 'borrower', 'book', 'id'], name='bookinst_status_due_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored status so post_save can tell what changed
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
 
     def __str__(self):
         return f'{self.id} ({self.book.title}), ({self.borrower})'
@@ -78,15 +179,191 @@ class BookInstance(models.Model):
         return False
 
 
+class Hold(models.Model):
+    """Model representing a patron waiting in a book's queue for the next returned copy"""
+    # the queue index below starts with book, so no separate index
+    book = models.ForeignKey('Book', on_delete=models.CASCADE, db_index=False)
+    patron = models.ForeignKey(User, on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # ids only grow, so a book's queue is its holds in id order
+        ordering = ['book', 'id']
+        indexes = [
+            # queue head and position, read from the index without touching the table
+            models.Index(fields=['book', 'id'], name='hold_book_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['patron', 'book'], name='hold_patron_book_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.patron} waiting for {self.book}'
+
+
+class LoanNotice(models.Model):
+    """Model recording a due-soon or overdue notice sent for a loan, so it is never sent twice"""
+    NOTICE_KINDS = (
+        ('due_soon', 'Due soon'),
+        ('overdue', 'Overdue'),
+    )
+
+    copy = models.ForeignKey('BookInstance', on_delete=models.CASCADE, db_index=False)
+    kind = models.CharField(max_length=10, choices=NOTICE_KINDS)
+    # a renewed loan has a new due date, and so gets new notices
+    due_back = models.DateField()
+    sent = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # also the index behind the already-notified check
+            models.UniqueConstraint(fields=['copy', 'kind', 'due_back'], name='loannotice_copy_kind_due_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} notice for {self.copy_id} due {self.due_back}'
+
+
+class LoanEvent(models.Model):
+    """Model recording one loan operation on a copy; rows are only ever inserted"""
+    CHECKOUT = 'checkout'
+    RENEW = 'renew'
+    RETURN = 'return'
+    RESERVE = 'reserve'
+    EVENT_KINDS = (
+        (CHECKOUT, 'Checked out'),
+        (RENEW, 'Renewed'),
+        (RETURN, 'Returned'),
+        (RESERVE, 'Reserved'),
+    )
+
+    # month and day ranges of the rollups are ranges on this index
+    occurred = models.DateTimeField(db_index=True)
+    kind = models.CharField(max_length=10, choices=EVENT_KINDS)
+    # no constraints or cascades: history outlives the copies, books and patrons it mentions
+    copy = models.ForeignKey('BookInstance', on_delete=models.DO_NOTHING, db_constraint=False,
+                             null=True, related_name='+')
+    book = models.ForeignKey('Book', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                             null=True, related_name='+')
+    patron = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                               null=True, related_name='+')
+    # due date after the operation; before it for returns
+    due_back = models.DateField(null=True)
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.copy_id} at {self.occurred}'
+
+
+class DailyLoanStat(models.Model):
+    """Model holding the number of loan events of a kind on a day, maintained by catalog.history.rollup"""
+    day = models.DateField()
+    kind = models.CharField(max_length=10, choices=LoanEvent.EVENT_KINDS)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['day', 'kind']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'kind'], name='dailyloanstat_day_kind_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.kind}: {self.count}'
+
+
+class MonthlyLoanStat(models.Model):
+    """Model holding the number of loan events of a kind in a month, maintained by catalog.history.rollup"""
+    # first day of the month
+    month = models.DateField()
+    kind = models.CharField(max_length=10, choices=LoanEvent.EVENT_KINDS)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['month', 'kind']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'kind'], name='monthlyloanstat_month_kind_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.month:%Y-%m} {self.kind}: {self.count}'
+
+
+class RollupWatermark(models.Model):
+    """Model holding the id of the last event a rollup has counted, so the next run starts after it"""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+
+class BookCoBorrow(models.Model):
+    """Model holding how many patrons borrowed both books: one cell of a sparse, symmetric book-by-book matrix"""
+    # the pair constraint starts with book, so no separate index
+    book = models.ForeignKey('Book', on_delete=models.CASCADE, db_index=False, related_name='+')
+    other = models.ForeignKey('Book', on_delete=models.CASCADE, related_name='+')
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # a book's strongest neighbours, scanned backwards from its highest count
+            models.Index(fields=['book', 'count'], name='bookcoborrow_top_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'other'], name='bookcoborrow_pair_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.book_id} & {self.other_id}: {self.count}'
+
+
+class BookRecommendation(models.Model):
+    """Model holding one precomputed "also borrowed" entry of a book, rebuilt by catalog.recommendations"""
+    book = models.ForeignKey('Book', on_delete=models.CASCADE, db_index=False, related_name='recommendations')
+    recommended = models.ForeignKey('Book', on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    # patrons who borrowed both
+    score = models.BigIntegerField()
+
+    class Meta:
+        ordering = ['book', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='bookrecommendation_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.book_id} #{self.rank}: {self.recommended_id}'
+
+
+class DashboardSnapshot(models.Model):
+    """Model holding the arrays and metrics behind the circulation dashboard, refreshed by catalog.dashboard"""
+    name = models.CharField(max_length=50, primary_key=True)
+    # LoanEvents up to this id are folded into state
+    last_event_id = models.BigIntegerField(default=0)
+    # NumPy arrays in .npz format
+    state = models.BinaryField(default=b'')
+    metrics = models.TextField(default='{}')
+    refreshed = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} at event {self.last_event_id}'
+
+
 class Author(models.Model):
     """Model representing an author."""
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('Died', null=True, blank=True)
+    # also bumped when the author's books or their copies change
+    last_modified = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name'], name='author_name_idx'),
+            # first name prefix lookups of the author autocomplete
+            models.Index(fields=['first_name', 'last_name'], name='author_first_name_idx'),
+        ]
 
     def get_absolute_url(self):
         return reverse('author-detail', args=[str(self.id)])
@@ -102,3 +379,21 @@ class Language(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class CatalogCounter(models.Model):
+    """Model holding a denormalized count of catalog records, kept current by signals"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class VisitCount(models.Model):
+    """Model holding the number of home page visits of a user or anonymous visitor, flushed in bulk"""
+    visitor = models.CharField(max_length=50, primary_key=True)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.visitor}: {self.count}'
@@ -0,0 +1,122 @@
+"""
+    Due-soon and overdue loan notices. Each bucket is one query over the
+    (status, due_back) index, streamed in borrower order; the two streams are
+    merged so every borrower gets one digest, and digests go out in batches
+    over a single email connection. LoanNotice rows record what was
+    delivered, so a rerun skips it.
+"""
+import heapq
+from collections import Counter, namedtuple
+from datetime import date, timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core import mail
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+
+from catalog.models import BookInstance, LoanNotice
+
+DUE_SOON = 'due_soon'
+OVERDUE = 'overdue'
+# loans due within this many days get a reminder
+DUE_SOON_DAYS = 3
+# digests recorded per insert, and rows fetched per database round trip
+BATCH_SIZE = 100
+CHUNK_SIZE = 2000
+
+Loan = namedtuple('Loan', 'borrower_id kind copy_id due_back title email username first_name')
+
+
+def _bucket(kind, **due_back):
+    notified = LoanNotice.objects.filter(copy=OuterRef('pk'), kind=kind, due_back=OuterRef('due_back'))
+    loans = BookInstance.objects\
+        .filter(status__exact='o', borrower__isnull=False, **{f'due_back__{lookup}': value
+                                                              for lookup, value in due_back.items()})\
+        .annotate(notified=Exists(notified)).filter(notified=False)\
+        .order_by('borrower', 'due_back', 'id')\
+        .values_list('borrower', 'pk', 'due_back', 'book__title', 'borrower__email', 'borrower__username',
+                     'borrower__first_name')
+    for borrower_id, copy_id, due, title, email, username, first_name in loans.iterator(chunk_size=CHUNK_SIZE):
+        yield Loan(borrower_id, kind, copy_id, due, title, email, username, first_name)
+
+
+def pending_loans(today=None, due_soon_days=DUE_SOON_DAYS):
+    """
+        Loans still owed a notice, overdue and due soon merged
+        @return             : iterator of Loan tuples ordered by borrower
+    """
+    today = today or date.today()
+    return heapq.merge(_bucket(OVERDUE, lt=today),
+                       _bucket(DUE_SOON, gte=today, lte=today + timedelta(days=due_soon_days)),
+                       key=lambda loan: loan.borrower_id)
+
+
+def _digest(loans, today):
+    first = loans[0]
+    overdue = [loan for loan in loans if loan.kind == OVERDUE]
+    context = {
+        'name': first.first_name or first.username,
+        'overdue': overdue,
+        'due_soon': [loan for loan in loans if loan.kind == DUE_SOON],
+        'today': today,
+    }
+    subject = 'Local Library: overdue books' if overdue else 'Local Library: books due soon'
+    return mail.EmailMessage(subject, render_to_string('catalog/email/loan_notice.txt', context),
+                             settings.DEFAULT_FROM_EMAIL, [first.email])
+
+
+def _send(connection, batch):
+    """
+        Send a batch of digests over the open connection, one message at a time
+        @return             : number of digests delivered
+    """
+    delivered = []
+    try:
+        for message, loans in batch:
+            if connection.send_messages([message]):
+                delivered.append(loans)
+    finally:
+        # what was delivered is recorded even when a later message raised, and nothing else,
+        # so a rerun neither repeats nor drops a notice
+        LoanNotice.objects.bulk_create([LoanNotice(copy_id=loan.copy_id, kind=loan.kind, due_back=loan.due_back)
+                                        for loans in delivered for loan in loans], ignore_conflicts=True)
+    return len(delivered)
+
+
+def _pending_digests(today, due_soon_days, stats):
+    """Loans owed a notice grouped per borrower with an email address, counted in stats"""
+    for _, loans in groupby(pending_loans(today, due_soon_days), key=lambda loan: loan.borrower_id):
+        loans = list(loans)
+        if not loans[0].email:
+            stats['skipped'] += 1
+            continue
+        stats.update(loan.kind for loan in loans)
+        yield loans
+
+
+def send_notices(today=None, due_soon_days=DUE_SOON_DAYS, batch_size=BATCH_SIZE, dry_run=False):
+    """
+        Send one digest per borrower with loans overdue or due soon that were not notified yet.
+        Run from one scheduler at a time.
+        @param today        : date the buckets are computed from, default today
+        @param due_soon_days: days ahead a loan counts as due soon
+        @param batch_size   : digests rendered and recorded together
+        @param dry_run      : count what would be sent, send and record nothing
+        @return             : Counter of digests, overdue and due_soon loans, and borrowers skipped
+                              for lack of an email address
+    """
+    today = today or date.today()
+    stats = Counter()
+    if dry_run:
+        stats['digests'] = sum(1 for _ in _pending_digests(today, due_soon_days, stats))
+        return stats
+    batch = []
+    with mail.get_connection() as connection:
+        for loans in _pending_digests(today, due_soon_days, stats):
+            batch.append((_digest(loans, today), loans))
+            if len(batch) >= batch_size:
+                stats['digests'] += _send(connection, batch)
+                batch = []
+        stats['digests'] += _send(connection, batch)
+    return stats
@@ -0,0 +1,234 @@
+"""
+    Keyset (cursor) pagination: pages are fetched by seeking past the ordering
+    key values of the last row shown, so deep pages cost the same as the first
+    and no OFFSET scan or COUNT(*) is needed.
+"""
+import base64
+import hashlib
+import json
+import math
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from catalog import caching
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _resolve_key(model, key):
+    """Return (field, nullable) for a key path such as 'author__last_name'"""
+    nullable = False
+    parts = key.split('__')
+    for part in parts[:-1]:
+        field = model._meta.get_field(part)
+        nullable = nullable or field.null
+        model = field.related_model
+    field = model._meta.get_field(parts[-1])
+    return field, nullable or field.null
+
+
+class KeysetPaginator:
+    """
+        Paginator seeking on ordering keys instead of offsets
+        @param object_list  : queryset to paginate, its ordering is replaced by keys
+        @param per_page     : rows per page
+        @param keys         : ordering key paths, ascending, the last one unique
+        @param total        : None for no total, 'exact' to count, 'cached' to count
+                              once until one of total_groups is purged, or at most
+                              once per total_timeout seconds without groups
+        @param total_groups : page cache groups purged whenever the rows change
+    """
+
+    def __init__(self, object_list, per_page, keys, total=None, total_timeout=300, total_groups=()):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.keys = tuple(keys)
+        self.total = total
+        self.total_timeout = total_timeout
+        self.total_groups = tuple(total_groups)
+        self._fields = [_resolve_key(object_list.model, key) for key in self.keys]
+
+    @cached_property
+    def count(self):
+        if self.total == 'exact':
+            return self.object_list.count()
+        if self.total == 'cached':
+            if self.total_groups:
+                # purged along with the pages listing the rows
+                data = f'{self.object_list.query}|{caching.generation(self.total_groups)}'
+                timeout = None
+            else:
+                data, timeout = str(self.object_list.query), self.total_timeout
+            cache_key = 'keyset-total:' + hashlib.md5(data.encode()).hexdigest()
+            return cache.get_or_set(cache_key, self.object_list.count, timeout)
+        return None
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(1, math.ceil(self.count / self.per_page))
+
+    def encode_cursor(self, values, forward):
+        data = json.dumps([1 if forward else 0, values], cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            forward, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.keys):
+                raise ValueError
+            return bool(forward), [None if value is None else field.to_python(value)
+                                   for (field, _), value in zip(self._fields, values)]
+        except (TypeError, ValueError, ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+
+    def _ordering(self, forward):
+        # SQLite and MySQL already sort NULL lowest, and an explicit NULLS
+        # modifier would stop them using an index for the ORDER BY
+        native_nulls = connections[self.object_list.db].vendor in ('sqlite', 'mysql')
+        ordering = []
+        for key, (_, nullable) in zip(self.keys, self._fields):
+            if not nullable or native_nulls:
+                ordering.append(F(key).asc() if forward else F(key).desc())
+            else:
+                ordering.append(F(key).asc(nulls_first=True) if forward else F(key).desc(nulls_last=True))
+        return ordering
+
+    def _seek(self, values, forward):
+        """Condition selecting rows after (forward) or before the key values, NULL sorting lowest"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for key, (_, nullable), value in zip(self.keys, self._fields, values):
+            if value is None:
+                beyond = Q(**{f'{key}__isnull': False}) if forward else None
+                same = Q(**{f'{key}__isnull': True})
+            else:
+                beyond = Q(**{f'{key}__gt' if forward else f'{key}__lt': value})
+                if nullable and not forward:
+                    beyond |= Q(**{f'{key}__isnull': True})
+                same = Q(**{key: value})
+            if beyond is not None:
+                condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def _ranges(self, values, forward):
+        """
+            Plain ranges on the leading key, each one an index seek instead of a
+            scan up to the cursor; read in turn until the page is full
+        """
+        if values is None:
+            return [Q()]
+        key, nullable, value = self.keys[0], self._fields[0][1], values[0]
+        if value is None:
+            return [Q()] if forward else [Q(**{f'{key}__isnull': True})]
+        if forward:
+            return [Q(**{f'{key}__gte': value})]
+        # backward, NULL rows come after every value; an OR of both would not seek
+        ranges = [Q(**{f'{key}__lte': value})]
+        if nullable:
+            ranges.append(Q(**{f'{key}__isnull': True}))
+        return ranges
+
+    def page(self, cursor=None):
+        """
+            Fetch the page a cursor points to
+            @param cursor       : token from a previous page, None for the first page
+            @return             : KeysetPage
+        """
+        forward, values = self.decode_cursor(cursor) if cursor else (True, None)
+        queryset = self.object_list.annotate(
+            **{f'keyset_{index}': F(key) for index, key in enumerate(self.keys)})
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        queryset = queryset.order_by(*self._ordering(forward))
+        rows = []
+        for condition in self._ranges(values, forward):
+            rows += queryset.filter(condition)[:self.per_page + 1 - len(rows)]
+            if len(rows) > self.per_page:
+                break
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            return KeysetPage(rows, self, has_next=has_more, has_previous=values is not None)
+        rows.reverse()
+        return KeysetPage(rows, self, has_next=True, has_previous=has_more)
+
+    def row_values(self, row):
+        return [getattr(row, f'keyset_{index}') for index in range(len(self.keys))]
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self.object_list)}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.paginator.row_values(self.object_list[-1]), forward=True)
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.paginator.row_values(self.object_list[0]), forward=False)
+
+
+class KeysetPaginationMixin:
+    """
+        ListView mixin paginating with KeysetPaginator on keyset_keys. Requests
+        with a page parameter still get Django's offset pagination.
+    """
+    keyset_keys = ('pk',)
+    keyset_total = 'cached'
+    # page cache groups of the listed rows, see KeysetPaginator
+    keyset_total_groups = ()
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.kwargs or self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_keys, total=self.keyset_total,
+                                    total_groups=self.keyset_total_groups)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,163 @@
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from catalog import caching, conditional, counters, db, facets, recommendations, search, versions, visits
+from catalog.models import Author, Book, BookInstance, Genre, Language, author_sort_key
+from catalog.signals import copies_updated
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(counters.BOOKS)
+    search.index_books(Book.objects.filter(pk=instance.pk))
+    versions.touch_authors({instance.author_id, getattr(instance, '_loaded_author_id', None)})
+    instance._loaded_author_id = instance.author_id
+    if not created:
+        # their "also borrowed" lists show this book's title
+        versions.touch_books(recommendations.recommending([instance.pk]))
+    caching.purge_pages(['books', facets.GROUP, f'book:{instance.pk}'])
+
+
+@receiver(pre_delete, sender=Book)
+def book_deleting(sender, instance, **kwargs):
+    # the cascade drops the recommendations of this book before post_delete, so remember them now
+    instance._recommended_by = recommendations.recommending([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    counters.increment(counters.BOOKS, -1)
+    conditional.mark_deleted(Book)
+    recommended_by = getattr(instance, '_recommended_by', set())
+    # refill the lists from the matrix, which lost this book's cells too
+    recommendations.rebuild_top(recommended_by)
+    versions.touch_books(recommended_by)
+    search.remove_books([instance.pk])
+    versions.touch_authors([instance.author_id])
+    caching.purge_pages(['books', facets.GROUP, f'book:{instance.pk}'])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    caching.purge_pages([facets.GROUP])
+    if not reverse:
+        versions.touch_books([instance.pk])
+    elif pk_set:
+        versions.touch_books(pk_set)
+    else:
+        # post_clear from the genre side does not say which books were linked
+        versions.touch_books(Book.objects.filter(genre=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, **kwargs):
+    if not created:
+        versions.touch_books(instance.book_set.values_list('pk', flat=True))
+        caching.purge_pages([facets.GROUP])
+
+
+@receiver(post_save, sender=Language)
+def language_saved(sender, instance, created, **kwargs):
+    if not created:
+        versions.touch_books(instance.book_set.values_list('pk', flat=True))
+        caching.purge_pages([facets.GROUP])
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Language)
+def facet_value_deleting(sender, instance, **kwargs):
+    # the books lose the genre or language before post_delete, so remember them now
+    instance._book_pks = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Language)
+def facet_value_deleted(sender, instance, **kwargs):
+    versions.touch_books(getattr(instance, '_book_pks', []))
+    caching.purge_pages([facets.GROUP])
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(counters.AUTHORS)
+    else:
+        instance.book_set.update(author_sort=author_sort_key(instance.last_name, instance.first_name))
+        search.index_books(instance.book_set.all())
+        versions.touch_books(instance.book_set.values_list('pk', flat=True))
+    caching.purge_pages(['authors', 'books', facets.GROUP, f'author:{instance.pk}'])
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    # the books lose their author before post_delete, so remember them now
+    instance._book_pks = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    counters.increment(counters.AUTHORS, -1)
+    conditional.mark_deleted(Author)
+    Book.objects.filter(pk__in=getattr(instance, '_book_pks', [])).update(author_sort='')
+    search.index_books(Book.objects.filter(pk__in=getattr(instance, '_book_pks', [])))
+    versions.touch_books(getattr(instance, '_book_pks', []))
+    caching.purge_pages(['authors', 'books', facets.GROUP, f'author:{instance.pk}'])
+
+
+@receiver(post_save, sender=BookInstance)
+def copy_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.increment(counters.COPIES)
+        counters.record_status_change(None, instance.status)
+    elif getattr(instance, '_loaded_status', None) is None:
+        # saved without being loaded first, so the previous status is unknown
+        counters.rebuild([counters.COPIES_AVAILABLE])
+    else:
+        counters.record_status_change(instance._loaded_status, instance.status)
+    instance._loaded_status = instance.status
+    versions.touch_books([instance.book_id])
+    if created:
+        # the author page shows copy counts
+        versions.touch_authors(Book.objects.filter(pk=instance.book_id).values_list('author', flat=True))
+
+
+@receiver(post_delete, sender=BookInstance)
+def copy_deleted(sender, instance, **kwargs):
+    counters.increment(counters.COPIES, -1)
+    counters.record_status_change(instance.status, None)
+    versions.touch_books([instance.book_id])
+    versions.touch_authors(Book.objects.filter(pk=instance.book_id).values_list('author', flat=True))
+
+
+@receiver(copies_updated, sender=BookInstance)
+def copies_bulk_updated(sender, old_status, changes, updated, **kwargs):
+    if 'status' not in changes:
+        return
+    if isinstance(changes['status'], str):
+        counters.record_status_change(old_status, changes['status'], updated)
+    else:
+        # an expression, so the new status is only known to the database
+        counters.rebuild([counters.COPIES_AVAILABLE])
+
+
+@receiver(request_finished)
+def flush_visits(sender, **kwargs):
+    # after the response went out, so visitors never wait for the write
+    visits.flush_if_due()
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    db.apply_pragmas(connection)
+    db.set_transaction_mode(connection)
+
+
+@receiver(request_started)
+def check_connections(sender, **kwargs):
+    # runs after Django closed the connections past CONN_MAX_AGE
+    db.check_connections()
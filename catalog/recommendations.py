@@ -0,0 +1,136 @@
+"""
+    "Also borrowed" recommendations. update() reads the checkouts logged since
+    its last run, adds one to the co-borrow count of every pair of distinct
+    books a patron has borrowed, and rebuilds the stored top-N list of each
+    book whose counts changed. Book pages only read that stored list.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F, Max
+
+from catalog import versions
+from catalog.models import Book, BookCoBorrow, BookRecommendation, LoanEvent, RollupWatermark
+
+TOP_N = 5
+# recent distinct books of a patron a new checkout is paired with, bounding the work per checkout
+HISTORY_LIMIT = 200
+BATCH_SIZE = 5000
+WRITE_BATCH = 500
+WATERMARK = 'co-borrow'
+
+
+def _chunks(items, size=WRITE_BATCH):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _histories(patrons, before):
+    """Distinct books each patron checked out up to event id before, most recent last"""
+    histories = defaultdict(dict)
+    for chunk in _chunks(patrons):
+        rows = (LoanEvent.objects.filter(kind=LoanEvent.CHECKOUT, patron__in=chunk, id__lte=before,
+                                         book__isnull=False)
+                .values_list('patron', 'book').annotate(last=Max('id')).order_by('patron', 'last'))
+        for patron, book, _ in rows:
+            histories[patron][book] = None
+    return histories
+
+
+def _pair_counts(checkouts, histories):
+    """Count increments of the matrix for new checkouts, in id order; a patron counts once per pair"""
+    counts = Counter()
+    for patron, book in checkouts:
+        history = histories[patron]
+        if book in history:
+            continue
+        for other in list(history)[-HISTORY_LIMIT:]:
+            counts[book, other] += 1
+            counts[other, book] += 1
+        history[book] = None
+    return counts
+
+
+def _add(counts):
+    """Write matrix increments: one insert of new cells, then one UPDATE per book and increment"""
+    BookCoBorrow.objects.bulk_create([BookCoBorrow(book_id=book, other_id=other) for book, other in counts],
+                                     batch_size=WRITE_BATCH, ignore_conflicts=True)
+    grouped = defaultdict(list)
+    for (book, other), delta in counts.items():
+        grouped[book, delta].append(other)
+    for (book, delta), others in grouped.items():
+        for chunk in _chunks(others):
+            BookCoBorrow.objects.filter(book_id=book, other__in=chunk).update(count=F('count') + delta)
+
+
+def rebuild_top(books):
+    """Replace the stored recommendations of books with their TOP_N strongest neighbours"""
+    recommendations = []
+    for book in books:
+        top = (BookCoBorrow.objects.filter(book_id=book).order_by('-count', 'other')
+               .values_list('other', 'count')[:TOP_N])
+        recommendations.extend(BookRecommendation(book_id=book, recommended_id=other, rank=rank, score=count)
+                               for rank, (other, count) in enumerate(top, start=1))
+    for chunk in _chunks(books):
+        BookRecommendation.objects.filter(book__in=chunk).delete()
+    BookRecommendation.objects.bulk_create(recommendations, batch_size=WRITE_BATCH)
+
+
+def recommending(books):
+    """Ids of the books whose stored recommendations list one of books"""
+    return set(BookRecommendation.objects.filter(recommended__in=books).values_list('book', flat=True))
+
+
+def _update_batch(batch_size):
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        events = list(LoanEvent.objects.filter(id__gt=watermark.last_id).order_by('id')
+                      .values_list('id', 'kind', 'patron', 'book')[:batch_size])
+        if not events:
+            return 0, set()
+        checkouts = [(patron, book) for _, kind, patron, book in events
+                     if kind == LoanEvent.CHECKOUT and patron is not None and book is not None]
+        histories = _histories({patron for patron, _ in checkouts}, watermark.last_id)
+        # history keeps ids of deleted books, which the matrix cannot reference
+        existing = set()
+        referenced = {book for _, book in checkouts}.union(*histories.values())
+        for chunk in _chunks(referenced):
+            existing.update(Book.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+        checkouts = [(patron, book) for patron, book in checkouts if book in existing]
+        for history in histories.values():
+            for book in [book for book in history if book not in existing]:
+                del history[book]
+        counts = _pair_counts(checkouts, histories)
+        changed = {book for book, _ in counts}
+        if counts:
+            _add(counts)
+            rebuild_top(changed)
+            # new ETags and cached pages for the book pages showing the lists
+            versions.touch_books(changed)
+        watermark.last_id = events[-1][0]
+        watermark.save()
+    return len(events), changed
+
+
+def update(batch_size=BATCH_SIZE):
+    """
+        Fold the loan events written since the last run into the co-borrow
+        matrix and the recommendations, one transaction per batch
+        @return             : (number of events read, set of books whose recommendations were rebuilt)
+    """
+    total, changed = 0, set()
+    while True:
+        read, books = _update_batch(batch_size)
+        if not read:
+            return total, changed
+        total += read
+        changed |= books
+
+
+def reset():
+    """Drop the matrix, the recommendations and the watermark, so update() starts from the first event"""
+    with transaction.atomic():
+        BookCoBorrow.objects.all().delete()
+        BookRecommendation.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
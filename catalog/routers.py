@@ -0,0 +1,109 @@
+"""
+    Read/write splitting. Views decorated with use_replica read from one of
+    settings.REPLICA_DATABASES; every write, and every read outside those
+    views, goes to default. After a POST the visitor gets a short-lived
+    cookie that keeps their reads on default, so they see their own writes
+    even while the replicas lag behind.
+
+    Locally the 'replica' alias is a second SQLite file refreshed with
+    manage.py sync_replica; it is only read once that file exists.
+"""
+import contextvars
+import os
+import random
+import sqlite3
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# seconds a visitor keeps reading from default after a POST
+STICKY_SECONDS = 10
+STICKY_COOKIE = 'catalog_primary_until'
+
+_reading_from_replica = contextvars.ContextVar('reading_from_replica', default=False)
+
+
+def _is_ready(alias):
+    settings_dict = connections[alias].settings_dict
+    if settings_dict['NAME'] == connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+        # a test mirror of default: its own connection would not see default's open transaction
+        return False
+    if settings_dict['ENGINE'] == 'django.db.backends.sqlite3':
+        return os.path.exists(settings_dict['NAME'])
+    return True
+
+
+def is_sticky(request):
+    """True if the request comes within STICKY_SECONDS of the visitor's last POST"""
+    # signed and timestamped, so a client can neither forge nor extend it
+    return request.get_signed_cookie(STICKY_COOKIE, default=None, max_age=STICKY_SECONDS) is not None
+
+
+def use_replica(view):
+    """
+        View decorator sending the view's reads, including those made while
+        rendering its template, to a replica
+    """
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if is_sticky(request):
+            return view(request, *args, **kwargs)
+        token = _reading_from_replica.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render) and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            _reading_from_replica.reset(token)
+
+    return wrapped
+
+
+class ReplicaRouter:
+    """Database router reading from a random ready replica inside use_replica views"""
+
+    def db_for_read(self, model, **hints):
+        if not _reading_from_replica.get():
+            return DEFAULT_DB_ALIAS
+        replicas = [alias for alias in settings.REPLICA_DATABASES if _is_ready(alias)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from sync_replica
+        return db not in settings.REPLICA_DATABASES
+
+
+class StickyPrimaryMiddleware:
+    """Middleware marking visitors who just wrote, so use_replica keeps them on default"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_signed_cookie(STICKY_COOKIE, '1', max_age=STICKY_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+
+def copy_sqlite(source_alias, target_path):
+    """
+        Copy a SQLite database into target_path with the online backup API,
+        which reads a consistent snapshot without stopping writers
+    """
+    connections[source_alias].ensure_connection()
+    target = sqlite3.connect(target_path)
+    try:
+        connections[source_alias].connection.backup(target)
+    finally:
+        target.close()
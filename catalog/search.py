@@ -0,0 +1,105 @@
+"""
+    Full-text search over books, backed by an SQLite FTS5 table kept in sync by
+    the receivers in catalog.receivers. Other database backends fall back to
+    icontains lookups.
+"""
+import re
+
+from django.db import connection, connections, router, transaction
+from django.db.models import Q
+
+from catalog.models import Book
+
+TABLE = 'catalog_book_search'
+# bm25 column weights: title, summary, isbn, author
+WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+BATCH_SIZE = 1000
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _match_expression(query):
+    """Turn free text into an FTS5 query that ANDs prefix matches of every word"""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def index_books(books):
+    """
+        Add or refresh books in the search index
+        @param books        : Book queryset to (re)index
+    """
+    if not is_available():
+        return
+    rows = books.values_list('pk', 'title', 'summary', 'isbn',
+                             'author__first_name', 'author__last_name')
+    with transaction.atomic(), connection.cursor() as cursor:
+        batch = []
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                _write(cursor, batch)
+                batch = []
+        _write(cursor, batch)
+
+
+def _write(cursor, rows):
+    if not rows:
+        return
+    cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+    cursor.executemany(
+        f'INSERT INTO {TABLE} (rowid, title, summary, isbn, author) VALUES (%s, %s, %s, %s, %s)',
+        [(pk, title, summary, isbn, f'{first_name or ""} {last_name or ""}'.strip())
+         for pk, title, summary, isbn, first_name, last_name in rows])
+
+
+def remove_books(pks):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def rebuild():
+    """
+        Empty the index and reindex every book
+        @return             : number of books indexed
+    """
+    if not is_available():
+        return 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        index_books(Book.objects.order_by('pk'))
+    return Book.objects.count()
+
+
+def search(query, limit=20, offset=0):
+    """
+        Find books matching every word of query, best matches first
+        @param query        : free text typed by the patron
+        @param limit        : maximum number of books to return
+        @param offset       : number of ranked matches to skip
+        @return             : list of Book objects with their author loaded
+    """
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    books = Book.objects.select_related('author')
+    if not is_available():
+        condition = Q()
+        for word in re.findall(r'\w+', query):
+            condition &= (Q(title__icontains=word) | Q(summary__icontains=word) | Q(isbn__icontains=word)
+                          | Q(author__first_name__icontains=word) | Q(author__last_name__icontains=word))
+        return list(books.filter(condition).order_by('title')[offset:offset + limit])
+
+    # the index lives next to the books it is read with, a replica inside replica views
+    with connections[router.db_for_read(Book)].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            f'ORDER BY bm25({TABLE}, {", ".join(map(str, WEIGHTS))}) LIMIT %s OFFSET %s',
+            [expression, limit, offset])
+        pks = [row[0] for row in cursor.fetchall()]
+    found = books.in_bulk(pks)
+    return [found[pk] for pk in pks if pk in found]
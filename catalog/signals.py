@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent by BookInstanceQuerySet.update()/transition(), which do not send post_save.
+# old_status is the status every updated copy had, or None if status was not changed.
+copies_updated = Signal(providing_args=['queryset', 'old_status', 'changes', 'updated'])
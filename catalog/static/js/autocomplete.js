@@ -0,0 +1,49 @@
+// Fills the datalist of every autocomplete widget from its JSON endpoint and
+// copies the id of the chosen entry into the widget's hidden input.
+document.addEventListener('DOMContentLoaded', function () {
+  var DELAY = 200;
+
+  Array.prototype.forEach.call(document.querySelectorAll('.autocomplete'), function (widget) {
+    var hidden = widget.querySelector('input[type=hidden]');
+    var input = widget.querySelector('input[type=search]');
+    var list = widget.querySelector('datalist');
+    var ids = {};
+    var timer = null;
+    var request = 0;
+
+    function choose() {
+      hidden.value = ids.hasOwnProperty(input.value) ? ids[input.value] : '';
+      input.setCustomValidity(input.value && !hidden.value ? 'Choose an entry from the list' : '');
+    }
+
+    function lookup() {
+      var sent = ++request;
+      fetch(widget.dataset.url + '?q=' + encodeURIComponent(input.value), {credentials: 'same-origin'})
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+          if (sent !== request) {
+            return;  // an answer to an older query
+          }
+          list.innerHTML = '';
+          data.results.forEach(function (result) {
+            var option = document.createElement('option');
+            option.value = result.text;
+            list.appendChild(option);
+            ids[result.text] = result.id;
+          });
+          choose();
+        });
+    }
+
+    if (input.value) {
+      ids[input.value] = hidden.value;
+    }
+    input.addEventListener('input', function () {
+      choose();
+      clearTimeout(timer);
+      if (input.value) {
+        timer = setTimeout(lookup, DELAY);
+      }
+    });
+  });
+});
@@ -0,0 +1,126 @@
+"""
+    Static asset pipeline: collectstatic writes content-hashed copies with a
+    manifest plus gzip (and brotli, when installed) variants, and serve()
+    answers with the smallest variant the browser accepts. Hashed names
+    never change content, so they are cached for a year without revalidation.
+"""
+import gzip
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views import static
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.json', '.map', '.html', '.xml')
+# below this, a compressed copy saves less than the response headers
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# unhashed names can change content on the next deploy
+MUTABLE_MAX_AGE = 60 * 5
+
+
+def _encodings():
+    """(Accept-Encoding token, file suffix, compress function) in order of preference"""
+    encodings = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encodings.insert(0, ('br', '.br', brotli.compress))
+    return encodings
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that precompresses the hashed files and tolerates a missing manifest"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hashed_names = frozenset(self.hashed_files.values())
+
+    def save_manifest(self):
+        super().save_manifest()
+        self.hashed_names = frozenset(self.hashed_files.values())
+
+    def post_process(self, *args, **kwargs):
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(*args, **kwargs):
+            if isinstance(processed, Exception):
+                yield name, hashed_name, processed
+                continue
+            # a file can be yielded once per post-processing pass, compress its final copy once
+            if hashed_name and hashed_name not in compressed:
+                compressed.add(hashed_name)
+                self._compress(hashed_name)
+            yield name, hashed_name, processed
+
+    def _compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for _, suffix, compress in _encodings():
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if self.exists(self.manifest_name):
+                raise
+            # not collected yet (tests, a fresh checkout): link the source name
+            return name
+
+    def is_hashed(self, name):
+        return name in self.hashed_names
+
+
+def _find(path):
+    """Absolute path of a static file, from STATIC_ROOT or, in DEBUG, the app static directories"""
+    if settings.STATIC_ROOT:
+        full_path = os.path.join(settings.STATIC_ROOT, path)
+        if os.path.isfile(full_path):
+            return full_path
+    if settings.DEBUG:
+        return finders.find(path)
+    return None
+
+
+def serve(request, path):
+    """
+        Serve a static file, precompressed when the browser accepts it
+        @param request      : the Http request
+        @param path         : file path below STATIC_URL
+        @return             : the file, immutable for a year when its name is content-hashed
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    full_path = None if path.startswith('..') else _find(path)
+    if full_path is None:
+        raise Http404(f'"{path}" does not exist')
+    accepted = {token.split(';')[0].strip() for token in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')}
+    for token, suffix, _ in _encodings():
+        if token in accepted and os.path.isfile(full_path + suffix):
+            full_path += suffix
+            break
+    document_root, name = os.path.split(full_path)
+    # static.serve sets Content-Type from the original extension and Content-Encoding from the suffix
+    response = static.serve(request, name, document_root=document_root)
+    if getattr(staticfiles_storage, 'is_hashed', None) and staticfiles_storage.is_hashed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=MUTABLE_MAX_AGE)
+    if path.endswith(COMPRESSIBLE_EXTENSIONS):
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,45 @@
+from django import template
+from django.core.cache import cache
+
+from catalog import caching
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    def __init__(self, nodelist, name, obj, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.obj = obj
+        self.vary_on = vary_on
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        key = caching.fragment_key(name, self.obj.resolve(context), *vary_on)
+        content = cache.get(key)
+        caching.record(name, hit=content is not None)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, caching.FRAGMENT_TIMEOUT)
+        return content
+
+
+@register.tag
+def versioned_cache(parser, token):
+    """
+        Cache a fragment until the object it shows changes
+
+        {% versioned_cache 'book-copies' book [vary_on ...] %} ... {% endversioned_cache %}
+
+        The key includes the object's version, so a change to the object (or
+        anything dated onto it by catalog.receivers) renders a fresh fragment.
+        Further values, such as a permission, keep one copy per value.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name, an object and optional values")
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    return VersionedCacheNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]),
+                              [parser.compile_filter(bit) for bit in bits[3:]])
@@ -0,0 +1,27 @@
+from django import template
+
+register = template.Library()
+
+# parameters pointing into the current result list, meaningless once the filters change
+PAGE_PARAMS = ('cursor', 'page')
+
+
+@register.simple_tag(takes_context=True)
+def url_replace(context, name, value=None):
+    """
+        Query string of the current request with one parameter replaced
+
+        <a href="{% url_replace 'genre' genre.id %}"> keeps the other filters;
+        a value of None removes the parameter. Changing anything but the
+        page also drops the page, so a new filter starts on its first page.
+    """
+    query = context['request'].GET.copy()
+    if name not in PAGE_PARAMS:
+        for param in PAGE_PARAMS:
+            query.pop(param, None)
+    if value is None or value == '':
+        query.pop(name, None)
+    else:
+        query[name] = value
+    path = context['request'].path
+    return f'{path}?{query.urlencode()}' if query else path
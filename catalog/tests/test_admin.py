@@ -0,0 +1,55 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.tests.utils import QueryBudgetMixin
+
+
+class AdminTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@example.com',
+                                                  password='1X<ISRUkw+tuK')
+        cls.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.book = cls.add_book()
+
+    @classmethod
+    def add_book(cls):
+        book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593', author=cls.author)
+        book.genre.add(*[Genre.objects.create(name=f'Genre {number}') for number in range(4)])
+        for _ in range(3):
+            BookInstance.objects.create(book=book, imprint='Ace', status='o', borrower=cls.admin,
+                                        due_back=date.today())
+        return book
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def grow(self):
+        for _ in range(3):
+            self.add_book()
+
+    def test_book_changelist(self):
+        response = self.assertQueryBudget(5, reverse('admin:catalog_book_changelist'), grow=self.grow)
+        self.assertContains(response, 'Genre 0, Genre 1, Genre 2')
+
+    def test_copy_changelist(self):
+        self.assertQueryBudget(4, reverse('admin:catalog_bookinstance_changelist'), grow=self.grow)
+
+    def test_copies_inline_is_paginated(self):
+        for _ in range(25):
+            BookInstance.objects.create(book=self.book, imprint='Second Imprint')
+        url = reverse('admin:catalog_book_change', args=[self.book.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.context['inline_admin_formsets'][0].formset.initial_form_count(), 20)
+        self.assertContains(response, 'page 1 of 2')
+        response = self.client.get(url, {'bookinstance_page': 2})
+        self.assertEqual(response.context['inline_admin_formsets'][0].formset.initial_form_count(), 8)
+        self.assertContains(response, '?bookinstance_page=1')
+
+    def test_author_autocomplete(self):
+        response = self.client.get(reverse('admin:catalog_author_autocomplete'), {'term': 'Her'})
+        self.assertEqual([result['text'] for result in response.json()['results']], ['Herbert, Frank'])
@@ -0,0 +1,86 @@
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import autocomplete
+from catalog.models import Author, Book, Genre, Language
+
+
+class AuthorAutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.le_guin = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.herbert = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.hesse = Author.objects.create(first_name='Hermann', last_name='Hesse')
+
+    def test_prefix_of_last_or_first_name(self):
+        self.assertEqual(autocomplete.authors('He')[0], [self.herbert, self.hesse])
+        self.assertEqual(autocomplete.authors('urs')[0], [self.le_guin])
+        self.assertEqual(autocomplete.authors('her')[0], [self.herbert, self.hesse])
+        self.assertEqual(autocomplete.authors('x')[0], [])
+        self.assertEqual(autocomplete.authors('  ')[0], [])
+
+    def test_two_words_match_both_names(self):
+        self.assertEqual(autocomplete.authors('herm hes')[0], [self.hesse])
+        self.assertEqual(autocomplete.authors('Hesse H')[0], [self.hesse])
+        self.assertEqual(autocomplete.authors('frank hes')[0], [])
+
+    def test_results_capped(self):
+        Author.objects.bulk_create(Author(first_name=f'F{n}', last_name=f'Heinlein{n}') for n in range(5))
+        authors, more = autocomplete.authors('he', limit=3)
+        self.assertEqual(len(authors), 3)
+        self.assertTrue(more)
+
+    def test_lookup_uses_name_indexes(self):
+        plan = Author.objects.filter(autocomplete._prefix('last_name', 'he')
+                                     | autocomplete._prefix('first_name', 'he')).explain()
+        self.assertIn('author_name_idx', plan)
+        self.assertIn('author_first_name_idx', plan)
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('author-autocomplete'), {'q': 'le'})
+        self.assertEqual(response.json(), {'results': [{'id': self.le_guin.pk, 'text': 'Le Guin, Ursula'}],
+                                           'more': False})
+
+
+class BookFormTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        cls.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.librarian)
+
+    def test_form_does_not_list_authors(self):
+        size = len(self.client.get(reverse('book-create')).content)
+        Author.objects.bulk_create(Author(first_name='First', last_name=f'Last{n}') for n in range(200))
+        response = self.client.get(reverse('book-create'))
+        self.assertEqual(len(response.content), size)
+        self.assertContains(response, reverse('author-autocomplete'))
+        self.assertContains(response, 'js/autocomplete.js')
+
+    def test_update_shows_current_author(self):
+        response = self.client.get(reverse('book-update', args=[self.book.pk]))
+        self.assertContains(response, 'value="Herbert, Frank"')
+        self.assertContains(response, f'name="author" value="{self.author.pk}"')
+
+    def test_create_with_author_id(self):
+        language = Language.objects.create(name='English')
+        genre = Genre.objects.create(name='Science Fiction')
+        self.client.post(reverse('book-create'), {
+            'title': 'Dune Messiah', 'summary': 'More spice.', 'isbn': '9780441172696',
+            'author': self.author.pk, 'language': language.pk, 'genre': [genre.pk],
+        })
+        self.assertEqual(Book.objects.get(title='Dune Messiah').author, self.author)
+
+    def test_invalid_author_redisplays_form(self):
+        for author in ('abc', '999999'):
+            with self.subTest(author=author):
+                response = self.client.post(reverse('book-create'), {
+                    'title': 'Dune Messiah', 'summary': 'More spice.', 'isbn': '9780441172696', 'author': author,
+                })
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['author'])
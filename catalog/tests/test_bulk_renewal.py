@@ -0,0 +1,66 @@
+import json
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Book, BookInstance
+
+
+class BulkRenewalTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron')
+        cls.librarian = User.objects.create_user(username='librarian')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+        cls.loans = [BookInstance.objects.create(book=book, imprint='Ace', status='o', borrower=cls.patron,
+                                                 due_back=date.today()) for _ in range(3)]
+        cls.shelved = BookInstance.objects.create(book=book, imprint='Ace', status='a')
+
+    def setUp(self):
+        self.client.force_login(self.librarian)
+        self.due_back = date.today() + timedelta(weeks=2)
+
+    def post_api(self, payload):
+        return self.client.post(reverse('renew-books-api'), json.dumps(payload), content_type='application/json')
+
+    def test_api_renews_in_one_update(self):
+        missing = uuid.uuid4()
+        copies = [str(copy.pk) for copy in self.loans] + [str(self.shelved.pk), str(missing)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_api({'due_back': str(self.due_back), 'copies': copies})
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "catalog_bookinstance"')]
+        self.assertEqual(len(updates), 1)
+        data = response.json()
+        self.assertEqual(data['renewed'], 3)
+        self.assertEqual(data['results'][3], {'id': str(self.shelved.pk), 'renewed': False, 'status': 'a'})
+        self.assertEqual(data['results'][4], {'id': str(missing), 'renewed': False, 'status': None})
+        self.assertEqual(set(BookInstance.objects.filter(status='o').values_list('due_back', flat=True)),
+                         {self.due_back})
+
+    def test_api_validates_with_renewal_rules(self):
+        response = self.post_api({'due_back': str(date.today() - timedelta(days=1)),
+                                  'copies': [str(self.loans[0].pk)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], {'due_back': ['Invalid date - renewal in past']})
+        response = self.post_api({'due_back': str(self.due_back), 'copies': ['not-a-uuid']})
+        self.assertEqual(response.json()['errors'], {'__all__': ['Invalid copy id.']})
+        self.assertEqual(self.post_api([]).status_code, 400)
+
+    def test_api_needs_permission(self):
+        self.client.force_login(self.patron)
+        self.assertEqual(self.post_api({'due_back': str(self.due_back), 'copies': []}).status_code, 403)
+
+    def test_form(self):
+        self.assertContains(self.client.get(reverse('all-borrowed')), 'form="bulk-renew"')
+        response = self.client.post(reverse('renew-books-librarian'), {
+            'due_back': self.due_back, 'copy': [self.loans[0].pk, self.shelved.pk]})
+        self.assertContains(response, 'Renewed')
+        self.assertContains(response, 'Not renewed: Available')
+        response = self.client.post(reverse('renew-books-librarian'), {'due_back': self.due_back})
+        self.assertContains(response, 'Select at least one copy.')
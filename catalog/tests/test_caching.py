@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import _create_cache, cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import caching
+from catalog.models import Author, Book, BookInstance, Genre
+
+
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593', author=cls.author)
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+        cls.patron = User.objects.create_user(username='patron')
+
+    def setUp(self):
+        cache.clear()
+        # logged in, so whole pages are not cached and the fragments are exercised
+        self.client.force_login(self.patron)
+
+    def test_copies_fragment_served_from_cache(self):
+        url = self.book.get_absolute_url()
+        self.client.get(url)
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+        self.assertContains(response, 'Available')
+        self.assertEqual(caching.stats()['book-copies'], {'hits': 1, 'misses': 1})
+
+    def test_copies_fragment_follows_changes(self):
+        url = self.book.get_absolute_url()
+        self.client.get(url)
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='o')
+        self.assertContains(self.client.get(url), 'On loan')
+        BookInstance.objects.create(book=self.book, imprint='Second Imprint')
+        self.assertContains(self.client.get(url), 'Second Imprint')
+        self.book.genre.add(Genre.objects.create(name='Science Fiction'))
+        self.client.get(url)
+        self.assertEqual(caching.stats()['book-copies'], {'hits': 0, 'misses': 4})
+
+    def test_author_books_fragment(self):
+        url = self.author.get_absolute_url()
+        self.assertContains(self.client.get(url), 'Dune</a>\n        (1)')
+        BookInstance.objects.create(book=self.book, imprint='Ace')
+        self.assertContains(self.client.get(url), 'Dune</a>\n        (2)')
+        with self.assertNumQueries(6):
+            self.client.get(url)
+        self.assertEqual(caching.stats()['author-books'], {'hits': 1, 'misses': 2})
+
+    def test_stats_view_is_staff_only(self):
+        self.client.get(self.book.get_absolute_url())
+        self.assertEqual(self.client.get(reverse('cache-stats')).status_code, 302)
+        self.client.force_login(User.objects.create_user(username='staff', is_staff=True))
+        self.assertEqual(self.client.get(reverse('cache-stats')).json(),
+                         {'book-also-borrowed': {'hits': 0, 'misses': 1},
+                          'book-copies': {'hits': 0, 'misses': 1}})
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593', author=cls.author)
+        cls.other = Book.objects.create(title='Children of Dune', summary='Spice.', isbn='9780441104024',
+                                        author=cls.author)
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_served_without_queries(self):
+        for url in (reverse('books'), reverse('authors'), self.book.get_absolute_url(),
+                    self.author.get_absolute_url()):
+            response = self.client.get(url)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).content, response.content)
+        self.assertEqual(caching.stats()['pages'], {'hits': 4, 'misses': 4})
+
+    def test_revalidated_from_cache(self):
+        url = self.book.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_purged_by_changes(self):
+        url = self.book.get_absolute_url()
+        self.client.get(url)
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='o')
+        self.assertContains(self.client.get(url), 'On loan')
+        author = Author.objects.get(pk=self.author.pk)
+        author.last_name = 'Herbert Jr.'
+        author.save()
+        self.assertContains(self.client.get(url), 'Herbert Jr.')
+        self.assertContains(self.client.get(reverse('books')), 'Herbert Jr.')
+        self.assertContains(self.client.get(reverse('authors')), 'Herbert Jr.')
+
+    def test_purge_is_targeted(self):
+        self.client.get(self.other.get_absolute_url())
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='o')
+        with self.assertNumQueries(0):
+            self.client.get(self.other.get_absolute_url())
+
+    def test_purged_from_another_process(self):
+        url = self.book.get_absolute_url()
+        self.client.get(url)
+        # a local-memory cache would only be shared within one process
+        self.assertNotIsInstance(cache, LocMemCache)
+        # a second backend instance, as a management command or another worker would have
+        other = _create_cache(settings.CACHES['default']['BACKEND'], **settings.CACHES['default'])
+        with mock.patch.object(caching, 'cache', other):
+            BookInstance.objects.filter(pk=self.copy.pk).update(status='o')
+        self.assertContains(self.client.get(url), 'On loan')
+
+    def test_purged_again_on_commit(self):
+        group = f'book:{self.book.pk}'
+        before = caching.generation([group])
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='o')
+        # pages cached from here to the commit were rendered from the old rows
+        uncommitted = caching.generation([group])
+        self.assertNotEqual(uncommitted, before)
+        for _, callback in connection.run_on_commit:
+            callback()
+        self.assertNotEqual(caching.generation([group]), uncommitted)
+
+    def test_skipped_with_a_session(self):
+        self.client.force_login(User.objects.create_user(username='patron'))
+        url = self.book.get_absolute_url()
+        self.client.get(url)
+        self.client.get(url)
+        self.assertNotIn('pages', caching.stats())
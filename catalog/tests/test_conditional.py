@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import caching
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593', author=cls.author)
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+        cls.user = User.objects.create_user(username='patron')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertRevalidates(self, url, change=None):
+        """Assert url answers 304 to its own validators, and 200 again after change()"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # drop the cached page so the view's own revalidation is measured
+        caching.purge_all_pages()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        if change:
+            change()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_book_detail(self):
+        url = self.book.get_absolute_url()
+        self.assertRevalidates(url, lambda: Book.objects.get(pk=self.book.pk).save())
+
+    def test_book_detail_follows_copies(self):
+        url = self.book.get_absolute_url()
+        self.assertRevalidates(url, lambda: BookInstance.objects.filter(pk=self.copy.pk).update(status='o'))
+        self.assertRevalidates(url, lambda: BookInstance.objects.create(book=self.book, imprint='Ace'))
+        self.assertRevalidates(url, lambda: self.book.genre.add(Genre.objects.create(name='Science Fiction')))
+        language = Language.objects.create(name='English')
+        Book.objects.filter(pk=self.book.pk).update(language=language)
+        language.name = 'British English'
+        self.assertRevalidates(url, language.save)
+        self.assertRevalidates(url, language.delete)
+        self.assertRevalidates(url, Genre.objects.get(name='Science Fiction').delete)
+
+    def test_author_detail_follows_books_and_copies(self):
+        url = self.author.get_absolute_url()
+        self.assertRevalidates(url, lambda: Book.objects.get(pk=self.book.pk).save())
+        self.assertRevalidates(url, lambda: BookInstance.objects.get(pk=self.copy.pk).delete())
+
+    def test_lists(self):
+        self.assertRevalidates(reverse('books'), lambda: Author.objects.get(pk=self.author.pk).save())
+        self.assertRevalidates(reverse('authors'),
+                               lambda: Author.objects.create(first_name='Ursula', last_name='Le Guin'))
+
+    def test_lists_follow_deletions(self):
+        older = Book.objects.create(title='Dune Messiah', summary='Spice.', isbn='9780593098233')
+        Book.objects.filter(pk=older.pk).update(last_modified=self.book.last_modified.replace(year=2000))
+        self.assertRevalidates(reverse('books'), lambda: Book.objects.get(pk=older.pk).delete())
+        author = Author.objects.create(first_name='Brian', last_name='Herbert')
+        Author.objects.filter(pk=author.pk).update(last_modified=self.author.last_modified.replace(year=2000))
+        self.assertRevalidates(reverse('authors'), lambda: Author.objects.get(pk=author.pk).delete())
+        response = self.client.get(reverse('books'))
+        self.assertEqual(self.client.get(reverse('books'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                         .status_code, 304)
+
+    def test_last_modified_for_anonymous_only(self):
+        url = self.book.get_absolute_url()
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_missing_book_is_404(self):
+        self.assertEqual(self.client.get(reverse('book-detail', kwargs={'pk': 999})).status_code, 404)
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import counters
+from catalog.models import Author, Book, BookInstance, CatalogCounter
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.book = Book.objects.create(title='Test Book', summary='Summary',
+                                       isbn='1234567891123', author=cls.author)
+        for status in ('a', 'a', 'o', 'm'):
+            BookInstance.objects.create(book=cls.book, imprint='Imprint', status=status)
+
+    def assertCountersMatchTables(self):
+        self.assertEqual(counters.get_counts(), {
+            counters.BOOKS: Book.objects.count(),
+            counters.COPIES: BookInstance.objects.count(),
+            counters.COPIES_AVAILABLE: BookInstance.objects.filter(status='a').count(),
+            counters.AUTHORS: Author.objects.count(),
+        })
+
+    def test_counts_follow_creation(self):
+        self.assertEqual(counters.get_counts()[counters.COPIES_AVAILABLE], 2)
+        self.assertCountersMatchTables()
+
+    def test_counts_follow_save_and_delete(self):
+        copy = BookInstance.objects.filter(status='o').get()
+        copy.status = 'a'
+        copy.save()
+        self.assertEqual(counters.get_counts()[counters.COPIES_AVAILABLE], 3)
+        BookInstance.objects.filter(status='a').first().delete()
+        self.assertCountersMatchTables()
+        self.author.delete()
+        self.assertCountersMatchTables()
+
+    def test_counts_follow_queryset_update(self):
+        BookInstance.objects.all().update(status='m')
+        self.assertEqual(counters.get_counts()[counters.COPIES_AVAILABLE], 0)
+        BookInstance.objects.all().update(status='a')
+        self.assertEqual(counters.get_counts()[counters.COPIES_AVAILABLE], 4)
+        self.assertCountersMatchTables()
+
+    def test_missing_counter_is_rebuilt(self):
+        CatalogCounter.objects.filter(name=counters.BOOKS).delete()
+        Book.objects.create(title='Another', summary='Summary', isbn='1')
+        self.assertCountersMatchTables()
+
+    def test_rebuild_command(self):
+        CatalogCounter.objects.update(value=0)
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+        self.assertIn('copies: 4', out.getvalue())
+        self.assertCountersMatchTables()
+
+    def test_index_runs_no_aggregate_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_instances_available'], 2)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
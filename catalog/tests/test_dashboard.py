@@ -0,0 +1,98 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import dashboard
+from catalog.models import Book, BookInstance, Genre, LoanEvent
+
+
+@skipUnless(dashboard.is_available(), 'NumPy is not installed')
+class DashboardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.sf = Genre.objects.create(name='Science Fiction')
+        cls.fantasy = Genre.objects.create(name='Fantasy')
+        cls.dune = Book.objects.create(title='Dune', summary='Spice.', isbn='1')
+        cls.dune.genre.add(cls.sf)
+        cls.earthsea = Book.objects.create(title='A Wizard of Earthsea', summary='Mage.', isbn='2')
+        cls.earthsea.genre.add(cls.fantasy, cls.sf)
+        cls.today = date(2026, 4, 15)
+
+    def setUp(self):
+        cache.clear()
+
+    def copy(self, book, **kwargs):
+        return BookInstance.objects.create(book=book, imprint='Ace', **kwargs)
+
+    def event(self, kind, copy, day):
+        occurred = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=10))
+        LoanEvent.objects.create(kind=kind, copy_id=copy.pk, book_id=copy.book_id, occurred=occurred)
+
+    def test_metrics(self):
+        first, second = self.copy(self.dune), self.copy(self.earthsea)
+        self.event(LoanEvent.CHECKOUT, first, date(2026, 4, 1))
+        self.event(LoanEvent.RENEW, first, date(2026, 4, 5))
+        self.event(LoanEvent.RETURN, first, date(2026, 4, 11))
+        self.event(LoanEvent.CHECKOUT, second, date(2026, 4, 11))
+        self.event(LoanEvent.RETURN, second, date(2026, 4, 13))
+        self.event(LoanEvent.CHECKOUT, first, date(2026, 4, 14))
+
+        metrics, folded = dashboard.refresh(today=self.today)
+        self.assertEqual(folded, 6)
+        self.assertEqual(metrics['average_loan_days'], 6)
+        self.assertEqual(metrics['completed_loans'], 2)
+        self.assertEqual(metrics['open_loans'], 1)
+        loans_per_day = dict(metrics['loans_per_day'])
+        self.assertEqual(len(loans_per_day), dashboard.TREND_DAYS)
+        self.assertEqual(loans_per_day['2026-04-11'], 1)
+        self.assertEqual(loans_per_day['2026-04-15'], 0)
+        self.assertEqual(metrics['busiest_titles'], [{'id': self.dune.pk, 'title': 'Dune', 'loans': 2},
+                                                     {'id': self.earthsea.pk, 'title': 'A Wizard of Earthsea',
+                                                      'loans': 1}])
+
+    def test_incremental_refresh_pairs_loans_across_runs(self):
+        copy = self.copy(self.dune)
+        self.event(LoanEvent.CHECKOUT, copy, date(2026, 4, 1))
+        self.assertEqual(dashboard.refresh(today=self.today)[0]['open_loans'], 1)
+        self.event(LoanEvent.RETURN, copy, date(2026, 4, 4))
+        metrics, folded = dashboard.refresh(today=self.today, chunk_size=1)
+        self.assertEqual(folded, 1)
+        self.assertEqual((metrics['average_loan_days'], metrics['open_loans']), (3, 0))
+        self.assertEqual(dashboard.refresh(today=self.today)[1], 0)
+
+    def test_overdue_by_genre(self):
+        self.copy(self.dune, status='o', due_back=self.today - timedelta(days=1))
+        self.copy(self.earthsea, status='o', due_back=self.today + timedelta(days=1))
+        self.copy(self.earthsea, status='a')
+        overdue = dashboard.refresh(today=self.today)[0]['overdue']
+        self.assertEqual((overdue['on_loan'], overdue['overdue']), (2, 1))
+        self.assertEqual(overdue['rows'], [
+            {'genre': 'Science Fiction', 'on_loan': 2, 'overdue': 1, 'rate': 0.5},
+            {'genre': 'Fantasy', 'on_loan': 1, 'overdue': 0, 'rate': 0.0},
+        ])
+
+    def test_page_load_reads_stored_metrics(self):
+        self.event(LoanEvent.CHECKOUT, self.copy(self.dune), date.today())
+        call_command('refresh_dashboard', stdout=StringIO())
+        cache.clear()
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('circulation-dashboard'))
+        self.assertContains(response, 'Dune')
+        # the first load read the snapshot row, later ones the cache
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('circulation-dashboard'))
+        self.assertFalse([query for query in queries if 'catalog_' in query['sql']])
+
+    def test_page_before_first_refresh(self):
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('circulation-dashboard')), 'refresh_dashboard')
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from catalog import db
+
+
+class PragmaTest(TestCase):
+    def tearDown(self):
+        # the connection outlives the test; journal_mode and synchronous cannot change inside its transaction
+        restore = {name: settings.SQLITE_PRAGMAS[name] for name in ('cache_size', 'busy_timeout')}
+        with override_settings(SQLITE_PRAGMAS=restore):
+            db.apply_pragmas(connection)
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connections(self):
+        self.assertEqual(self.pragma('cache_size'), -20000)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1000})
+    def test_apply_pragmas(self):
+        db.apply_pragmas(connection)
+        self.assertEqual(self.pragma('cache_size'), -1000)
+
+    def test_database_pragmas_override_settings(self):
+        with mock.patch.dict(connection.settings_dict, {'PRAGMAS': {'busy_timeout': 250}}), \
+                override_settings(SQLITE_PRAGMAS={'busy_timeout': 5000}):
+            db.apply_pragmas(connection)
+        self.assertEqual(self.pragma('busy_timeout'), 250)
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': '1; DROP TABLE catalog_book'})
+    def test_invalid_pragma_rejected(self):
+        with self.assertRaises(ValueError):
+            db.apply_pragmas(connection)
+
+    def test_transaction_mode(self):
+        with mock.patch.dict(connection.settings_dict, {'TRANSACTION_MODE': 'IMMEDIATE'}):
+            with mock.patch.object(connection, '_start_transaction_under_autocommit'):
+                db.set_transaction_mode(connection)
+                statements = []
+                with mock.patch.object(connection, 'cursor') as cursor:
+                    cursor.return_value.execute.side_effect = statements.append
+                    connection._start_transaction_under_autocommit()
+        self.assertEqual(statements, ['BEGIN IMMEDIATE'])
+
+    def test_invalid_transaction_mode_rejected(self):
+        with mock.patch.dict(connection.settings_dict, {'TRANSACTION_MODE': 'NOW'}):
+            with self.assertRaises(ValueError):
+                db.set_transaction_mode(connection)
+
+
+class HealthCheckTest(TestCase):
+    def setUp(self):
+        self.connection = mock.Mock(vendor='sqlite', alias='other', in_atomic_block=False,
+                                    settings_dict={'CONN_HEALTH_CHECKS': True})
+        patcher = mock.patch.object(db.connections, 'all', return_value=[self.connection])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_broken_connection_closed(self):
+        self.connection.connection.execute.side_effect = Exception('disk I/O error')
+        self.assertEqual(db.check_connections(), ['other'])
+        self.connection.close.assert_called_once_with()
+
+    def test_healthy_connection_kept(self):
+        self.assertEqual(db.check_connections(), [])
+        self.connection.connection.execute.assert_called_once_with('SELECT 1')
+        self.connection.close.assert_not_called()
+
+    def test_not_checked_without_setting(self):
+        self.connection.settings_dict = {}
+        self.connection.connection.execute.side_effect = Exception('disk I/O error')
+        self.assertEqual(db.check_connections(), [])
+
+    def test_real_connection_in_test_transaction_kept(self):
+        with mock.patch.object(db.connections, 'all', return_value=[connection]), \
+                mock.patch.dict(connection.settings_dict, {'CONN_HEALTH_CHECKS': True}):
+            self.assertEqual(db.check_connections(), [])
+        self.assertIsNotNone(connection.connection)
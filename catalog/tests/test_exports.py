@@ -0,0 +1,74 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import exports
+from catalog.models import Author, Book, BookInstance, Genre
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron')
+        cls.librarian = User.objects.create_user(username='librarian')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593', author=author)
+        cls.book.genre.set([Genre.objects.create(name='Science Fiction'), Genre.objects.create(name='Classic')])
+        Book.objects.create(title='Anonymous', summary='', isbn='1')
+        cls.overdue = BookInstance.objects.create(book=cls.book, imprint='Ace', status='o', borrower=cls.patron,
+                                                  due_back=date.today() - timedelta(days=1))
+        BookInstance.objects.create(book=cls.book, imprint='Ace', status='o', borrower=cls.patron,
+                                    due_back=date.today() + timedelta(days=7))
+        BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+
+    def rows(self, kind):
+        return list(csv.reader(exports.stream(kind, 'csv')))
+
+    def test_loans(self):
+        rows = self.rows('loans')
+        self.assertEqual(rows[0], ['id', 'title', 'isbn', 'borrower', 'due_back', 'overdue'])
+        self.assertEqual(rows[1], [str(self.overdue.pk), 'Dune', '9780441013593', 'patron',
+                                   str(self.overdue.due_back), 'True'])
+        self.assertEqual(rows[2][-1], 'False')
+        self.assertEqual(len(rows), 3)
+
+    def test_copies_and_catalog(self):
+        self.assertEqual(len(self.rows('copies')), 4)
+        catalog = self.rows('catalog')
+        self.assertEqual(catalog[1][1:6], ['Dune', 'Herbert, Frank', '9780441013593', '', 'Classic;Science Fiction'])
+        self.assertEqual(catalog[2][2], '')
+
+    def test_jsonl(self):
+        lines = [json.loads(line) for line in exports.stream('loans', 'jsonl')]
+        self.assertEqual(lines[0]['id'], str(self.overdue.pk))
+        self.assertTrue(lines[0]['overdue'])
+
+    def test_view_streams_for_librarians(self):
+        url = reverse('export', kwargs={'kind': 'loans', 'fmt': 'csv'})
+        self.client.force_login(self.patron)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.librarian)
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="loans.csv"')
+        self.assertEqual(len(list(csv.reader(line.decode() for line in response.streaming_content))), 3)
+        self.assertEqual(self.client.get(reverse('export', kwargs={'kind': 'users', 'fmt': 'csv'})).status_code, 404)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_catalog', 'copies', '--format', 'jsonl', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.csv')
+            call_command('export_catalog', 'catalog', output=path)
+            with open(path) as file:
+                self.assertEqual(len(list(csv.reader(file))), 3)
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase
+from django.template import Context, Template
+from django.urls import reverse
+
+from catalog import facets
+from catalog.models import Author, Book, Genre, Language
+
+
+class FacetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.herbert = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.le_guin = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.english = Language.objects.create(name='English')
+        cls.sf = Genre.objects.create(name='Science Fiction')
+        cls.fantasy = Genre.objects.create(name='Fantasy')
+        cls.dune = Book.objects.create(title='Dune', summary='Spice.', isbn='1', author=cls.herbert,
+                                       language=cls.english)
+        cls.dune.genre.add(cls.sf)
+        cls.earthsea = Book.objects.create(title='A Wizard of Earthsea', summary='Mage.', isbn='2',
+                                           author=cls.le_guin, language=cls.english)
+        cls.earthsea.genre.add(cls.fantasy)
+        cls.dispossessed = Book.objects.create(title='The Dispossessed', summary='Anarres.', isbn='3',
+                                               author=cls.le_guin)
+        cls.dispossessed.genre.add(cls.sf)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_filters(self):
+        self.assertEqual(facets.parse_filters(QueryDict('genre=3&language=x&author=&cursor=abc')), {'genre': 3})
+
+    def test_counts(self):
+        counts = facets.counts({})
+        self.assertEqual(counts['genre'], [(self.sf.pk, 'Science Fiction', 2), (self.fantasy.pk, 'Fantasy', 1)])
+        self.assertEqual(counts['language'], [(self.english.pk, 'English', 2)])
+        self.assertEqual(counts['author'], [(self.le_guin.pk, 'Le Guin, Ursula', 2), (self.herbert.pk, 'Herbert, Frank', 1)])
+
+    def test_counts_of_filtered_books(self):
+        counts = facets.counts({'genre': self.sf.pk, 'author': self.le_guin.pk})
+        self.assertEqual(counts['genre'], [(self.sf.pk, 'Science Fiction', 1)])
+        self.assertEqual(counts['language'], [])
+        self.assertEqual(counts['author'], [(self.le_guin.pk, 'Le Guin, Ursula', 1)])
+
+    def test_counts_cached_until_catalog_changes(self):
+        facets.counts({'genre': self.sf.pk})
+        with self.assertNumQueries(0):
+            facets.counts({'genre': self.sf.pk})
+        self.earthsea.genre.add(self.sf)
+        self.assertEqual(facets.counts({'genre': self.sf.pk})['genre'][0], (self.sf.pk, 'Science Fiction', 3))
+        self.fantasy.name = 'High Fantasy'
+        self.fantasy.save()
+        self.assertIn((self.fantasy.pk, 'High Fantasy', 1), facets.counts({})['genre'])
+
+    def test_book_list_filters(self):
+        response = self.client.get(reverse('books'), {'genre': self.sf.pk})
+        self.assertEqual(list(response.context['book_list']), [self.dune, self.dispossessed])
+        genre = response.context['facets'][0]
+        self.assertTrue(genre['selected'])
+        self.assertContains(response, f'href="/catalog/books/?genre={self.sf.pk}&amp;author={self.le_guin.pk}"')
+        self.assertContains(response, 'href="/catalog/books/">any</a>')
+
+    def test_cached_page_purged_by_genre_change(self):
+        url = reverse('books') + f'?genre={self.fantasy.pk}'
+        self.assertNotContains(self.client.get(url), 'Dune')
+        self.dune.genre.add(self.fantasy)
+        self.assertContains(self.client.get(url), 'Dune')
+
+
+class UrlReplaceTest(TestCase):
+    def render(self, query, *args):
+        request = RequestFactory().get('/catalog/books/', query)
+        template = Template('{% load catalog_urls %}{% url_replace ' + ' '.join(args) + ' %}')
+        return template.render(Context({'request': request}))
+
+    def test_replaces_parameter_and_drops_page(self):
+        self.assertEqual(self.render({'genre': 1, 'cursor': 'abc', 'page': 2}, "'language'", '4'),
+                         '/catalog/books/?genre=1&amp;language=4')
+
+    def test_page_keeps_filters(self):
+        self.assertEqual(self.render({'genre': 1, 'cursor': 'abc'}, "'cursor'", "'def'"),
+                         '/catalog/books/?genre=1&amp;cursor=def')
+
+    def test_none_removes_parameter(self):
+        self.assertEqual(self.render({'genre': 1}, "'genre'", 'None'), '/catalog/books/')
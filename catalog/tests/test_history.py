@@ -0,0 +1,111 @@
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import history, loans
+from catalog.models import Book, BookInstance, DailyLoanStat, Hold, LoanEvent, MonthlyLoanStat
+
+
+class LoanEventTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron')
+        cls.other = User.objects.create_user(username='other')
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+
+    def events(self):
+        return list(LoanEvent.objects.order_by('id').values_list('kind', 'copy', 'book', 'patron', 'due_back'))
+
+    def test_operations_recorded(self):
+        due_back = date.today() + timedelta(weeks=2)
+        loans.checkout(self.copy.pk, self.patron, due_back)
+        loans.renew(self.copy.pk, due_back + timedelta(weeks=1))
+        Hold.objects.create(book=self.book, patron=self.other)
+        loans.return_copy(self.copy.pk)
+        self.assertEqual(self.events(), [
+            ('checkout', self.copy.pk, self.book.pk, self.patron.pk, due_back),
+            ('renew', self.copy.pk, self.book.pk, self.patron.pk, due_back + timedelta(weeks=1)),
+            ('return', self.copy.pk, self.book.pk, self.patron.pk, due_back + timedelta(weeks=1)),
+            ('reserve', self.copy.pk, self.book.pk, self.other.pk, date.today() + loans.PICKUP_PERIOD),
+        ])
+
+    def test_conflicts_not_recorded(self):
+        with self.assertRaises(loans.LoanConflict):
+            loans.renew(self.copy.pk, date.today())
+        with self.assertRaises(loans.LoanConflict):
+            loans.return_copy(self.copy.pk)
+        self.assertEqual(self.events(), [])
+
+    def test_bulk_operations_write_one_event_per_copy(self):
+        copies = [BookInstance.objects.create(book=self.book, imprint='Ace', status='o', borrower=self.patron,
+                                              due_back=date.today()) for _ in range(3)]
+        ids = [copy.pk for copy in copies] + [self.copy.pk]
+        with self.assertNumQueries(1, using='default'):
+            history.record(LoanEvent.RENEW, BookInstance.objects.filter(pk__in=ids, status__exact='o'))
+        LoanEvent.objects.all().delete()
+        loans.renew_many(ids, date.today() + timedelta(weeks=1))
+        self.assertEqual(LoanEvent.objects.filter(kind=LoanEvent.RENEW).count(), 3)
+        loans.return_copies(BookInstance.objects.filter(pk__in=ids))
+        self.assertEqual(LoanEvent.objects.filter(kind=LoanEvent.RETURN, patron=self.patron).count(), 3)
+
+    def test_history_outlives_copy(self):
+        loans.checkout(self.copy.pk, self.patron)
+        BookInstance.objects.filter(pk=self.copy.pk).delete()
+        self.assertEqual(LoanEvent.objects.get().copy_id, self.copy.pk)
+
+
+class RollupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+
+    def add_events(self, kind, day, count):
+        occurred = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=12))
+        LoanEvent.objects.bulk_create(LoanEvent(kind=kind, occurred=occurred) for _ in range(count))
+
+    def test_incremental_rollup(self):
+        self.add_events(LoanEvent.CHECKOUT, date(2026, 3, 30), 2)
+        self.add_events(LoanEvent.CHECKOUT, date(2026, 3, 31), 1)
+        self.add_events(LoanEvent.RETURN, date(2026, 4, 1), 1)
+        self.assertEqual(history.rollup(batch_size=2), 4)
+        self.assertEqual(history.rollup(), 0)
+        self.add_events(LoanEvent.CHECKOUT, date(2026, 3, 31), 2)
+        self.assertEqual(history.rollup(), 2)
+
+        self.assertEqual(list(DailyLoanStat.objects.values_list('day', 'kind', 'count')), [
+            (date(2026, 3, 30), 'checkout', 2), (date(2026, 3, 31), 'checkout', 3), (date(2026, 4, 1), 'return', 1),
+        ])
+        self.assertEqual(list(MonthlyLoanStat.objects.values_list('month', 'kind', 'count')), [
+            (date(2026, 3, 1), 'checkout', 5), (date(2026, 4, 1), 'return', 1),
+        ])
+
+    def test_command(self):
+        self.add_events(LoanEvent.RENEW, date.today(), 3)
+        out = StringIO()
+        call_command('rollup_loans', stdout=out)
+        self.assertIn('Rolled up 3 loan events', out.getvalue())
+
+    def test_report_reads_rollups(self):
+        today = date(2026, 4, 15)
+        self.add_events(LoanEvent.CHECKOUT, date(2026, 4, 14), 2)
+        self.add_events(LoanEvent.RETURN, date(2025, 4, 14), 1)
+        history.rollup()
+        with self.assertNumQueries(2):
+            report = history.report(today=today)
+        self.assertEqual(report['monthly'], [{'month': date(2026, 4, 1), 'counts': [2, 0, 0, 0]}])
+        self.assertEqual(report['daily'], [{'day': date(2026, 4, 14), 'counts': [2, 0, 0, 0]}])
+
+    def test_report_view(self):
+        self.add_events(LoanEvent.RETURN, date.today(), 1)
+        history.rollup()
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('circulation-report'))
+        self.assertContains(response, 'Returned')
+        self.assertEqual(response.context['daily'][0]['counts'], [0, 0, 1, 0])
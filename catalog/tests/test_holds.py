@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import loans
+from catalog.models import Book, BookInstance, Hold
+
+
+class HoldQueueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patrons = [User.objects.create_user(username=f'patron{number}') for number in range(3)]
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='o', borrower=cls.patrons[0],
+                                               due_back=date.today())
+
+    def test_queue_is_first_come_first_served(self):
+        holds = [loans.place_hold(self.book, patron)[1] for patron in self.patrons[1:]]
+        self.assertEqual([loans.queue_position(hold) for hold in holds], [1, 2])
+        self.assertEqual(loans.return_copy(self.copy.pk), holds[0])
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        self.assertEqual((copy.status, copy.borrower, copy.due_back),
+                         ('r', self.patrons[1], date.today() + loans.PICKUP_PERIOD))
+        self.assertEqual(loans.queue_position(holds[1]), 1)
+        # collected, read and returned again: the next in line gets it
+        loans.checkout(self.copy.pk, self.patrons[1])
+        self.assertEqual(loans.return_copy(self.copy.pk), holds[1])
+        loans.checkout(self.copy.pk, self.patrons[2])
+        self.assertIsNone(loans.return_copy(self.copy.pk))
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, 'a')
+
+    def test_available_copy_reserved_instead_of_queueing(self):
+        loans.return_copy(self.copy.pk)
+        self.assertEqual(loans.place_hold(self.book, self.patrons[1]), (self.copy.pk, None))
+        self.assertFalse(Hold.objects.exists())
+
+    def test_one_request_per_patron_and_book(self):
+        with self.assertRaises(loans.AlreadyHolding):
+            loans.place_hold(self.book, self.patrons[0])
+        loans.place_hold(self.book, self.patrons[1])
+        with self.assertRaises(loans.AlreadyHolding):
+            loans.place_hold(self.book, self.patrons[1])
+        BookInstance.objects.create(book=self.book, imprint='Ace', status='a')
+        loans.place_hold(self.book, self.patrons[2])
+        with self.assertRaises(loans.AlreadyHolding):
+            loans.place_hold(self.book, self.patrons[2])
+        self.assertEqual(BookInstance.objects.filter(status__exact='r').count(), 1)
+
+    def test_reservation_has_pickup_deadline(self):
+        loans.return_copy(self.copy.pk)
+        loans.place_hold(self.book, self.patrons[1])
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).due_back, date.today() + loans.PICKUP_PERIOD)
+
+    def test_expired_reservation_goes_to_next_hold(self):
+        hold = loans.place_hold(self.book, self.patrons[1])[1]
+        loans.return_copy(self.copy.pk)
+        loans.place_hold(self.book, self.patrons[2])
+        # not yet due
+        self.assertEqual(loans.expire_reservations(), 0)
+        later = date.today() + loans.PICKUP_PERIOD + timedelta(days=1)
+        self.assertEqual(loans.expire_reservations(today=later), 1)
+        copy = BookInstance.objects.get(pk=self.copy.pk)
+        self.assertEqual((copy.status, copy.borrower, copy.due_back),
+                         ('r', self.patrons[2], later + loans.PICKUP_PERIOD))
+        self.assertFalse(Hold.objects.exists())
+        self.assertNotEqual(hold.patron, copy.borrower)
+
+    def test_expired_reservation_back_on_shelf(self):
+        loans.return_copy(self.copy.pk)
+        loans.place_hold(self.book, self.patrons[1])
+        later = date.today() + loans.PICKUP_PERIOD + timedelta(days=1)
+        out = StringIO()
+        call_command('expire_reservations', stdout=out)
+        self.assertIn('Expired 0 reservations', out.getvalue())
+        self.assertEqual(loans.expire_reservations(today=later), 1)
+        self.assertEqual(self.status(), ('a', None, None))
+
+    def status(self):
+        return BookInstance.objects.values_list('status', 'borrower', 'due_back').get(pk=self.copy.pk)
+
+    def test_conflict_keeps_the_hold(self):
+        hold = loans.place_hold(self.book, self.patrons[1])[1]
+        loans.return_copy(self.copy.pk)
+        loans.place_hold(self.book, self.patrons[2])
+        with self.assertRaises(loans.LoanConflict):
+            loans.return_copy(self.copy.pk)
+        self.assertEqual(Hold.objects.get().patron, self.patrons[2])
+        self.assertFalse(Hold.objects.filter(pk=hold.pk).exists())
+
+    def test_allocation_cost_does_not_grow_with_queue(self):
+        loans.place_hold(self.book, self.patrons[1])
+        with CaptureQueriesContext(connection) as short_queue:
+            loans.return_copy(self.copy.pk)
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='o')
+        for number in range(50):
+            loans.place_hold(self.book, User.objects.create_user(username=f'waiting{number}'))
+        with CaptureQueriesContext(connection) as long_queue:
+            loans.return_copy(self.copy.pk)
+        self.assertEqual(len(short_queue), len(long_queue))
+
+    def test_bulk_return_allocates(self):
+        other = BookInstance.objects.create(book=Book.objects.create(title='Emma', summary='.', isbn='2'),
+                                            imprint='Penguin', status='o', borrower=self.patrons[0])
+        loans.place_hold(self.book, self.patrons[1])
+        self.assertEqual(loans.return_copies(BookInstance.objects.all()), 2)
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, 'r')
+        self.assertEqual(BookInstance.objects.get(pk=other.pk).status, 'a')
+
+    def test_views(self):
+        self.client.force_login(self.patrons[1])
+        self.client.post(reverse('reserve-book', kwargs={'pk': self.book.pk}))
+        response = self.client.get(reverse('my-borrowed'))
+        self.assertContains(response, 'number 1 in the queue')
+        hold = response.context['hold_list'][0]
+        self.client.post(reverse('cancel-hold', kwargs={'pk': hold.pk}))
+        self.assertFalse(Hold.objects.exists())
+
+        self.client.post(reverse('reserve-book', kwargs={'pk': self.book.pk}))
+        loans.return_copy(self.copy.pk)
+        self.assertContains(self.client.get(reverse('my-borrowed')), 'collect by')
+        librarian = User.objects.create_user(username='librarian')
+        librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        self.client.force_login(librarian)
+        response = self.client.get(reverse('all-reserved'))
+        self.assertEqual([copy.pk for copy in response.context['bookinstance_list']], [self.copy.pk])
+        self.assertContains(response, reverse('checkout-book-librarian', kwargs={'pk': self.copy.pk}))
@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase
+
+from catalog import counters, search
+from catalog.models import Author, Book, BookInstance, Genre, Language, author_sort_key
+
+
+class ImportCatalogTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        User.objects.create_user(username='patron')
+        Language.objects.create(name='English')
+        self.files = {
+            'languages': self.write('languages.csv', 'name\nEnglish\nFrench\n'),
+            'genres': self.write('genres.jsonl', '{"name": "Fantasy"}\n{"name": "Science Fiction"}\n'),
+            'authors': self.write('authors.csv', 'first_name,last_name,date_of_birth\n'
+                                                 'Ursula,Le Guin,1929-10-21\nFrank,Herbert,\n'),
+            'books': self.write('books.jsonl', ''.join(json.dumps(book) + '\n' for book in [
+                {'title': 'A Wizard of Earthsea', 'summary': 'Mage.', 'isbn': '9780553383041',
+                 'author': 'Le Guin, Ursula', 'language': 'English', 'genre': 'Fantasy'},
+                {'title': 'Dune', 'summary': 'Spice.', 'isbn': '9780441013593', 'author': 'Herbert, Frank',
+                 'language': 'French', 'genre': 'Science Fiction;Fantasy'},
+                {'title': 'Nobody', 'summary': '', 'isbn': '1', 'author': 'Unknown, Who'},
+            ])),
+            'copies': self.write('copies.csv', 'isbn,imprint,status,due_back,borrower\n'
+                                               + '9780553383041,Bantam,a,,\n' * 3
+                                               + '9780441013593,Ace,o,2030-01-01,patron\n'
+                                               + '9780441013593,Ace,x,,\n'),
+        }
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def import_catalog(self, *args, **files):
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', *args, batch_size=2, commit_every=3, stdout=out, stderr=err,
+                     **files)
+        return out.getvalue(), err.getvalue()
+
+    def test_import(self):
+        out, err = self.import_catalog(**self.files)
+        self.assertIn('Created 1 languages', out)
+        self.assertIn('Created 2 books', out)
+        self.assertIn('Created 4 copies', out)
+        self.assertIn("unknown author ('Unknown', 'Who')", err)
+        self.assertIn("copies record 5", err)
+
+        dune = Book.objects.get(isbn='9780441013593')
+        self.assertEqual(str(dune.author), 'Herbert, Frank')
+        self.assertEqual(dune.author_sort, author_sort_key('Herbert', 'Frank'))
+        self.assertEqual(dune.language.name, 'French')
+        self.assertEqual(sorted(dune.genre.values_list('name', flat=True)), ['Fantasy', 'Science Fiction'])
+        loan = dune.bookinstance_set.get()
+        self.assertEqual((loan.status, loan.borrower.username), ('o', 'patron'))
+        self.assertEqual(str(Author.objects.get(last_name='Le Guin').date_of_birth), '1929-10-21')
+
+        self.assertEqual(counters.get_counts()[counters.COPIES_AVAILABLE], 3)
+        self.assertEqual(search.search('dune'), [dune])
+
+    def test_import_is_repeatable(self):
+        self.import_catalog(**self.files)
+        out, _ = self.import_catalog(languages=self.files['languages'], genres=self.files['genres'],
+                                     authors=self.files['authors'], books=self.files['books'])
+        self.assertIn('Created 0 books', out)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 2)
+
+    def test_existing_copies_not_counted(self):
+        self.import_catalog(**{kind: self.files[kind] for kind in ('languages', 'genres', 'authors', 'books')})
+        copy = BookInstance.objects.create(book=Book.objects.get(isbn='9780441013593'), imprint='Ace')
+        copies = self.write('copies_with_ids.csv', 'id,isbn,imprint,status,due_back,borrower\n'
+                                                   f'{copy.pk},9780441013593,Ace,a,,\n'
+                                                   ',9780553383041,Bantam,a,,\n')
+        out, _ = self.import_catalog(copies=copies)
+        self.assertIn('Created 1 copies', out)
+        self.assertEqual(BookInstance.objects.count(), 2)
+
+    def test_purges_cached_pages(self):
+        cache.clear()
+        self.import_catalog(**{kind: self.files[kind] for kind in ('languages', 'genres', 'authors', 'books')})
+        dune = Book.objects.get(isbn='9780441013593')
+        self.assertNotContains(self.client.get(dune.get_absolute_url()), 'Ace')
+        self.import_catalog(copies=self.files['copies'])
+        self.assertContains(self.client.get(dune.get_absolute_url()), 'Ace')
+
+    def test_dry_run_writes_nothing(self):
+        out, err = self.import_catalog('--dry-run', **self.files)
+        self.assertIn('Would create 2 books', out)
+        self.assertIn('Would create 4 copies', out)
+        self.assertIn('unknown author', err)
+        self.assertEqual(Book.objects.count(), 0)
+        self.assertEqual(BookInstance.objects.count(), 0)
@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import counters, loans
+from catalog.models import Author, Book, BookInstance, Hold
+
+
+class LoanServiceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron')
+        cls.other = User.objects.create_user(username='other')
+        author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593', author=author)
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+
+    def status(self):
+        return BookInstance.objects.values_list('status', 'borrower', 'due_back').get(pk=self.copy.pk)
+
+    def test_checkout_return(self):
+        loans.checkout(self.copy.pk, self.patron)
+        self.assertEqual(self.status(), ('o', self.patron.pk, date.today() + loans.LOAN_PERIOD))
+        self.assertEqual(counters.get_counts()[counters.COPIES_AVAILABLE], 0)
+        loans.return_copy(self.copy.pk)
+        self.assertEqual(self.status(), ('a', None, None))
+        self.assertEqual(counters.get_counts()[counters.COPIES_AVAILABLE], 1)
+
+    def test_second_checkout_conflicts(self):
+        loans.checkout(self.copy.pk, self.patron)
+        with self.assertRaises(loans.LoanConflict) as raised:
+            loans.checkout(self.copy.pk, self.other)
+        self.assertEqual(raised.exception.status, 'o')
+        self.assertEqual(self.status()[1], self.patron.pk)
+
+    def test_renew_needs_loan(self):
+        with self.assertRaisesMessage(loans.LoanConflict, 'it is available'):
+            loans.renew(self.copy.pk, date.today())
+        loans.checkout(self.copy.pk, self.patron)
+        loans.renew(self.copy.pk, date.today() + timedelta(days=1))
+        self.assertEqual(self.status()[2], date.today() + timedelta(days=1))
+
+    def test_reserved_copy_lent_to_its_patron_only(self):
+        self.assertEqual(loans.reserve_for_book(self.book, self.patron), self.copy.pk)
+        self.assertIsNone(loans.reserve_for_book(self.book, self.other))
+        with self.assertRaises(loans.LoanConflict):
+            loans.checkout(self.copy.pk, self.other)
+        loans.checkout(self.copy.pk, self.patron)
+        self.assertEqual(self.status()[:2], ('o', self.patron.pk))
+
+    def test_missing_copy(self):
+        with self.assertRaises(BookInstance.DoesNotExist):
+            loans.return_copy('00000000-0000-0000-0000-000000000000')
+
+
+class LoanViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron', password='1X<ISRUkw+tuK')
+        cls.librarian = User.objects.create_user(username='librarian', password='2HJ1vRV0Z&3iD')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        cls.book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_checkout_and_return(self):
+        self.client.force_login(self.librarian)
+        url = reverse('checkout-book-librarian', kwargs={'pk': self.copy.pk})
+        self.assertContains(self.client.get(self.book.get_absolute_url()), url)
+        due_back = date.today() + timedelta(weeks=1)
+        response = self.client.post(url, {'borrower': 'patron', 'due_back': due_back})
+        self.assertRedirects(response, self.book.get_absolute_url())
+        response = self.client.post(url, {'borrower': 'patron', 'due_back': due_back})
+        self.assertIn('it is on loan', response.context['form'].non_field_errors()[0])
+
+        response = self.client.post(reverse('return-book-librarian', kwargs={'pk': self.copy.pk}))
+        self.assertRedirects(response, reverse('all-borrowed'))
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, 'a')
+
+    def test_checkout_unknown_borrower(self):
+        self.client.force_login(self.librarian)
+        response = self.client.post(reverse('checkout-book-librarian', kwargs={'pk': self.copy.pk}),
+                                    {'borrower': 'nobody', 'due_back': date.today()})
+        self.assertFormError(response, 'form', 'borrower', 'Unknown borrower nobody')
+
+    def test_no_checkout_link_without_status(self):
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='')
+        self.client.force_login(self.librarian)
+        self.assertNotContains(self.client.get(self.book.get_absolute_url()), 'Check out')
+
+    def test_patron_cannot_check_out(self):
+        self.client.force_login(self.patron)
+        self.assertNotContains(self.client.get(self.book.get_absolute_url()), 'Check out')
+        response = self.client.get(reverse('checkout-book-librarian', kwargs={'pk': self.copy.pk}))
+        self.assertEqual(response.status_code, 302)
+
+    def test_reserve(self):
+        url = reverse('reserve-book', kwargs={'pk': self.book.pk})
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.force_login(self.patron)
+        response = self.client.post(url, follow=True)
+        self.assertContains(response, 'is reserved for you')
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).borrower, self.patron)
+        for _ in range(3):
+            self.assertContains(self.client.post(url, follow=True), 'You already have this book reserved')
+        self.assertFalse(Hold.objects.exists())
+
+    def test_admin_return_clears_loan(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='o', borrower=self.patron,
+                                                            due_back=date.today())
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:catalog_bookinstance_changelist'),
+                         {'action': 'markReturned', '_selected_action': [self.copy.pk]})
+        self.assertEqual(BookInstance.objects.values_list('status', 'borrower', 'due_back').get(),
+                         ('a', None, None))
@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog import loans, notices
+from catalog.models import Book, BookInstance, LoanNotice
+
+
+class LoanNoticeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann = User.objects.create_user(username='ann', email='ann@example.com', first_name='Ann')
+        cls.bob = User.objects.create_user(username='bob', email='bob@example.com')
+        cls.eve = User.objects.create_user(username='eve')
+        book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+        today = date.today()
+        cls.copies = {}
+        for name, borrower, due_back in (('ann overdue', cls.ann, today - timedelta(days=2)),
+                                         ('ann due', cls.ann, today + timedelta(days=1)),
+                                         ('ann later', cls.ann, today + timedelta(days=10)),
+                                         ('bob due', cls.bob, today),
+                                         ('eve overdue', cls.eve, today - timedelta(days=1))):
+            cls.copies[name] = BookInstance.objects.create(book=book, imprint=name, status='o', borrower=borrower,
+                                                           due_back=due_back)
+
+    def send(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('send_loan_notices', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_one_digest_per_borrower(self):
+        out, err = self.send()
+        self.assertIn('Sent 2 digests covering 1 overdue and 2 soon due loans', out)
+        self.assertIn('1 borrowers have no email address', err)
+        ann, bob = sorted(mail.outbox, key=lambda message: message.to)
+        self.assertEqual(ann.subject, 'Local Library: overdue books')
+        self.assertIn('Hello Ann', ann.body)
+        self.assertEqual(ann.body.count('Dune, due'), 2)
+        self.assertEqual(bob.subject, 'Local Library: books due soon')
+
+    def test_rerun_sends_nothing(self):
+        self.send()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Sent 0 digests', self.send()[0])
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_renewed_loan_notified_again(self):
+        self.send()
+        loans.renew(self.copies['bob due'].pk, date.today() + timedelta(days=2))
+        self.send()
+        self.assertEqual(mail.outbox[-1].to, ['bob@example.com'])
+        self.assertEqual(LoanNotice.objects.filter(copy=self.copies['bob due']).count(), 2)
+
+    def test_batches_share_one_connection(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        autospec=True, return_value=1) as send_messages:
+            self.send('--batch-size', '1')
+        self.assertEqual(send_messages.call_count, 2)
+        self.assertIs(send_messages.call_args_list[0][0][0], send_messages.call_args_list[1][0][0])
+
+    def test_failed_send_is_not_recorded(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+            with self.assertRaises(OSError):
+                self.send()
+        self.assertFalse(LoanNotice.objects.exists())
+
+    def test_partly_delivered_batch_records_what_was_sent(self):
+        send_messages = mail.get_connection().send_messages
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=[1, OSError]):
+            with self.assertRaises(OSError):
+                self.send()
+        self.assertEqual(LoanNotice.objects.values('copy__borrower').distinct().count(), 1)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=send_messages) as resend:
+            self.assertIn('Sent 1 digests', self.send()[0])
+        self.assertEqual(resend.call_count, 1)
+
+    def test_dry_run(self):
+        with mock.patch.object(mail, 'get_connection') as get_connection:
+            self.assertIn('Would send 2 digests', self.send('--dry-run')[0])
+        get_connection.assert_not_called()
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(LoanNotice.objects.exists())
+
+    def test_pending_loans_ordered_by_borrower(self):
+        pending = list(notices.pending_loans())
+        self.assertEqual([loan.borrower_id for loan in pending],
+                         sorted(loan.borrower_id for loan in pending))
+        self.assertNotIn(self.copies['ann later'].pk, [loan.copy_id for loan in pending])
@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Book, BookInstance
+
+
+class OverdueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron')
+        cls.librarian = User.objects.create_user(username='librarian')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+        today = date.today()
+        for days, status in ((-10, 'o'), (-1, 'o'), (0, 'o'), (5, 'o'), (-20, 'r'), (-30, 'm')):
+            BookInstance.objects.create(book=book, imprint='Ace', status=status, borrower=cls.patron,
+                                        due_back=today + timedelta(days=days))
+
+    def test_queryset(self):
+        overdue = BookInstance.objects.overdue().with_overdue_by().order_by('due_back')
+        self.assertEqual([copy.overdue_by.days for copy in overdue], [10, 1])
+        self.assertTrue(all(copy.is_overdue for copy in overdue))
+        self.assertEqual(BookInstance.objects.overdue(date.today() + timedelta(days=1)).count(), 3)
+
+    def test_report(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('overdue-books'))
+        self.assertEqual(len(response.context['bookinstance_list']), 2)
+        self.assertContains(response, '<td class="table-danger">10</td>', html=True)
+
+    def test_report_is_for_librarians(self):
+        self.client.force_login(self.patron)
+        self.assertEqual(self.client.get(reverse('overdue-books')).status_code, 403)
+
+    def test_dashboard_count(self):
+        self.assertNotIn('num_overdue', self.client.get(reverse('index')).context)
+        self.client.force_login(self.librarian)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_overdue'], 2)
+        counts = [query['sql'] for query in queries if 'COUNT(' in query['sql'].upper()]
+        self.assertEqual(len(counts), 1)
+        self.assertNotIn('catalog_book"', counts[0])
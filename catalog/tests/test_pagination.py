@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance
+from catalog.pagination import InvalidCursor, KeysetPaginator
+
+BOOK_KEYS = ('author__last_name', 'author__first_name', 'title', 'id')
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        authors = [Author.objects.create(first_name=f'First {n % 2}', last_name=f'Last {n % 3}')
+                   for n in range(5)]
+        for n in range(23):
+            # books without author and duplicate titles exercise NULL and tie handling
+            Book.objects.create(title=f'Title {n % 4}', summary='Summary', isbn=str(n),
+                                author=authors[n % 5] if n % 6 else None)
+        book = Book.objects.first()
+        for n in range(9):
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o',
+                                        due_back=date.today() + timedelta(days=n % 3) if n % 4 else None)
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_forward_matches_offset_ordering(self):
+        books = Book.objects.all()
+        paginator = KeysetPaginator(books, 5, BOOK_KEYS)
+        pages = self.walk(paginator)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual([book for page in pages for book in page],
+                         list(books.order_by('author', 'title', 'id')))
+
+    def test_backward_returns_previous_pages(self):
+        paginator = KeysetPaginator(Book.objects.all(), 5, BOOK_KEYS)
+        pages = self.walk(paginator)
+        self.assertFalse(pages[0].has_previous())
+        for previous, page in zip(pages, pages[1:]):
+            self.assertTrue(page.has_previous())
+            self.assertEqual(list(paginator.page(page.previous_cursor)), list(previous))
+
+    def test_nullable_keys(self):
+        copies = BookInstance.objects.all()
+        paginator = KeysetPaginator(copies, 2, ('due_back', 'borrower_id', 'book_id', 'id'))
+        pages = self.walk(paginator)
+        self.assertEqual([copy.pk for page in pages for copy in page],
+                         list(copies.order_by('due_back', 'borrower', 'book', 'id').values_list('pk', flat=True)))
+        self.assertEqual(list(paginator.page(pages[2].previous_cursor)), list(pages[1]))
+        self.assertEqual(list(paginator.page(pages[-1].previous_cursor)), list(pages[-2]))
+
+    def test_deep_pages_seek_the_leading_key(self):
+        copies = BookInstance.objects.filter(status__exact='o')
+        paginator = KeysetPaginator(copies, 2, ('due_back', 'borrower_id', 'book_id', 'id'))
+        values = [date.today(), None, 1, BookInstance.objects.first().pk]
+        for forward, bound in ((True, 'due_back>?'), (False, 'due_back<?')):
+            with self.subTest(forward=forward):
+                queryset = copies.filter(paginator._seek(values, forward) & paginator._ranges(values, forward)[0])
+                self.assertIn(bound, queryset.order_by(*paginator._ordering(forward)).explain())
+
+    def test_totals(self):
+        self.assertIsNone(KeysetPaginator(Book.objects.all(), 5, BOOK_KEYS).count)
+        self.assertEqual(KeysetPaginator(Book.objects.all(), 5, BOOK_KEYS, total='exact').num_pages, 5)
+        self.assertEqual(KeysetPaginator(Book.objects.all(), 5, BOOK_KEYS, total='cached').count, 23)
+        Book.objects.first().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(KeysetPaginator(Book.objects.all(), 5, BOOK_KEYS, total='cached').count, 23)
+
+    def test_totals_purged_with_pages(self):
+        def count():
+            return KeysetPaginator(Book.objects.all(), 5, BOOK_KEYS, total='cached', total_groups=['books']).count
+
+        self.assertEqual(count(), 23)
+        with self.assertNumQueries(0):
+            self.assertEqual(count(), 23)
+        Book.objects.first().delete()
+        self.assertEqual(count(), 22)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Book.objects.all(), 5, BOOK_KEYS)
+        for cursor in ('garbage', 'WzEsIFsxXV0', paginator.encode_cursor(['a', 'b', 'c', 'not a number'], True)):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_list_view_follows_cursor_links(self):
+        response = self.client.get(reverse('books'))
+        self.assertTrue(response.context['is_paginated'])
+        page = response.context['page_obj']
+        self.assertEqual(page.paginator.count, 23)
+        self.assertContains(response, f'?cursor={page.next_cursor}')
+        response = self.client.get(reverse('books'), {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['book_list']), 10)
+        self.assertTrue(response.context['page_obj'].has_previous())
+
+    def test_list_view_orders_by_author_sort(self):
+        author = Author.objects.get(first_name='First 0', last_name='Last 0')
+        author.last_name = 'Aardvark'
+        author.save()
+        books = list(self.client.get(reverse('books')).context['book_list'])
+        self.assertEqual(books, list(Book.objects.order_by('author__last_name', 'author__first_name', 'title',
+                                                           'id')[:10]))
+        self.assertEqual(books[4].author, author)
+        author.delete()
+        self.assertFalse(Book.objects.filter(author=None).exclude(author_sort='').exists())
+
+    def test_list_view_rejects_bad_cursor(self):
+        response = self.client.get(reverse('books'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import visits
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.tests.utils import QueryBudgetMixin
+
+
+class ViewQueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user(username='patron', password='1X<ISRUkw+tuK')
+        cls.librarian = User.objects.create_user(username='librarian', password='2HJ1vRV0Z&3iD')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        cls.author = Author.objects.create(first_name='Big', last_name='Bob')
+        cls.language = Language.objects.create(name='English')
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.book = cls.add_book()
+        cls.add_copies(cls.book)
+
+    @classmethod
+    def add_book(cls):
+        book = Book.objects.create(title='Book', summary='Summary', isbn='1234567891123',
+                                   author=cls.author, language=cls.language)
+        book.genre.add(cls.genre)
+        return book
+
+    @classmethod
+    def add_copies(cls, book, number=2):
+        for days in range(number):
+            for borrower in (cls.patron, cls.librarian):
+                BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=borrower,
+                                            due_back=date.today() + timedelta(days=days))
+
+    def grow(self):
+        """Add books and copies so list and detail pages have more rows to show"""
+        for _ in range(3):
+            self.add_copies(self.add_book())
+        self.add_copies(self.book)
+        self.book.genre.add(Genre.objects.create(name='Horror'))
+
+    def setUp(self):
+        cache.clear()
+        visits.reset()
+
+    def login(self, user):
+        self.client.force_login(user)
+
+    def test_index(self):
+        self.assertQueryBudget(2, reverse('index'), grow=self.grow)
+
+    def test_book_list(self):
+        # facet counts: one grouped query per facet, cached after the first request
+        self.assertQueryBudget(5, reverse('books'), grow=self.grow)
+
+    def test_book_detail(self):
+        # the copies and the recommendations are one query each while their fragments are cold
+        self.assertQueryBudget(5, self.book.get_absolute_url(), grow=self.grow)
+
+    def test_author_list(self):
+        self.assertQueryBudget(2, reverse('authors'), grow=self.grow)
+
+    def test_author_detail(self):
+        self.assertQueryBudget(3, self.author.get_absolute_url(), grow=self.grow)
+
+    def test_search(self):
+        self.assertQueryBudget(2, reverse('search'), {'q': 'book'}, grow=self.grow)
+
+    def test_my_borrowed(self):
+        self.login(self.patron)
+        self.assertQueryBudget(7, reverse('my-borrowed'), grow=self.grow)
+
+    def test_all_borrowed(self):
+        self.login(self.librarian)
+        self.assertQueryBudget(5, reverse('all-borrowed'), grow=self.grow)
+
+    def test_overdue(self):
+        self.login(self.librarian)
+
+        def grow():
+            BookInstance.objects.update(due_back=date.today() - timedelta(days=3))
+            self.grow()
+            BookInstance.objects.update(due_back=date.today() - timedelta(days=3))
+
+        self.assertQueryBudget(5, reverse('overdue-books'), grow=grow)
+
+    def test_book_detail_as_librarian(self):
+        self.login(self.librarian)
+        self.assertQueryBudget(9, self.book.get_absolute_url(), grow=self.grow)
+
+    def test_renew(self):
+        self.login(self.librarian)
+        copy = BookInstance.objects.first()
+        self.assertQueryBudget(5, reverse('renew-book-librarian', kwargs={'pk': copy.pk}))
@@ -0,0 +1,106 @@
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import _create_cache, cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from catalog import caching, recommendations
+from catalog.models import Book, BookCoBorrow, BookRecommendation, LoanEvent
+
+
+class RecommendationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann, cls.bob, cls.cat = [User.objects.create_user(username=name) for name in ('ann', 'bob', 'cat')]
+        cls.dune, cls.messiah, cls.earthsea, cls.tombs = [
+            Book.objects.create(title=title, summary='Summary.', isbn=str(n))
+            for n, title in enumerate(['Dune', 'Dune Messiah', 'A Wizard of Earthsea', 'The Tombs of Atuan'])]
+
+    def setUp(self):
+        cache.clear()
+
+    def borrow(self, patron, *books):
+        LoanEvent.objects.bulk_create(LoanEvent(kind=LoanEvent.CHECKOUT, occurred=timezone.now(),
+                                                patron=patron, book=book) for book in books)
+
+    def matrix(self):
+        return {(cell.book_id, cell.other_id): cell.count for cell in BookCoBorrow.objects.all()}
+
+    def recommended(self, book):
+        return list(BookRecommendation.objects.filter(book=book).values_list('recommended', 'score'))
+
+    def test_pairs_counted_once_per_patron(self):
+        self.borrow(self.ann, self.dune, self.messiah, self.dune)
+        self.borrow(self.bob, self.messiah, self.dune)
+        self.assertEqual(recommendations.update(), (5, {self.dune.pk, self.messiah.pk}))
+        self.assertEqual(self.matrix(), {(self.dune.pk, self.messiah.pk): 2, (self.messiah.pk, self.dune.pk): 2})
+
+    def test_incremental_updates_pair_with_earlier_history(self):
+        self.borrow(self.ann, self.dune, self.messiah)
+        recommendations.update(batch_size=1)
+        self.borrow(self.ann, self.earthsea)
+        self.borrow(self.bob, self.earthsea, self.tombs)
+        self.borrow(self.cat, self.earthsea, self.dune)
+        read, changed = recommendations.update()
+        self.assertEqual(read, 5)
+        self.assertEqual(self.recommended(self.earthsea), [(self.dune.pk, 2), (self.messiah.pk, 1),
+                                                           (self.tombs.pk, 1)])
+        self.assertEqual(self.recommended(self.dune), [(self.earthsea.pk, 2), (self.messiah.pk, 1)])
+        self.assertEqual(recommendations.update(), (0, set()))
+
+    def test_top_n_and_deleted_books(self):
+        self.borrow(self.ann, self.dune, self.messiah, self.earthsea, self.tombs)
+        with mock.patch.object(recommendations, 'TOP_N', 2):
+            recommendations.update()
+        self.assertEqual(len(self.recommended(self.dune)), 2)
+        Book.objects.filter(pk=self.tombs.pk).delete()
+        self.borrow(self.bob, self.tombs, self.dune)
+        recommendations.update()
+        self.assertEqual(self.matrix()[self.dune.pk, self.messiah.pk], 1)
+
+    def test_detail_page_reads_stored_list(self):
+        self.borrow(self.ann, self.dune, self.earthsea)
+        self.assertNotContains(self.client.get(self.dune.get_absolute_url()), 'also borrowed')
+        call_command('update_recommendations', stdout=StringIO())
+        response = self.client.get(self.dune.get_absolute_url())
+        self.assertContains(response, 'also borrowed')
+        self.assertContains(response, 'A Wizard of Earthsea</a>')
+
+    def test_cached_page_updated_from_the_command_process(self):
+        self.borrow(self.ann, self.dune, self.earthsea)
+        url = self.dune.get_absolute_url()
+        self.assertNotContains(self.client.get(url), 'also borrowed')
+        # the command purges through its own cache instance
+        other = _create_cache(settings.CACHES['default']['BACKEND'], **settings.CACHES['default'])
+        with mock.patch.object(caching, 'cache', other):
+            call_command('update_recommendations', stdout=StringIO())
+        self.assertContains(self.client.get(url), 'A Wizard of Earthsea</a>')
+
+    def test_renamed_or_deleted_book_leaves_the_lists(self):
+        self.borrow(self.ann, self.dune, self.earthsea)
+        self.borrow(self.bob, self.dune, self.earthsea, self.tombs)
+        recommendations.update()
+        url = self.dune.get_absolute_url()
+        self.assertContains(self.client.get(url), 'A Wizard of Earthsea</a>')
+        earthsea = Book.objects.get(pk=self.earthsea.pk)
+        earthsea.title = 'Earthsea'
+        earthsea.save()
+        self.assertContains(self.client.get(url), 'Earthsea</a>')
+        self.assertNotContains(self.client.get(url), 'A Wizard of Earthsea')
+        earthsea.delete()
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Earthsea</a>')
+        self.assertContains(response, 'The Tombs of Atuan</a>')
+        self.assertEqual(self.recommended(self.dune), [(self.tombs.pk, 1)])
+
+    def test_rebuild(self):
+        self.borrow(self.ann, self.dune, self.earthsea)
+        recommendations.update()
+        out = StringIO()
+        call_command('update_recommendations', '--rebuild', stdout=out)
+        self.assertIn('Read 2 loan events, updated recommendations of 2 books', out.getvalue())
+        self.assertEqual(self.matrix()[self.dune.pk, self.earthsea.pk], 1)
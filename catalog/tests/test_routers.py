@@ -0,0 +1,103 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import routers
+from catalog.models import Book
+
+
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request):
+        @routers.use_replica
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Book))
+
+        return view(request).content.decode()
+
+    def test_reads_in_replica_views(self):
+        with mock.patch.object(routers, '_is_ready', return_value=True):
+            self.assertEqual(self.route(self.factory.get('/')), 'replica')
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+            self.assertEqual(self.router.db_for_write(Book), 'default')
+
+    def test_sticky_after_post(self):
+        response = HttpResponse()
+        response.set_signed_cookie(routers.STICKY_COOKIE, '1')
+        request = self.factory.get('/')
+        request.COOKIES[routers.STICKY_COOKIE] = response.cookies[routers.STICKY_COOKIE].value
+        with mock.patch.object(routers, '_is_ready', return_value=True):
+            self.assertEqual(self.route(request), 'default')
+            with mock.patch('django.core.signing.time.time', return_value=time.time() + routers.STICKY_SECONDS + 1):
+                self.assertEqual(self.route(request), 'replica')
+
+    def test_forged_cookie_not_sticky(self):
+        request = self.factory.get('/')
+        request.COOKIES[routers.STICKY_COOKIE] = str(int(time.time()) + 3600)
+        self.assertFalse(routers.is_sticky(request))
+
+    def test_test_mirror_reads_default(self):
+        self.assertEqual(self.route(self.factory.get('/')), 'default')
+
+    def test_post_sets_sticky_cookie(self):
+        self.assertNotIn(routers.STICKY_COOKIE, self.client.get(reverse('books')).cookies)
+        response = self.client.post(reverse('login'), {'username': 'nobody', 'password': 'x'})
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+        self.assertTrue(routers.is_sticky(self.factory.get('/', HTTP_COOKIE=response.cookies.output(header=''))))
+
+    def test_no_migrations_on_replica(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'catalog'))
+        self.assertTrue(self.router.allow_migrate('default', 'catalog'))
+
+
+class ReplicaViewsTest(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_catalog_pages_read_replica(self):
+        with mock.patch.object(routers, '_is_ready', return_value=True), \
+                CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            self.client.get(reverse('books'))
+            self.client.get(reverse('authors'))
+            self.client.get(reverse('search'), {'q': 'dune'})
+        self.assertEqual([query["sql"] for query in primary], [])
+        self.assertGreater(len(replica), 0)
+
+
+class SyncReplicaTest(TransactionTestCase):
+    # the backup API waits for open write transactions, so the rows must be committed
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_copy(self):
+        book = Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+        # flushing does not reach the search index, the receivers do
+        self.addCleanup(book.delete)
+        path = os.path.join(self.directory, 'replica.sqlite3')
+        routers.copy_sqlite('default', path)
+        replica = sqlite3.connect(path)
+        self.addCleanup(replica.close)
+        self.assertEqual(replica.execute('SELECT title FROM catalog_book').fetchall(), [('Dune',)])
+
+    def test_command_refuses_mirror(self):
+        # under test the replica alias mirrors default
+        with self.assertRaisesMessage(CommandError, 'is the default database'):
+            call_command('sync_replica', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'Not replicas: default'):
+            call_command('sync_replica', 'default', stdout=StringIO())
@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import search
+from catalog.models import Author, Book
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.wizard = Book.objects.create(title='A Wizard of Earthsea', summary='A young mage.',
+                                         isbn='9780553383041', author=cls.author)
+        cls.dispossessed = Book.objects.create(title='The Dispossessed', summary='An anarchist wizard story.',
+                                               isbn='9780061054884', author=cls.author)
+        Book.objects.create(title='Dune', summary='Spice.', isbn='9780441013593')
+
+    def test_title_match_ranks_above_summary_match(self):
+        self.assertEqual(search.search('wizard'), [self.wizard, self.dispossessed])
+
+    def test_prefix_and_author_match(self):
+        self.assertEqual(search.search('earth'), [self.wizard])
+        self.assertEqual(len(search.search('guin')), 2)
+        self.assertEqual(search.search('9780441013593')[0].title, 'Dune')
+
+    def test_every_word_must_match(self):
+        self.assertEqual(search.search('wizard anarchist'), [self.dispossessed])
+        self.assertEqual(search.search('"*()'), [])
+
+    def test_index_follows_changes(self):
+        book = Book.objects.get(pk=self.wizard.pk)
+        book.title = 'The Tombs of Atuan'
+        book.save()
+        self.assertEqual(search.search('atuan'), [book])
+        author = Author.objects.get(pk=self.author.pk)
+        author.last_name = 'Le Guin-Kroeber'
+        author.save()
+        self.assertEqual(len(search.search('kroeber')), 2)
+        author.delete()
+        self.assertEqual(search.search('guin'), [])
+        Book.objects.get(pk=self.dispossessed.pk).delete()
+        self.assertEqual(search.search('anarchist'), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(search.search('dune'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 books', out.getvalue())
+        self.assertEqual(len(search.search('dune')), 1)
+
+    def test_search_view(self):
+        response = self.client.get(reverse('search'), {'q': 'wizard'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'catalog/book_search.html')
+        self.assertEqual(response.context['book_list'], [self.wizard, self.dispossessed])
+        self.assertIsNone(response.context['next_page'])
+
+    def test_search_api(self):
+        response = self.client.get(reverse('search-api'), {'q': 'dispossessed'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['id'] for result in results], [self.dispossessed.pk])
+        self.assertEqual(results[0]['author'], 'Le Guin, Ursula')
@@ -0,0 +1,74 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import staticfiles
+
+
+class StaticPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings = override_settings(STATIC_ROOT=cls.static_root)
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.static_root)
+        super().tearDownClass()
+
+    def get(self, path, **extra):
+        response = self.client.get(f'/static/{path}', **extra)
+        content = b''.join(response.streaming_content)
+        response.close()
+        return response, content
+
+    def test_pages_link_hashed_local_assets(self):
+        content = self.client.get(reverse('index')).content.decode()
+        self.assertIn(staticfiles_storage.url('js/vendor/jquery-1.12.4.min.js'), content)
+        self.assertIn(staticfiles_storage.url('css/bootstrap.min.css'), content)
+        self.assertNotIn('https://', content.split('</head>')[0])
+
+    def test_precompressed_variant_served(self):
+        name = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        self.assertNotEqual(name, 'css/bootstrap.min.css')
+        response, content = self.get(name, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        with open(os.path.join(self.static_root, name), 'rb') as original:
+            self.assertEqual(gzip.decompress(content), original.read())
+
+    def test_hashed_names_immutable(self):
+        response, _ = self.get(staticfiles_storage.stored_name('css/bootstrap.min.css'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(f'max-age={staticfiles.IMMUTABLE_MAX_AGE}', response['Cache-Control'])
+
+    def test_unhashed_names_revalidated(self):
+        response, _ = self.get('css/bootstrap.min.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_missing_manifest_entry_raises(self):
+        with self.assertRaises(ValueError):
+            staticfiles_storage.stored_name('css/missing.css')
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.client.get('/static/css/missing.css').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+
+class StaticFallbackTest(TestCase):
+    def test_uncollected_files_link_source_names(self):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            self.assertEqual(staticfiles_storage.url('css/bootstrap.min.css'), '/static/css/bootstrap.min.css')
+            self.assertEqual(self.client.get(reverse('index')).status_code, 200)
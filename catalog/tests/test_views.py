@@ -3,6 +3,7 @@ import uuid
 from datetime import date, timedelta
 
 from django.contrib.auth.models import User, Permission
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
@@ -73,6 +74,10 @@ class TestViewsSetUp(TestCase):
         cls.test_book = test_book
         cls.test_book_instance = BookInstance.objects.all()[0]
 
+    def setUp(self):
+        # cached page totals outlive the per-test rollback
+        cache.clear()
+
 
 class BookListViewTest(TestViewsSetUp):
 
@@ -477,12 +482,22 @@ class RenewBookInstancesViewTest(TestViewsSetUp):
         self.assertEqual(response.context['form'].initial['due_back'], date_3_weeks)
 
     def test_redirects_to_all_borrowed_book_list_on_success(self):
+        # only a copy on loan can be renewed
+        BookInstance.objects.filter(pk=self.test_book_instance.pk).update(status='o')
         self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
         valid_date_in_future = date.today() + timedelta(weeks=2)
         response = self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.test_book_instance.pk, })
                                     , {'due_back': valid_date_in_future})
         self.assertRedirects(response, reverse('all-borrowed'))
 
+    def test_form_error_when_copy_not_on_loan(self):
+        self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        valid_date_in_future = date.today() + timedelta(weeks=2)
+        response = self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.test_book_instance.pk, })
+                                    , {'due_back': valid_date_in_future})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('it is in maintenance', response.context['form'].non_field_errors()[0])
+
     def test_form_invalid_renewal_date_past(self):
         self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
         invalid_date_in_past = date.today() - timedelta(weeks=1)
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import visits
+from catalog.models import VisitCount
+
+
+class VisitCountTest(TestCase):
+    def setUp(self):
+        visits.reset()
+        self.addCleanup(visits.reset)
+
+    def test_index_counts_without_session(self):
+        for expected in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('index'))
+            self.assertEqual(response.context['num_visits'], expected)
+            self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertIn(visits.COOKIE_NAME, self.client.cookies)
+        # still buffered
+        self.assertFalse(VisitCount.objects.exists())
+
+    def test_users_counted_by_id(self):
+        user = User.objects.create_user(username='patron')
+        self.client.force_login(user)
+        self.client.get(reverse('index'))
+        self.assertEqual(self.client.get(reverse('index')).context['num_visits'], 1)
+        self.assertEqual(visits.flush(), 1)
+        self.assertEqual(VisitCount.objects.get().visitor, f'user:{user.pk}')
+
+    def test_flush_groups_increments(self):
+        for visitor in ('visitor:a', 'visitor:b', 'visitor:c', 'visitor:c'):
+            visits.record(visitor)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(visits.flush(), 3)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 2)
+        visits.record('visitor:a')
+        visits.flush()
+        self.assertEqual(dict(VisitCount.objects.values_list('visitor', 'count')),
+                         {'visitor:a': 2, 'visitor:b': 1, 'visitor:c': 2})
+        self.assertEqual(visits.flush(), 0)
+
+    def test_count_includes_buffer(self):
+        VisitCount.objects.create(visitor='visitor:a', count=5)
+        visits.record('visitor:a')
+        self.assertEqual(visits.get_count('visitor:a'), 6)
+
+    def test_flushed_after_due_request(self):
+        with mock.patch.object(visits, 'FLUSH_INTERVAL', 0):
+            self.client.get(reverse('index'))
+        self.assertEqual(VisitCount.objects.get().count, 1)
+
+    def test_idle_buffer_flushed_by_any_request(self):
+        visits.record('visitor:a')
+        with mock.patch.object(visits, '_oldest', visits._oldest - visits.FLUSH_INTERVAL):
+            self.client.get(reverse('books'))
+        self.assertEqual(VisitCount.objects.get().count, 1)
+
+    def test_flushed_at_exit(self):
+        visits.record('visitor:a')
+        visits._flush_at_exit()
+        self.assertEqual(VisitCount.objects.get().count, 1)
+        visits.record('visitor:b')
+        with mock.patch.dict(connection.settings_dict, {'NAME': 'another.sqlite3'}):
+            visits._flush_at_exit()
+        self.assertEqual(VisitCount.objects.count(), 1)
+
+    def test_invalid_cookie_replaced(self):
+        self.client.cookies[visits.COOKIE_NAME] = 'x" OR 1'
+        response = self.client.get(reverse('index'))
+        self.assertRegex(response.cookies[visits.COOKIE_NAME].value, r'^[0-9a-f]{32}$')
@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin pinning views to a fixed number of database queries"""
+
+    def assertQueryBudget(self, budget, url, data=None, grow=None, using=DEFAULT_DB_ALIAS):
+        """
+            Assert an uncached GET of url runs exactly budget queries
+            @param budget       : expected number of queries
+            @param url          : url to request with self.client
+            @param data         : optional GET parameters
+            @param grow         : optional callable adding rows the view will show; the
+                                  request is repeated afterwards and must stay in budget
+            @return             : the last response
+        """
+        for attempt in ('', ' after adding rows') if grow else ('',):
+            if attempt:
+                grow()
+            cache.clear()
+            with CaptureQueriesContext(connections[using]) as queries:
+                response = self.client.get(url, data)
+            self.assertEqual(response.status_code, 200)
+            executed = len(queries)
+            self.assertEqual(executed, budget, f'{url} ran {executed} queries{attempt}, budget is {budget}:\n'
+                             + '\n'.join(query['sql'] for query in queries.captured_queries))
+        return response
@@ -5,11 +5,26 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('books/', views.BookListView.as_view(), name='books'),
     path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
+    path('search/', views.search_books, name='search'),
+    path('search/api/', views.search_books_api, name='search-api'),
     path('authors/', views.AuthorListView.as_view(), name='authors'),
     path('author/<int:pk>', views.AuthorDetailView.as_view(), name='author-detail'),
+    path('author/autocomplete/', views.author_autocomplete, name='author-autocomplete'),
     path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
     path('allloanedbooks/', views.AllLoanedBooksListView.as_view(), name='all-borrowed'),
+    path('overduebooks/', views.OverdueBooksListView.as_view(), name='overdue-books'),
+    path('allreservedbooks/', views.AllReservedBooksListView.as_view(), name='all-reserved'),
+    path('circulation/', views.circulation_report, name='circulation-report'),
+    path('dashboard/', views.circulation_dashboard, name='circulation-dashboard'),
+    path('allloanedbooks/renew/', views.renew_books_librarian, name='renew-books-librarian'),
+    path('allloanedbooks/renew/api/', views.renew_books_api, name='renew-books-api'),
+    path('export/<slug:kind>.<slug:fmt>', views.export_data, name='export'),
+    path('cache-stats/', views.cache_stats, name='cache-stats'),
     path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
+    path('book/<uuid:pk>/checkout/', views.checkout_book_librarian, name='checkout-book-librarian'),
+    path('book/<uuid:pk>/return/', views.return_book_librarian, name='return-book-librarian'),
+    path('book/<int:pk>/reserve/', views.reserve_book, name='reserve-book'),
+    path('hold/<int:pk>/cancel/', views.cancel_hold, name='cancel-hold'),
     path('author/create/', views.AuthorCreate.as_view(), name='author_create'),
     path('author/<int:pk>/update/', views.AuthorUpdate.as_view(), name='author_update'),
     path('author/<int:pk>/delete/', views.AuthorDelete.as_view(), name='author_delete'),
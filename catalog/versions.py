@@ -0,0 +1,23 @@
+"""
+    Propagation of changes between related records: last_modified is moved
+    forward on the records whose pages show the change, and their cached
+    anonymous pages are purged
+"""
+from django.utils import timezone
+
+from catalog import caching
+from catalog.models import Author, Book
+
+
+def touch_books(pks):
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        Book.objects.filter(pk__in=pks).update(last_modified=timezone.now())
+        caching.purge_pages(f'book:{pk}' for pk in pks)
+
+
+def touch_authors(pks):
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        Author.objects.filter(pk__in=pks).update(last_modified=timezone.now())
+        caching.purge_pages(f'author:{pk}' for pk in pks)
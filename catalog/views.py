@@ -1,19 +1,33 @@
+import json
+import uuid
 from datetime import date, timedelta
 
 
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, permission_required  # for functions
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin  # for classes
-from django.http import HttpResponseRedirect
+from django.db.models import Count
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import require_POST
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse, reverse_lazy
 
-from catalog.forms import RenewBookForm, RenewBookModelForm
+from catalog import autocomplete, caching, counters, dashboard, exports, facets, history, loans, search, visits
+from catalog.caching import cache_anonymous_page
+from catalog.conditional import detail_condition, list_condition
+from catalog.forms import BookForm, CheckoutForm, RenewBookForm, RenewBookModelForm
 from catalog.models import Book, Author, BookInstance, Genre
+from catalog.pagination import KeysetPaginationMixin
+from catalog.routers import use_replica
 
 # Create your views here.
 
+SEARCH_PAGE_SIZE = 20
+
 
 def index(request):
     """
@@ -22,38 +36,45 @@ def index(request):
         @return             : index template with context data
     """
 
-    # Generate counts of some of the main objects, all() implied by default
-    num_books = Book.objects.count()
-    num_instances = BookInstance.objects.count()
-    num_authors = Author.objects.count()
-
-    # Available books (status = 'a')
-    num_instances_available = BookInstance.objects.filter(status__exact='a').count()
+    # Counts of the main objects, read from the counters table in one query
+    counts = counters.get_counts()
 
-    # Number of visits to this view, as counted by session
-    num_visits = request.session.get('num_visits', 0)
-    request.session['num_visits'] = num_visits + 1
+    # Number of visits to this view, buffered in memory and written in bulk by catalog.visits
+    visitor, anonymous_id = visits.visitor_for(request)
+    num_visits = visits.get_count(visitor)
+    visits.record(visitor)
     context = {
-        'num_books': num_books,
-        'num_instances': num_instances,
-        'num_authors': num_authors,
-        'num_instances_available': num_instances_available,
+        'num_books': counts[counters.BOOKS],
+        'num_instances': counts[counters.COPIES],
+        'num_authors': counts[counters.AUTHORS],
+        'num_instances_available': counts[counters.COPIES_AVAILABLE],
         'num_visits': num_visits,
     }
+    if request.user.has_perm('catalog.can_mark_returned'):
+        # one COUNT over the due date index, no rows loaded
+        context['num_overdue'] = BookInstance.objects.overdue().count()
 
     # always include the original request object
-    return render(request, 'index.html', context=context)
+    response = render(request, 'index.html', context=context)
+    if anonymous_id:
+        response.set_cookie(visits.COOKIE_NAME, anonymous_id, max_age=visits.COOKIE_MAX_AGE, httponly=True,
+                            samesite='Lax')
+    return response
 
 
 @permission_required('catalog.can_mark_returned')
 def renew_book_librarian(request, pk):
-    book_instance = get_object_or_404(BookInstance, pk=pk)
+    book_instance = get_object_or_404(BookInstance.objects.select_related('book', 'borrower'), pk=pk)
     if request.method == 'POST':
         form = RenewBookModelForm(request.POST)
         if form.is_valid():
-            book_instance.due_back = form.cleaned_data['due_back']
-            book_instance.save()
-            return HttpResponseRedirect(reverse('all-borrowed'))
+            try:
+                loans.renew(book_instance.pk, form.cleaned_data['due_back'])
+            except loans.LoanConflict as conflict:
+                # returned by someone else since the form was shown
+                form.add_error(None, str(conflict))
+            else:
+                return HttpResponseRedirect(reverse('all-borrowed'))
     else:
         proposed_renewal_date = date.today() + timedelta(weeks=3)
         form = RenewBookModelForm(initial={'due_back': proposed_renewal_date})
@@ -64,54 +85,402 @@ def renew_book_librarian(request, pk):
     return render(request, 'catalog/book_renew_librarian.html', context)
 
 
-class BookListView(generic.ListView):
+def _bulk_renewal(data, copy_values):
+    """
+        Validate a bulk renewal and apply it
+        @param data         : form data with the due_back date
+        @param copy_values  : list of copy UUIDs as strings
+        @return             : (bound RenewBookModelForm, per-copy results or None when invalid)
+    """
+    form = RenewBookModelForm(data)
+    form.is_valid()
+    copy_ids = []
+    if not isinstance(copy_values, list) or not copy_values:
+        form.add_error(None, 'Select at least one copy.')
+    else:
+        try:
+            # de-duplicated, in the order given
+            copy_ids = list(dict.fromkeys(uuid.UUID(str(value)) for value in copy_values))
+        except ValueError:
+            form.add_error(None, 'Invalid copy id.')
+        if len(copy_ids) > loans.MAX_BULK_RENEWALS:
+            form.add_error(None, f'At most {loans.MAX_BULK_RENEWALS} copies can be renewed at once.')
+    if form.errors:
+        return form, None
+    return form, loans.renew_many(copy_ids, form.cleaned_data['due_back'])
+
+
+@require_POST
+@permission_required('catalog.can_mark_returned')
+def renew_books_librarian(request):
+    """
+        View function renewing the copies selected on the borrowed books list to one due date
+        @param request      : request object, due_back and one copy parameter per selected copy
+        @return             : page with the outcome for each copy, or the form errors
+    """
+    form, results = _bulk_renewal(request.POST, request.POST.getlist('copy'))
+    if results:
+        copies = BookInstance.objects.select_related('book', 'borrower').in_bulk([result['id'] for result in results])
+        for result in results:
+            result['copy'] = copies.get(result['id'])
+    context = {
+        'form': form,
+        'results': results,
+    }
+    return render(request, 'catalog/book_renew_bulk_librarian.html', context)
+
+
+@require_POST
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def renew_books_api(request):
+    """
+        JSON bulk renewal endpoint
+        @param request      : request object, JSON body {"due_back": "YYYY-MM-DD", "copies": [UUID, ...]}
+        @return             : JSON with the outcome for each copy, or the errors with status 400
+    """
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({'errors': {'__all__': ['Expected a JSON object.']}}, status=400)
+    form, results = _bulk_renewal({'due_back': payload.get('due_back')}, payload.get('copies'))
+    if results is None:
+        return JsonResponse({'errors': {field: [str(error) for error in errors]
+                                        for field, errors in form.errors.items()}}, status=400)
+    return JsonResponse({
+        'due_back': form.cleaned_data['due_back'],
+        'renewed': sum(result['renewed'] for result in results),
+        'results': results,
+    })
+
+
+@permission_required('catalog.can_mark_returned')
+def checkout_book_librarian(request, pk):
+    """
+        View function lending a copy to a patron
+        @param request      : request object
+        @param pk           : UUID of the copy
+        @return             : checkout form, or redirect to the book once lent
+    """
+    book_instance = get_object_or_404(BookInstance.objects.select_related('book'), pk=pk)
+    if request.method == 'POST':
+        form = CheckoutForm(request.POST)
+        if form.is_valid():
+            try:
+                loans.checkout(book_instance.pk, form.cleaned_data['borrower'], form.cleaned_data['due_back'])
+            except loans.LoanConflict as conflict:
+                form.add_error(None, str(conflict))
+            else:
+                return HttpResponseRedirect(book_instance.book.get_absolute_url())
+    else:
+        form = CheckoutForm(initial={'due_back': date.today() + loans.LOAN_PERIOD})
+    context = {
+        'form': form,
+        'book_instance': book_instance
+    }
+    return render(request, 'catalog/book_checkout_librarian.html', context)
+
+
+@require_POST
+@permission_required('catalog.can_mark_returned')
+def return_book_librarian(request, pk):
+    """
+        View function putting a copy on loan back on the shelf
+        @param request      : request object
+        @param pk           : UUID of the copy
+        @return             : redirect to the borrowed books list
+    """
+    try:
+        loans.return_copy(pk)
+    except BookInstance.DoesNotExist:
+        raise Http404('No such copy')
+    except loans.LoanConflict as conflict:
+        messages.error(request, str(conflict))
+    return HttpResponseRedirect(reverse('all-borrowed'))
+
+
+@require_POST
+@login_required
+def reserve_book(request, pk):
+    """
+        View function reserving an available copy of a book for the current user, or
+        queueing them for the next returned copy
+        @param request      : request object
+        @param pk           : book id
+        @return             : redirect to the book
+    """
+    book = get_object_or_404(Book, pk=pk)
+    try:
+        copy_id, hold = loans.place_hold(book, request.user)
+    except loans.AlreadyHolding:
+        messages.error(request, 'You already have this book reserved, on loan or on hold.')
+    else:
+        if copy_id:
+            messages.success(request, f'Copy {copy_id} is reserved for you.')
+        else:
+            messages.success(request, f'No copy is available, you are number {loans.queue_position(hold)} '
+                                      f'in the queue.')
+    return HttpResponseRedirect(book.get_absolute_url())
+
+
+@require_POST
+@login_required
+def cancel_hold(request, pk):
+    """
+        View function taking the current user out of a book's queue
+        @param request      : request object
+        @param pk           : hold id
+        @return             : redirect to the user's borrowed books
+    """
+    if not loans.cancel_hold(pk, request.user):
+        messages.error(request, 'That hold was already allocated or cancelled.')
+    return HttpResponseRedirect(reverse('my-borrowed'))
+
+
+def _search_results(request, per_page):
+    """Run the search in request.GET and return (query, page number, books, has_next)"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    # fetch one extra match to learn whether there is a next page without counting
+    books = search.search(query, limit=per_page + 1, offset=(page - 1) * per_page)
+    return query, page, books[:per_page], len(books) > per_page
+
+
+@use_replica
+def search_books(request):
+    """
+        View function for the book search page
+        @param request      : request object, search text in the q parameter
+        @return             : search template with ranked matching books
+    """
+    query, page, books, has_next = _search_results(request, per_page=SEARCH_PAGE_SIZE)
+    context = {
+        'query': query,
+        'book_list': books,
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if has_next else None,
+    }
+    return render(request, 'catalog/book_search.html', context)
+
+
+@use_replica
+def search_books_api(request):
+    """
+        JSON search endpoint
+        @param request      : request object, search text in the q parameter
+        @return             : JSON with the ranked matches for the requested page
+    """
+    query, page, books, has_next = _search_results(request, per_page=SEARCH_PAGE_SIZE)
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'has_next': has_next,
+        'results': [{
+            'id': book.pk,
+            'title': book.title,
+            'author': str(book.author) if book.author else None,
+            'isbn': book.isbn,
+            'url': book.get_absolute_url(),
+        } for book in books],
+    })
+
+
+@permission_required('catalog.can_mark_returned')
+def circulation_report(request):
+    """
+        Loan operations per month and per day, read from the rollup tables
+        kept current by manage.py rollup_loans
+        @param request      : request object
+        @return             : circulation report template
+    """
+    return render(request, 'catalog/circulation_report.html', context=history.report())
+
+
+@staff_member_required
+def circulation_dashboard(request):
+    """
+        Circulation trends as of the last manage.py refresh_dashboard
+        @param request      : request object
+        @return             : dashboard template, reading one stored row at most
+    """
+    context = {'available': dashboard.is_available(), 'metrics': dashboard.metrics()}
+    return render(request, 'catalog/circulation_dashboard.html', context=context)
+
+
+@use_replica
+def author_autocomplete(request):
+    """
+        JSON lookup for the author autocomplete widget
+        @param request      : request object, text typed so far in the q parameter
+        @return             : JSON with at most autocomplete.MAX_RESULTS authors and whether more matched
+    """
+    authors, more = autocomplete.authors(request.GET.get('q', ''))
+    return JsonResponse({
+        'results': [{'id': author.pk, 'text': str(author)} for author in authors],
+        'more': more,
+    })
+
+
+@permission_required('catalog.can_mark_returned')
+def export_data(request, kind, fmt):
+    """
+        Stream an export as a file download
+        @param kind         : loans, copies or catalog
+        @param fmt          : csv or jsonl
+        @return             : streaming response that starts sending rows immediately
+    """
+    if kind not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise Http404('Unknown export')
+    response = StreamingHttpResponse(exports.stream(kind, fmt), content_type=exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
+@staff_member_required
+def cache_stats(request):
+    """
+        Hit and miss counters of the catalog caches, for monitoring
+        @param request      : request object
+        @return             : JSON object of cache name to hit and miss counts
+    """
+    return JsonResponse(caching.stats())
+
+
+@cache_anonymous_page('books', facets.GROUP)
+@method_decorator(use_replica, name='dispatch')
+@list_condition(Book)
+class BookListView(KeysetPaginationMixin, generic.ListView):
     model = Book
     paginate_by = 10
+    # author_sort is the author's name kept on the book, so pages seek book_author_sort_idx
+    keyset_keys = ('author_sort', 'title', 'id')
+    keyset_total_groups = ('books', facets.GROUP)
 
     def get_queryset(self):
-        return Book.objects.order_by('author', 'title')
-
-
+        self.filters = facets.parse_filters(self.request.GET)
+        books = Book.objects.select_related('author').order_by('author_sort', 'title')
+        return facets.filter_books(books, self.filters)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        counts = facets.counts(self.filters)
+        context['facets'] = [{
+            'name': name,
+            'values': [{'id': pk, 'label': label, 'books': books, 'selected': self.filters.get(name) == pk}
+                       for pk, label, books in counts[name]],
+            'selected': name in self.filters,
+        } for name in facets.FACETS]
+        return context
+
+
+@cache_anonymous_page('book:{pk}')
+@method_decorator(use_replica, name='dispatch')
+@detail_condition(Book)
 class BookDetailView(generic.DetailView):
     model = Book
 
+    def get_queryset(self):
+        # copies are only queried when their cached fragment is stale
+        return Book.objects.select_related('author', 'language').prefetch_related('genre')
 
-class AuthorListView(generic.ListView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # precomputed by manage.py update_recommendations, only queried when the cached fragment is stale
+        context['also_borrowed'] = self.object.recommendations.select_related('recommended')
+        return context
+
+
+@cache_anonymous_page('authors')
+@method_decorator(use_replica, name='dispatch')
+@list_condition(Author)
+class AuthorListView(KeysetPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 10
+    keyset_keys = ('last_name', 'first_name', 'id')
+    keyset_total_groups = ('authors',)
 
     # no get_queryset, order set on model level
 
 
+@cache_anonymous_page('author:{pk}')
+@method_decorator(use_replica, name='dispatch')
+@detail_condition(Author)
 class AuthorDetailView(generic.DetailView):
     model = Author
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # copy counts come from one grouped query instead of a COUNT per book,
+        # run only when the cached fragment is stale
+        context['books'] = self.object.book_set.annotate(num_copies=Count('bookinstance')).order_by('title')
+        return context
+
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBooksByUserListView(LoginRequiredMixin, KeysetPaginationMixin, generic.ListView):
     """Generic class-based view listing books on loan to current user"""
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_user.html'
     paginate_by = 10
+    keyset_keys = ('due_back', 'id')
 
     def get_queryset(self):
         return BookInstance.objects\
+                           .select_related('book')\
                            .filter(borrower=self.request.user)\
                            .filter(status__exact='o')\
                            .order_by('due_back')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # copies waiting to be collected, and queues the user is in
+        context['reserved_list'] = BookInstance.objects.select_related('book')\
+            .filter(borrower=self.request.user, status__exact='r').order_by('due_back')
+        context['hold_list'] = loans.holds_with_positions(self.request.user)
+        return context
 
-class AllLoanedBooksListView(PermissionRequiredMixin, generic.ListView):
+
+class AllLoanedBooksListView(PermissionRequiredMixin, KeysetPaginationMixin, generic.ListView):
     model = BookInstance
     paginate_by = 20
+    keyset_keys = ('due_back', 'borrower_id', 'book_id', 'id')
     permission_required = 'catalog.can_mark_returned'
     template_name = 'catalog/all_loaned_books_list_view.html'
 
+    status = 'o'
+
     def get_queryset(self):
         return BookInstance.objects\
-            .filter(status__exact='o')\
+            .select_related('book', 'borrower')\
+            .filter(status__exact=self.status)\
             .order_by('due_back', 'borrower', 'book')
 
 
+class OverdueBooksListView(PermissionRequiredMixin, KeysetPaginationMixin, generic.ListView):
+    """Generic class-based view listing overdue loans, longest overdue first"""
+    model = BookInstance
+    paginate_by = 20
+    keyset_keys = ('due_back', 'borrower_id', 'book_id', 'id')
+    permission_required = 'catalog.can_mark_returned'
+    template_name = 'catalog/overdue_books_list_view.html'
+
+    def get_queryset(self):
+        return BookInstance.objects\
+            .overdue()\
+            .with_overdue_by()\
+            .select_related('book', 'borrower')\
+            .order_by('due_back', 'borrower', 'book')
+
+
+class AllReservedBooksListView(AllLoanedBooksListView):
+    """Copies allocated to patrons and waiting to be collected, by pickup deadline"""
+    status = 'r'
+
+
 class AuthorCreate(PermissionRequiredMixin, CreateView):
     model = Author
     permission_required = 'catalog.can_mark_returned'
@@ -135,13 +504,13 @@ class AuthorDelete(PermissionRequiredMixin, DeleteView):
 class BookCreate(PermissionRequiredMixin, CreateView):
     model = Book
     permission_required = 'catalog.can_mark_returned'
-    fields = '__all__'
+    form_class = BookForm
 
 
 class BookUpdate(PermissionRequiredMixin, UpdateView):
     model = Book
     permission_required = 'catalog.can_mark_returned'
-    fields = '__all__'
+    form_class = BookForm
 
 
 class BookDelete(PermissionRequiredMixin, DeleteView):
@@ -0,0 +1,131 @@
+"""
+    Home page visit counts. Visits are added to an in-process buffer and
+    written to VisitCount in bulk, after the response of a request that finds
+    the buffer due, so the request path itself only reads.
+
+    The buffer is also flushed once it is FLUSH_INTERVAL old by the next
+    request of any page, and when the process exits.
+
+    Each process keeps its own buffer: a visitor's count reads the stored
+    value plus this process's pending visits.
+"""
+import atexit
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+
+from catalog.models import VisitCount
+
+logger = logging.getLogger(__name__)
+
+# seconds a visit may wait in the buffer, and distinct visitors that force a flush
+FLUSH_INTERVAL = 10
+FLUSH_SIZE = 1000
+# visitors per statement, within SQLite's limit on query parameters
+FLUSH_BATCH = 500
+
+COOKIE_NAME = 'catalog_visitor'
+COOKIE_MAX_AGE = 365 * 24 * 60 * 60
+
+_lock = threading.Lock()
+_pending = Counter()
+_oldest = None
+_due = False
+# database the buffered visits were counted against
+_database = None
+
+
+def visitor_for(request):
+    """
+        Identify the visitor of a request
+        @param request      : request object
+        @return             : (visitor key, anonymous id to store in the cookie or None)
+    """
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}', None
+    anonymous_id = request.COOKIES.get(COOKIE_NAME, '')
+    if not re.fullmatch(r'[0-9a-f]{32}', anonymous_id):
+        anonymous_id = uuid.uuid4().hex
+    return f'visitor:{anonymous_id}', anonymous_id
+
+
+def get_count(visitor):
+    """Visits recorded for visitor, stored and still buffered"""
+    stored = VisitCount.objects.filter(visitor=visitor).values_list('count', flat=True).first() or 0
+    with _lock:
+        return stored + _pending[visitor]
+
+
+def record(visitor):
+    """Buffer one visit; marks the buffer due once it is old or large enough"""
+    global _oldest, _due, _database
+    with _lock:
+        now = time.monotonic()
+        if not _pending:
+            _oldest = now
+            _database = connections['default'].settings_dict['NAME']
+        _pending[visitor] += 1
+        if now - _oldest >= FLUSH_INTERVAL or len(_pending) >= FLUSH_SIZE:
+            _due = True
+
+
+def flush_if_due():
+    """Flush when record() marked the buffer due, or it has been waiting FLUSH_INTERVAL since"""
+    oldest = _oldest
+    if _due or oldest is not None and time.monotonic() - oldest >= FLUSH_INTERVAL:
+        flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    # the test runner points the connection back at the real database before exiting
+    if _pending and connections['default'].settings_dict['NAME'] == _database:
+        flush()
+
+
+def flush():
+    """
+        Write the buffered visits: one insert of unseen visitors, then one
+        UPDATE per distinct increment
+        @return             : number of visitors written
+    """
+    global _oldest, _due
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _oldest, _due = None, False
+    if not pending:
+        return 0
+    by_delta = defaultdict(list)
+    for visitor, delta in pending.items():
+        by_delta[delta].append(visitor)
+    try:
+        with transaction.atomic():
+            VisitCount.objects.bulk_create([VisitCount(visitor=visitor) for visitor in pending],
+                                           batch_size=FLUSH_BATCH, ignore_conflicts=True)
+            for delta, visitors in by_delta.items():
+                for start in range(0, len(visitors), FLUSH_BATCH):
+                    VisitCount.objects.filter(visitor__in=visitors[start:start + FLUSH_BATCH])\
+                        .update(count=F('count') + delta)
+    except DatabaseError:
+        logger.exception('Could not flush %d visit counts, keeping them for the next flush', len(pending))
+        with _lock:
+            if not _pending:
+                _oldest = time.monotonic()
+            _pending.update(pending)
+        return 0
+    return len(pending)
+
+
+def reset():
+    """Drop buffered visits without writing them"""
+    global _oldest, _due
+    with _lock:
+        _pending.clear()
+        _oldest, _due = None, False